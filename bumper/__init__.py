@@ -3,16 +3,19 @@
 import argparse
 import asyncio
 from contextlib import suppress
+from datetime import datetime
 import logging
 from pathlib import Path
 import sys
 
-from bumper.db import bot_repo, client_repo, token_repo
+from bumper.db import bot_repo, clean_log_repo, client_repo, db, token_repo
 from bumper.db.migration import migrate_db
+from bumper.db.worker import run_in_db
 from bumper.mqtt import helper_bot, server as server_mqtt
 from bumper.utils import utils
 from bumper.utils.certs import generate_certificates
 from bumper.utils.log_helper import LogHelper
+from bumper.utils.loop_monitor import loop_monitor
 from bumper.utils.settings import config as bumper_isc
 from bumper.web import server as server_web
 from bumper.xmpp import xmpp as server_xmpp
@@ -21,6 +24,10 @@ LogHelper()
 
 _LOGGER = logging.getLogger(__name__)
 
+# Bounds in seconds for the maintenance loop, which otherwise sleeps until the next token expires
+MAINTENANCE_INTERVAL_MIN = 1.0
+MAINTENANCE_INTERVAL_MAX = 60.0
+
 
 async def start() -> None:
     """Start Bumper."""
@@ -47,9 +54,11 @@ async def start_configuration() -> None:
     generate_certificates()
 
     migrate_db()
+    clean_log_repo.reshard()
 
-    bot_repo.reset_all_connections()
-    client_repo.reset_all_connections()
+    with db.batch():
+        bot_repo.reset_all_connections()
+        client_repo.reset_all_connections()
 
     if bumper_isc.BUMPER_PROXY_MQTT is True:
         _LOGGER.info("Proxy MQTT Enabled")
@@ -76,6 +85,16 @@ async def start_configuration() -> None:
 
 async def start_service() -> None:
     """Start Bumper services."""
+    # Start periodic database flush
+    utils.store_service(db.flush_loop())
+    # Start event loop lag sampling
+    utils.store_service(loop_monitor.run())
+    # Start periodic connection state snapshots
+    utils.store_service(save_presence_loop())
+    # Start clean log retention
+    if bumper_isc.CLEAN_LOG_MAX_AGE_DAYS > 0 or bumper_isc.CLEAN_LOG_MAX_PER_BOT > 0:
+        utils.store_service(compact_clean_logs())
+
     # Start XMPP Server
     if bumper_isc.xmpp_server is not None:
         utils.store_service(bumper_isc.xmpp_server.start_async_server())
@@ -103,12 +122,53 @@ async def maintenance() -> None:
     """Run periodic maintenance tasks."""
     try:
         while not bumper_isc.shutting_down:
-            token_repo.revoke_expired()
-            await asyncio.sleep(5)
+            await run_in_db(token_repo.revoke_expired)
+            await asyncio.sleep(_maintenance_delay(await run_in_db(token_repo.next_expiration)))
+    except asyncio.CancelledError:
+        pass
+
+
+async def save_presence_loop() -> None:
+    """Write changed connection states to the database periodically until shutdown."""
+    try:
+        while not bumper_isc.shutting_down:
+            await asyncio.sleep(bumper_isc.PRESENCE_SNAPSHOT_INTERVAL)
+            try:
+                await run_in_db(save_presence)
+            except Exception:
+                _LOGGER.exception("Failed to save connection states")
     except asyncio.CancelledError:
         pass
 
 
+def save_presence() -> None:
+    """Write changed connection states of bots and clients to the database."""
+    with db.batch():
+        bot_repo.save_presence()
+        client_repo.save_presence()
+
+
+async def compact_clean_logs() -> None:
+    """Apply the clean log retention limits periodically until shutdown."""
+    try:
+        while not bumper_isc.shutting_down:
+            try:
+                await run_in_db(clean_log_repo.compact, bumper_isc.CLEAN_LOG_MAX_AGE_DAYS, bumper_isc.CLEAN_LOG_MAX_PER_BOT)
+            except Exception:
+                _LOGGER.exception("Failed to compact clean logs")
+            await asyncio.sleep(bumper_isc.CLEAN_LOG_COMPACT_INTERVAL)
+    except asyncio.CancelledError:
+        pass
+
+
+def _maintenance_delay(next_expiration: datetime | None) -> float:
+    """Return seconds until the next maintenance run, waiting for the next token expiry."""
+    if next_expiration is None:
+        return MAINTENANCE_INTERVAL_MAX
+    delay = (next_expiration - datetime.now(tz=bumper_isc.LOCAL_TIMEZONE)).total_seconds()
+    return min(max(delay, MAINTENANCE_INTERVAL_MIN), MAINTENANCE_INTERVAL_MAX)
+
+
 async def shutdown() -> None:
     """Shutdown Bumper."""
     _LOGGER.info("Shutting down...")
@@ -137,6 +197,9 @@ async def shutdown() -> None:
     with suppress(asyncio.CancelledError):
         await asyncio.gather(*tasks)
 
+    # Persist pending database changes
+    db.close_db()
+
     _LOGGER.info("Shutdown complete!")
 
 
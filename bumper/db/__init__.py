@@ -1,10 +1,12 @@
 """Export database repository classes."""
 
-from .bots import BotRepo
-from .clean_logs import CleanLogRepo
-from .clients import ClientRepo
-from .tokens import TokenRepo
-from .users import UserRepo
+from .bots import AsyncBotRepo, BotRepo
+from .clean_logs import AsyncCleanLogRepo, CleanLogRepo
+from .clients import AsyncClientRepo, ClientRepo
+from .presence import PresenceRegistry, presence
+from .tokens import AsyncTokenRepo, TokenRepo
+from .users import AsyncUserRepo, UserRepo
+from .worker import AsyncRepo
 
 user_repo = UserRepo()
 token_repo = TokenRepo()
@@ -12,4 +14,35 @@ clean_log_repo = CleanLogRepo()
 client_repo = ClientRepo()
 bot_repo = BotRepo()
 
-__all__ = ["BotRepo", "CleanLogRepo", "ClientRepo", "TokenRepo", "UserRepo"]
+# Awaitable variants, running each call on the database worker thread
+async_user_repo = AsyncUserRepo(user_repo)
+async_token_repo = AsyncTokenRepo(token_repo)
+async_clean_log_repo = AsyncCleanLogRepo(clean_log_repo)
+async_client_repo = AsyncClientRepo(client_repo)
+async_bot_repo = AsyncBotRepo(bot_repo)
+
+__all__ = [
+    "AsyncBotRepo",
+    "AsyncCleanLogRepo",
+    "AsyncClientRepo",
+    "AsyncRepo",
+    "AsyncTokenRepo",
+    "AsyncUserRepo",
+    "BotRepo",
+    "CleanLogRepo",
+    "ClientRepo",
+    "PresenceRegistry",
+    "TokenRepo",
+    "UserRepo",
+    "async_bot_repo",
+    "async_clean_log_repo",
+    "async_client_repo",
+    "async_token_repo",
+    "async_user_repo",
+    "bot_repo",
+    "clean_log_repo",
+    "client_repo",
+    "presence",
+    "token_repo",
+    "user_repo",
+]
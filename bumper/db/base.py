@@ -1,59 +1,340 @@
 """Provide base repository with common TinyDB operations."""
 
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
 from typing import Any
 
 from tinydb.queries import QueryLike
 from tinydb.table import Document, Table
 
-from .db import get_db
+from .db import batch, get_db, mark_dirty
 from .helpers import warn_if_not_doc
+from .index import IndexKey, OrderedField, TableIndex
+from .model_cache import Decoder, ModelCache
+from .op_timing import timed, timed_read
+from .worker import db_lock
+
+# Field/value pairs a document has to match, resolved through the repo indexes where possible
+Criteria = Mapping[str, Any]
 
 
 class BaseRepo:
-    """Abstract base class for table-specific repos."""
+    """Abstract base class for table-specific repos.
+
+    All table access goes through the helpers below, which hold the database lock, so repos
+    can be used from the event loop and from the database worker thread alike. Lookups and
+    writes are timed per table in `op_timings`.
+    """
+
+    # Fields with a hash index, used when a lookup is done by criteria
+    indexes: tuple[str, ...] = ()
+    # List fields indexed by each of their elements, criteria match when the list contains the value
+    multi_indexes: tuple[str, ...] = ()
+    # Fields kept sorted by value, for range lookups, a tuple of fields is sorted by all of them
+    ordered_indexes: tuple[OrderedField, ...] = ()
 
     def __init__(self, table_name: str) -> None:
         self._table_name: str = table_name
+        self._index = TableIndex(self.indexes, self.multi_indexes, self.ordered_indexes)
+        self.model_cache = ModelCache()
 
     @property
     def table(self) -> Table:
         """Return the TinyDB table for this repo."""
         return get_db().table(self._table_name)
 
-    def _upsert(self, data: dict[str, Any] | None, query: QueryLike) -> list[int]:
+    def _raw_table(self) -> dict[str, Any] | None:
+        """Return the cached raw table (doc_id as str -> document), None if not yet created."""
+        tables = get_db().storage.read()
+        return tables.get(self._table_name) if tables else None
+
+    @timed
+    def _upsert(self, data: dict[str, Any] | None, query: QueryLike | Criteria) -> list[int]:
         """Insert or update a record."""
         if data is None:
             return []
-        return self.table.upsert(data, query)
+        with db_lock:
+            before = self._raw_table()
+            if isinstance(query, Mapping):
+                if doc_ids := [doc.doc_id for doc in self._search(query)]:
+                    doc_ids = self.table.update(data, doc_ids=doc_ids)
+                else:
+                    doc_ids = [self.table.insert(data)]
+            else:
+                doc_ids = self.table.upsert(data, query)
+            self._written(before, doc_ids)
+            return doc_ids
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Apply the mutations of the block atomically, they are persisted by the same flush."""
+        with batch():
+            yield
+
+    @timed
+    def update_many(self, data: dict[str, Any], query: QueryLike | Criteria | None = None) -> list[int]:
+        """Apply the same fields to all documents matching the query (all if None) with a single table write."""
+        with db_lock:
+            before = self._raw_table()
+            doc_ids = [int(i) for i in before or {}] if query is None else [doc.doc_id for doc in self._get_multi(query)]
+            if not doc_ids:
+                return []
+            doc_ids = self.table.update(data, doc_ids=doc_ids)
+            self._written(before, doc_ids)
+            return doc_ids
+
+    @timed
+    def upsert_many(self, items: Iterable[tuple[dict[str, Any], Criteria]]) -> list[int]:
+        """Insert or update many records, with one table write for all updates and one for all inserts.
+
+        Items with equal criteria are merged, later fields win.
+        """
+        merged: dict[tuple[tuple[str, Any], ...], tuple[Criteria, dict[str, Any]]] = {}
+        for data, criteria in items:
+            key = tuple(sorted(criteria.items()))
+            merged[key] = (criteria, {**merged[key][1], **data} if key in merged else data)
+
+        with db_lock:
+            updates: dict[int, dict[str, Any]] = {}
+            inserts: list[dict[str, Any]] = []
+            for criteria, data in merged.values():
+                if matches := self._search(criteria):
+                    for doc in matches:
+                        updates[doc.doc_id] = {**updates.get(doc.doc_id, {}), **data}
+                else:
+                    inserts.append(data)
+
+            doc_ids: list[int] = []
+            if updates:
+                raw = self._raw_table() or {}
+                # TinyDB hands the stored document objects to the callable, so they can be told apart by identity
+                fields_by_doc = {id(raw[str(doc_id)]): fields for doc_id, fields in updates.items()}
+
+                def apply(doc: Any) -> None:
+                    doc.update(fields_by_doc[id(doc)])
+
+                doc_ids = self.table.update(apply, doc_ids=list(updates))
+                self._written(raw, doc_ids)
+            if inserts:
+                before = self._raw_table()
+                inserted = self.table.insert_multiple(inserts)
+                self._written(before, inserted)
+                doc_ids += inserted
+            return doc_ids
+
+    @timed
+    def _insert(self, data: dict[str, Any]) -> int:
+        """Insert a new record."""
+        with db_lock:
+            before = self._raw_table()
+            doc_id = self.table.insert(data)
+            self._written(before, [doc_id])
+            return doc_id
+
+    @timed_read
+    def _all(self) -> list[Document]:
+        """Return all documents."""
+        with db_lock:
+            return self.table.all()
+
+    @timed_read
+    def _all_models(self, decode: Decoder) -> list[Any]:
+        """Return all documents decoded as models, cached until they change."""
+        with db_lock:
+            return self.model_cache.all(self._raw_table(), decode)
+
+    def _model_chunks(self, decode: Decoder, chunk_size: int) -> Iterator[list[Any]]:
+        """Yield all documents decoded as models in chunks, holding the database lock only while a chunk is decoded.
 
-    def _get(self, query: QueryLike) -> Document | None:
+        Documents removed meanwhile are skipped, documents inserted after the first chunk are not yielded.
+        """
+        with db_lock:
+            doc_ids = [int(doc_id) for doc_id in self._raw_table() or {}]
+        for start in range(0, len(doc_ids), chunk_size):
+            with db_lock:
+                raw_table = self._raw_table()
+                chunk = [
+                    model
+                    for doc_id in doc_ids[start : start + chunk_size]
+                    if (model := self.model_cache.get(raw_table, doc_id, decode)) is not None
+                ]
+            if chunk:
+                yield chunk
+
+    @timed_read
+    def _get_model(self, query: QueryLike | Criteria, decode: Decoder) -> Any | None:
+        """Return the document matching the query decoded as model, cached until it changes."""
+        with db_lock:
+            if (rec := self._get(query)) is None:
+                return None
+            return self.model_cache.get(self._raw_table(), rec.doc_id, decode)
+
+    @timed_read
+    def _get(self, query: QueryLike | Criteria) -> Document | None:
         """Retrieve a document matching the query."""
-        rec = self.table.get(query)
-        warn_if_not_doc(rec, f"{self._table_name}.get result ({query.__dict__})")
+        with db_lock:
+            rec = next(iter(self._search(query)), None) if isinstance(query, Mapping) else self.table.get(query)
+        warn_if_not_doc(rec, f"{self._table_name}.get result ({query if isinstance(query, Mapping) else query.__dict__})")
         return rec if isinstance(rec, dict | Document) else None
 
-    def _get_first(self, query: QueryLike) -> Document | None:
+    def _get_first(self, query: QueryLike | Criteria) -> Document | None:
         """Get first document matching query (from potentially many)."""
         return next(iter(self._get_multi(query)), None)
 
-    def _get_multi(self, query: QueryLike) -> list[Document]:
+    @timed_read
+    def _get_multi(self, query: QueryLike | Criteria) -> list[Document]:
         """Retrieve a document or list of documents matching the query."""
-        return self.table.search(query)
+        with db_lock:
+            if isinstance(query, Mapping):
+                return self._search(query)
+            return self.table.search(query)
+
+    @timed_read
+    def _get_range(
+        self,
+        field: str,
+        lower: float | str | None = None,
+        upper: float | str | None = None,
+        limit: int | None = None,
+    ) -> list[Document]:
+        """Retrieve documents with lower <= field < upper of an ordered index, sorted by the field."""
+        with db_lock:
+            raw_table = self._raw_table()
+            raw = raw_table or {}
+            ids = self._index.lookup_range(raw_table, field, lower, upper, limit)
+            return [Document(doc, doc_id=i) for i in ids if (doc := raw.get(str(i))) is not None]
+
+    def _iter_ordered(
+        self,
+        field: OrderedField,
+        reverse: bool = False,
+        after: IndexKey | None = None,
+        after_id: int | None = None,
+    ) -> Iterator[tuple[IndexKey, int]]:
+        """Yield (key, doc id) of an ordered index in key order, the caller has to hold the database lock."""
+        return self._index.iter_ordered(self._raw_table(), field, reverse, after, after_id)
 
-    def _remove(self, query: QueryLike) -> None:
+    @timed_read
+    def _count_ordered(self, field: OrderedField) -> int:
+        """Return the number of documents covered by an ordered index."""
+        with db_lock:
+            return self._index.count_ordered(self._raw_table(), field)
+
+    @timed_read
+    def _model_by_id(self, doc_id: int, decode: Decoder) -> Any | None:
+        """Return a document decoded as model by its id, cached until it changes."""
+        with db_lock:
+            return self.model_cache.get(self._raw_table(), doc_id, decode)
+
+    @timed
+    def _remove(self, query: QueryLike | Criteria) -> None:
         """Remove a document matching the query."""
-        rec = self.table.get(query)
-        if isinstance(rec, Document):
-            self.table.remove(doc_ids=[rec.doc_id])
+        with db_lock:
+            rec = self._get(query)
+            if isinstance(rec, Document):
+                self._remove_ids([rec.doc_id])
+
+    @timed
+    def _remove_multi(self, query: QueryLike | Criteria) -> None:
+        """Remove all documents matching the query."""
+        with db_lock:
+            self._remove_ids([doc.doc_id for doc in self._get_multi(query)])
+
+    @timed
+    def _remove_ids(self, doc_ids: Iterable[int]) -> None:
+        """Remove documents by their ids."""
+        if not (doc_ids := list(doc_ids)):
+            return
+        with db_lock:
+            before = self._raw_table()
+            self.table.remove(doc_ids=doc_ids)
+            after = self._raw_table()
+            self._index.removed(before, after, doc_ids)
+            self.model_cache.changed(before, after, doc_ids)
+            self._derived_changed(before, after, doc_ids)
+            mark_dirty(self._table_name, doc_ids)
 
-    def update_list_field(self, query: QueryLike, field: str, value: Any, add: bool) -> bool:
+    def _truncate(self) -> None:
+        """Remove all documents."""
+        with db_lock:
+            self.table.truncate()
+
+    def _written(self, before: dict[str, Any] | None, doc_ids: list[int]) -> None:
+        """Update indexes and report changed documents after an insert or update."""
+        after = self._raw_table()
+        self._index.changed(before, after, doc_ids)
+        self.model_cache.changed(before, after, doc_ids)
+        self._derived_changed(before, after, doc_ids)
+        mark_dirty(self._table_name, doc_ids)
+
+    def _derived_changed(self, before: dict[str, Any] | None, after: dict[str, Any] | None, doc_ids: list[int]) -> None:
+        """Report written or removed documents to further state derived from the table, for subclasses."""
+
+    def _search(self, criteria: Criteria) -> list[Document]:
+        """Return documents matching all criteria, using an index for the first indexed field."""
+        raw_table = self._raw_table()
+        raw = raw_table or {}
+        field = next((f for f in criteria if f in self._index), None)
+        if field is None:
+            candidates: Iterable[tuple[int, dict[str, Any]]] = ((int(i), doc) for i, doc in raw.items())
+        else:
+            ids = sorted(self._index.lookup(raw_table, field, criteria[field]))
+            candidates = ((i, doc) for i in ids if (doc := raw.get(str(i))) is not None)
+        return [Document(doc, doc_id=doc_id) for doc_id, doc in candidates if self._matches(doc, criteria)]
+
+    def _matches(self, doc: Mapping[str, Any], criteria: Criteria) -> bool:
+        """Check a document against criteria, list fields match when they contain the value."""
+        for field, value in criteria.items():
+            if field not in doc:
+                return False
+            if field in self.multi_indexes:
+                if not isinstance(doc[field], list) or value not in doc[field]:
+                    return False
+            elif doc[field] != value:
+                return False
+        return True
+
+    def extend_list_field(self, query: QueryLike | Criteria, field: str, values: Iterable[Any]) -> bool:
+        """Add all missing items to a list field with a single write."""
+        return self.update_sets(query, add={field: values})
+
+    @timed
+    def update_list_field(self, query: QueryLike | Criteria, field: str, value: Any, add: bool) -> bool:
         """Add or remove an item in a list field."""
-        rec = self._get(query)
-        if not isinstance(rec, Document):
-            return False
-        lst = list(rec.get(field, []))
-        if add and value not in lst:
-            lst.append(value)
-        elif not add and value in lst:
-            lst.remove(value)
-        return len(self._upsert({field: lst}, query)) > 0
+        return self.update_sets(query, add={field: [value]}) if add else self.update_sets(query, remove={field: [value]})
+
+    @timed
+    def update_sets(
+        self,
+        query: QueryLike | Criteria,
+        add: Mapping[str, Iterable[Any]] | None = None,
+        remove: Mapping[str, Iterable[Any]] | None = None,
+    ) -> bool:
+        """Add and remove items of list fields with set semantics, atomically and with at most one write.
+
+        Lists keep their order, new items are appended. Nothing is written if all lists
+        already match. Returns False if no document matches the query.
+        """
+        add, remove = add or {}, remove or {}
+        with db_lock:
+            rec = self._get(query)
+            if not isinstance(rec, Document):
+                return False
+            fields: dict[str, list[Any]] = {}
+            for field in add.keys() | remove.keys():
+                current = rec.get(field)
+                current = current if isinstance(current, list) else []
+                present = set(current)
+                drop = present.intersection(remove.get(field, ()))
+                items = [v for v in current if v not in drop] if drop else list(current)
+                present -= drop
+                for value in add.get(field, ()):
+                    if value not in present:
+                        present.add(value)
+                        items.append(value)
+                if drop or len(items) != len(current):
+                    fields[field] = items
+            if fields:
+                before = self._raw_table()
+                self._written(before, self.table.update(fields, doc_ids=[rec.doc_id]))
+            return True
@@ -1,15 +1,15 @@
 """Bot management operations."""
 
+from collections.abc import Iterator
 import logging
 from typing import Any
 
-from tinydb.table import Document
-
 from bumper.web.utils import models
 
 from .base import BaseRepo
-from .db import TABLE_BOTS, query_instance
-from .helpers import warn_if_not_doc
+from .db import TABLE_BOTS
+from .presence import Transport, presence
+from .worker import AsyncRepo, async_method
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,56 +17,83 @@ _LOGGER = logging.getLogger(__name__)
 class BotRepo(BaseRepo):
     """DAO for bot records."""
 
+    indexes = ("did",)
+
     def __init__(self) -> None:
         super().__init__(TABLE_BOTS)
 
     def add(self, name: str, did: str, class_id: str, resource: str, company: str) -> None:
         """Add a new bot."""
-        q = query_instance.did == did
+        q = {"did": did}
         if not self._get(q):
-            bot = models.VacBotDevice(did=did, name=name, resource=resource, company=company)
-            bot.class_id = class_id
+            bot = models.VacBotDevice(did=did, class_id=class_id, name=name, resource=resource, company=company)
             self._upsert(bot.as_dict(), q)
 
     def get(self, did: str) -> models.VacBotDevice | None:
         """Get bot by device ID."""
-        rec = self._get(query_instance.did == did)
-        return models.VacBotDevice.from_dict(rec) if isinstance(rec, dict | Document) else None
+        bot = self._get_model({"did": did}, models.VacBotDevice.from_dict)
+        return presence.apply("bot", bot.did, bot) if bot is not None else None
 
     def list_all(self) -> list[models.VacBotDevice]:
         """List all bots."""
-        bots = []
-        for rec in self.table.all():
-            warn_if_not_doc(rec, "BotRepo.list_all entry")
-            bots.append(models.VacBotDevice.from_dict(rec))
-        return bots
+        return [presence.apply("bot", bot.did, bot) for bot in self._all_models(models.VacBotDevice.from_dict)]
+
+    def list_chunks(self, chunk_size: int) -> Iterator[list[models.VacBotDevice]]:
+        """List all bots in chunks of at most chunk_size bots, decoded one chunk at a time."""
+        for chunk in self._model_chunks(models.VacBotDevice.from_dict, chunk_size):
+            yield [presence.apply("bot", bot.did, bot) for bot in chunk]
 
     def remove(self, did: str) -> None:
         """Remove a bot by device ID."""
-        self._remove(query_instance.did == did)
+        self._remove({"did": did})
 
     def set_nick(self, did: str | None, nick: str) -> None:
         """Set bot nickname."""
         self._set_field(did, "nick", nick)
 
     def set_mqtt(self, did: str | None, mqtt: bool) -> None:
-        """Set MQTT connection status."""
-        self._set_field(did, "mqtt_connection", mqtt)
+        """Set MQTT connection status of a known bot, kept in memory until the next presence snapshot."""
+        self._set_presence(did, "mqtt", mqtt)
 
     def set_xmpp(self, did: str | None, xmpp: bool) -> None:
-        """Set XMPP connection status."""
-        self._set_field(did, "xmpp_connection", xmpp)
+        """Set XMPP connection status of a known bot, kept in memory until the next presence snapshot."""
+        self._set_presence(did, "xmpp", xmpp)
 
     def reset_all_connections(self) -> None:
         """Reset all bots connection statuses."""
-        for rec in self.table.all():
-            bot_id = rec.get("did")
-            self.set_mqtt(bot_id, False)
-            self.set_xmpp(bot_id, False)
+        presence.reset("bot")
+        self.update_many({"mqtt_connection": False, "xmpp_connection": False})
+
+    def save_presence(self) -> int:
+        """Write connection statuses changed since the last call to the database."""
+        return presence.snapshot("bot", self, "did")
+
+    def _set_presence(self, did: str | None, transport: Transport, connected: bool) -> None:
+        if did is None:
+            field = f"{transport}_connection"
+            _LOGGER.warning(
+                f"Failed to updated field as did is not set for :: DID: {did} :: field: {field} :: value: {connected}",
+            )
+            return
+        if self._get({"did": did}) is None:
+            _LOGGER.debug(f"Connection status of unknown bot ignored :: DID: {did} :: {transport}: {connected}")
+            return
+        presence.set("bot", did, transport, connected)
 
     def _set_field(self, did: str | None, field: str, value: Any) -> None:
         """Set a specific field for a bot."""
         if did is None:
             _LOGGER.warning(f"Failed to updated field as did is not set for :: DID: {did} :: field: {field} :: value: {value}")
             return
-        self._upsert({field: value}, query_instance.did == did)
+        self._upsert({field: value}, {"did": did})
+
+
+class AsyncBotRepo(AsyncRepo[BotRepo]):
+    """Awaitable view of the bot repo."""
+
+    add = async_method(BotRepo.add)
+    get = async_method(BotRepo.get)
+    list_all = async_method(BotRepo.list_all)
+    remove = async_method(BotRepo.remove)
+    set_mqtt = async_method(BotRepo.set_mqtt)
+    set_nick = async_method(BotRepo.set_nick)
@@ -0,0 +1,139 @@
+"""Running totals of clean logs per bot, day and clean type."""
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from bumper.utils.settings import config as bumper_isc
+from bumper.utils.utils import to_int
+
+# Marker for totals which were never built or lost track of their table
+_STALE = object()
+# Timestamps from here on are milliseconds, bots report the start either in seconds or in milliseconds
+_TS_MS_FROM = 100_000_000_000
+
+
+def _ts_seconds(ts: float) -> float:
+    """Return a clean log timestamp in seconds."""
+    return ts / 1000 if ts >= _TS_MS_FROM else ts
+
+
+# Totals are kept per (day, type) of a bot
+Bucket = tuple[str | None, str | None]
+
+
+@dataclass(slots=True)
+class Totals:
+    """Number of clean logs with their cleaned area and cleaning time."""
+
+    count: int = 0
+    area: int = 0
+    time: int = 0  # seconds
+
+    def add(self, other: "Totals", sign: int = 1) -> None:
+        """Add (or with sign -1 subtract) other totals."""
+        self.count += sign * other.count
+        self.area += sign * other.area
+        self.time += sign * other.time
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the totals as dict."""
+        return {"count": self.count, "area": self.area, "time": self.time}
+
+
+def _day(ts: Any) -> str | None:
+    """Return the local day of a clean log start, None if it has no valid timestamp."""
+    if (value := to_int(ts)) is None or value <= 0:
+        return None
+    return datetime.fromtimestamp(_ts_seconds(value), tz=bumper_isc.LOCAL_TIMEZONE).date().isoformat()
+
+
+def _contribution(doc: Mapping[str, Any]) -> tuple[str | None, Bucket, Totals]:
+    """Return bot, bucket and totals a clean log adds."""
+    totals = Totals(1, to_int(doc.get("area")) or 0, to_int(doc.get("last")) or 0)
+    return doc.get("did"), (_day(doc.get("ts")), doc.get("type")), totals
+
+
+class CleanLogStats:
+    """Clean log totals of a single table per bot and per (day, type), updated with every write.
+
+    Like TableIndex, the totals remember the raw table dict they were built from and the
+    contribution of every document, so updates and removals are applied incrementally.
+    A write not reported through `changed` makes the next query rebuild them.
+
+    The totals are not persisted, the first query after startup builds them by a single scan of the table.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: dict[str | None, dict[Bucket, Totals]] = {}
+        self._docs: dict[int, tuple[str | None, Bucket, Totals]] = {}
+        self._source: object = _STALE
+        self.rebuilds = 0
+
+    def buckets(self, raw_table: Mapping[str, Any] | None, did: str) -> dict[Bucket, Totals]:
+        """Return a copy of the totals per (day, type) of a bot."""
+        self._sync(raw_table)
+        return {bucket: Totals(t.count, t.area, t.time) for bucket, t in self._buckets.get(did, {}).items()}
+
+    def dids(self, raw_table: Mapping[str, Any] | None) -> list[str]:
+        """Return all bots having clean logs."""
+        self._sync(raw_table)
+        return [did for did in self._buckets if did is not None]
+
+    def changed(self, before: Mapping[str, Any] | None, after: Mapping[str, Any] | None, doc_ids: Iterable[int]) -> None:
+        """Apply documents inserted, updated or removed by a write which turned `before` into `after`."""
+        if self._source is not before or after is None:
+            self._source = _STALE
+            return
+        for doc_id in doc_ids:
+            self._discard(doc_id)
+            if (doc := after.get(str(doc_id))) is not None:
+                self._add(doc_id, doc)
+        self._source = after
+
+    def _sync(self, raw_table: Mapping[str, Any] | None) -> None:
+        """Rebuild the totals if the table changed without being reported."""
+        if self._source is raw_table:
+            return
+        self._buckets = {}
+        self._docs = {}
+        for doc_id, doc in (raw_table or {}).items():
+            self._add(int(doc_id), doc)
+        self._source = raw_table
+        self.rebuilds += 1
+
+    def _add(self, doc_id: int, doc: Mapping[str, Any]) -> None:
+        did, bucket, totals = self._docs[doc_id] = _contribution(doc)
+        self._buckets.setdefault(did, {}).setdefault(bucket, Totals()).add(totals)
+
+    def _discard(self, doc_id: int) -> None:
+        if (entry := self._docs.pop(doc_id, None)) is None:
+            return
+        did, bucket, totals = entry
+        buckets = self._buckets[did]
+        buckets[bucket].add(totals, -1)
+        if not buckets[bucket].count:
+            del buckets[bucket]
+            if not buckets:
+                del self._buckets[did]
+
+
+def summary(did: str, buckets: Mapping[Bucket, Totals]) -> dict[str, Any]:
+    """Return the totals of a bot overall, per day and per type.
+
+    Clean logs without timestamp or type only count towards the overall totals.
+    """
+    total = Totals()
+    by_day: dict[str | None, Totals] = {}
+    by_type: dict[str | None, Totals] = {}
+    for (day, clean_type), totals in sorted(buckets.items(), key=lambda item: (item[0][0] or "", item[0][1] or "")):
+        total.add(totals)
+        by_day.setdefault(day, Totals()).add(totals)
+        by_type.setdefault(clean_type, Totals()).add(totals)
+    return {
+        "did": did,
+        **total.as_dict(),
+        "days": {day: t.as_dict() for day, t in by_day.items() if day is not None},
+        "types": {clean_type: t.as_dict() for clean_type, t in by_type.items() if clean_type is not None},
+    }
@@ -1,46 +1,377 @@
 """Manage clean log entries."""
 
+from collections import Counter
+from collections.abc import Iterator, Mapping
+from datetime import UTC, datetime, timedelta
+import heapq
+from itertools import chain, islice
 import logging
+import math
+from operator import itemgetter
+from typing import Any
 
 from tinydb.table import Document
 
+from bumper.utils.settings import config as bumper_isc
+from bumper.utils.utils import to_int
 from bumper.web.utils.models import CleanLog
 
 from .base import BaseRepo
-from .db import TABLE_CLEAN_LOGS, query_instance
+from .clean_log_stats import _TS_MS_FROM, Bucket, CleanLogStats, Totals, _ts_seconds, summary
+from .db import TABLE_CLEAN_LOGS, get_db
+from .index import IndexKey
+from .op_timing import timed_read
+from .worker import AsyncRepo, async_method, db_lock
 
 _LOGGER = logging.getLogger(__name__)
 
+# Per-bot tables are named <TABLE_CLEAN_LOGS>/<did>
+SHARD_PREFIX = f"{TABLE_CLEAN_LOGS}/"
+# Dashboard order of clean logs, ties are broken by clean_log_id and then by doc id (clean logs of the
+# same LOG_ID with another type), so keyset pagination never skips one
+SORT_INDEX = ("ts", "did", "clean_log_id")
 
-class CleanLogRepo(BaseRepo):
-    """DAO for clean logs."""
+# Clean logs of a page in sort order, as (key, table, doc id)
+PageEntries = Iterator[tuple[IndexKey, "CleanLogTable", int]]
+# Clean logs collected per lock acquisition while exporting
+EXPORT_CHUNK_SIZE = 1000
 
-    def __init__(self) -> None:
-        super().__init__(TABLE_CLEAN_LOGS)
+
+def _key(doc: Mapping[str, Any]) -> dict[str, Any]:
+    """Return the query identifying a clean log, unique by LOG_ID and TYPE."""
+    return {"clean_log_id": doc.get("clean_log_id"), "type": doc.get("type")}
+
+
+def _page(entries: PageEntries, offset: int, limit: int | None) -> list[CleanLog]:
+    """Decode the clean logs of a page, skipping offset entries."""
+    stop = None if limit is None else offset + limit
+    return [
+        log
+        for _, table, doc_id in islice(entries, offset, stop)
+        if (log := table._model_by_id(doc_id, CleanLog.from_db)) is not None  # noqa: SLF001
+    ]
+
+
+class CleanLogTable(BaseRepo):
+    """DAO for clean logs of a single table."""
+
+    indexes = ("clean_log_id", "did")
+    ordered_indexes = ("ts", SORT_INDEX)
+
+    def __init__(self, table_name: str) -> None:
+        super().__init__(table_name)
+        self._stats = CleanLogStats()
 
     def add_or_update(self, log: CleanLog) -> None:
         """Add or update a clean log entry (ensures uniqueness based on LOG_ID, and TYPE)."""
-        q = (query_instance.clean_log_id == log.clean_log_id) & (query_instance.type == log.type)
-        self._upsert(log.to_db(), q)
+        self._upsert(log.to_db(), {"clean_log_id": log.clean_log_id, "type": log.type})
 
     def list_by_did(self, did: str) -> list[CleanLog]:
         """List clean logs by device ID."""
-        rec = self._get_multi(query_instance.did == did)
+        rec = self._get_multi({"did": did})
         return [CleanLog.from_db(doc) for doc in rec if isinstance(doc, dict)]
 
     def list_by_id(self, clean_log_id: str) -> CleanLog | None:
         """List clean logs by clean log id."""
-        rec = self._get(query_instance.clean_log_id == clean_log_id)
+        rec = self._get({"clean_log_id": clean_log_id})
         return CleanLog.from_db(rec) if isinstance(rec, dict | Document) else None
 
     def list_all(self) -> list[CleanLog]:
         """List all clean logs."""
-        return [CleanLog.from_db(doc) for doc in self.table.all() if isinstance(doc, dict)]
+        return self._all_models(CleanLog.from_db)
+
+    @timed_read
+    def page(self, offset: int = 0, limit: int | None = None, after: CleanLog | None = None) -> list[CleanLog]:
+        """Return clean logs newest first, sorted by (ts, did).
+
+        For keyset pagination pass the last clean log of the previous page as `after`, the
+        cost then only depends on `limit`. Clean logs without timestamp are not listed.
+        """
+        with db_lock:
+            return _page(self._page_entries(after), offset, limit)
+
+    def count(self) -> int:
+        """Return the number of clean logs listed by `page`."""
+        return self._count_ordered(SORT_INDEX)
+
+    def stats(self, did: str | None = None) -> list[dict[str, Any]]:
+        """Return clean log totals overall, per day and per type, of a bot or of all bots.
+
+        The totals are kept in memory and up to date with every write, only the first query
+        after startup scans the clean logs to build them. They cover the clean logs still stored,
+        logs removed by `compact` are subtracted.
+        """
+        with db_lock:
+            dids = [did] if did is not None else sorted(self._dids())
+            return [summary(d, self._buckets(d)) for d in dids]
+
+    def export(
+        self,
+        did: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """Yield clean logs oldest first in chunks, optionally of a bot and started within [since, until) in seconds.
+
+        The database lock is held only while a chunk is collected, so exporting a long
+        history neither blocks writers nor loads all clean logs at once. Clean logs without
+        timestamp are not exported.
+        """
+        # Timestamps in seconds sort before the ones in milliseconds, so each unit is a range of its own
+        lower, upper = since or 0, until if until is not None else math.inf
+        ranges = [
+            chain.from_iterable(self._export_range(first, end, chunk_size, did))
+            for first, end in ((lower, min(upper, _TS_MS_FROM)), (max(lower * 1000, _TS_MS_FROM), upper * 1000))
+            if first < end
+        ]
+        rows = heapq.merge(*ranges, key=lambda row: _ts_seconds(row["ts"]))
+        while chunk := list(islice(rows, chunk_size)):
+            yield chunk
 
     def clear(self) -> None:
         """Clear all clean logs."""
-        self.table.truncate()
+        self._truncate()
 
     def remove_by_id(self, clean_log_id: str) -> None:
         """Remove a clean log entry by its clean_log_id."""
-        self._remove(query_instance.clean_log_id == clean_log_id)
+        self._remove({"clean_log_id": clean_log_id})
+
+    def compact(self, max_age_days: int = 0, max_per_bot: int = 0) -> int:
+        """Drop clean logs older than max_age_days and all but the newest max_per_bot per bot.
+
+        A limit of 0 disables it. Timestamps stored as strings are converted to int first, so
+        they are covered by the ordered index. Returns the number of removed clean logs.
+        """
+        with db_lock:
+            self._normalize_ts()
+            remove: set[int] = set()
+            if max_age_days > 0:
+                cutoff = (datetime.now(tz=UTC) - timedelta(days=max_age_days)).timestamp()
+                remove.update(doc.doc_id for doc in self._get_range("ts", lower=0, upper=min(cutoff, _TS_MS_FROM)))
+                remove.update(doc.doc_id for doc in self._get_range("ts", lower=_TS_MS_FROM, upper=cutoff * 1000))
+            if max_per_bot > 0:
+                kept: Counter[str | None] = Counter()
+                newest_first = sorted(self._get_range("ts", lower=0), key=lambda doc: _ts_seconds(doc["ts"]), reverse=True)
+                for doc in newest_first:
+                    if doc.doc_id in remove:
+                        continue
+                    kept[doc.get("did")] += 1
+                    if kept[doc.get("did")] > max_per_bot:
+                        remove.add(doc.doc_id)
+            self._remove_ids(remove)
+            return len(remove)
+
+    def _buckets(self, did: str) -> dict[Bucket, Totals]:
+        """Return the totals per (day, type) of a bot."""
+        return self._stats.buckets(self._raw_table(), did)
+
+    def _dids(self) -> set[str]:
+        """Return all bots having clean logs."""
+        return set(self._stats.dids(self._raw_table()))
+
+    def _derived_changed(self, before: dict[str, Any] | None, after: dict[str, Any] | None, doc_ids: list[int]) -> None:
+        self._stats.changed(before, after, doc_ids)
+
+    def _export_range(self, start: float, end: float, chunk_size: int, did: str | None) -> Iterator[list[dict[str, Any]]]:
+        """Yield clean logs with start <= ts < end in chunks, resuming from the last key of the previous chunk.
+
+        With a bot, clean logs of other bots are skipped, so a chunk may be shorter than chunk_size.
+        """
+        cursor: IndexKey = ((0, start),)
+        cursor_id: int | None = None
+        while True:
+            chunk: list[dict[str, Any]] = []
+            with db_lock:
+                raw = self._raw_table() or {}
+                entries = list(islice(self._iter_ordered(SORT_INDEX, after=cursor, after_id=cursor_id), chunk_size))
+                for key, doc_id in entries:
+                    rank, ts = key[0]  # type: ignore[misc]
+                    if rank != 0 or not isinstance(ts, int | float) or ts >= end:
+                        entries = []
+                        break
+                    cursor, cursor_id = key, doc_id
+                    doc = raw[str(doc_id)]
+                    if did is None or doc.get("did") == did:
+                        chunk.append(CleanLog.from_db(doc).to_db())
+            if chunk:
+                yield chunk
+            if len(entries) < chunk_size:
+                return
+
+    def _page_entries(self, after: CleanLog | None) -> PageEntries:
+        """Return the entries of the sort index newest first, past `after` if given.
+
+        Clean logs sharing the sort key of `after` (same LOG_ID, other type) are resumed after
+        its document, so a page boundary between them skips neither.
+        """
+        cursor = cursor_id = None
+        if after is not None:
+            doc = after.to_db()
+            if (cursor := self._index.key(SORT_INDEX, doc)) is None:
+                return iter(())
+            cursor_id = next((rec.doc_id for rec in self._search(_key(doc))), None)
+        entries = self._iter_ordered(SORT_INDEX, reverse=True, after=cursor, after_id=cursor_id)
+        return ((key, self, doc_id) for key, doc_id in entries)
+
+    def _normalize_ts(self) -> None:
+        """Convert timestamps stored as strings to int."""
+        items: list[tuple[dict[str, Any], dict[str, Any]]] = [
+            ({"ts": ts}, _key(doc)) for doc in self._get_range("ts", lower="") if (ts := to_int(doc["ts"])) is not None
+        ]
+        if items:
+            self.upsert_many(items)
+
+
+class CleanLogRepo(CleanLogTable):
+    """DAO for clean logs, optionally sharded into one table per bot (`CLEAN_LOG_SHARDING`)."""
+
+    def __init__(self) -> None:
+        super().__init__(TABLE_CLEAN_LOGS)
+        self._shards: dict[str, CleanLogTable] = {}
+
+    def add_or_update(self, log: CleanLog) -> None:
+        """Add or update a clean log entry (ensures uniqueness based on LOG_ID, and TYPE)."""
+        if (shard := self._shard(log.did)) is not None:
+            shard.add_or_update(log)
+        else:
+            super().add_or_update(log)
+
+    def list_by_did(self, did: str) -> list[CleanLog]:
+        """List clean logs by device ID."""
+        if (shard := self._shard(did)) is not None:
+            return shard.list_by_did(did)
+        return super().list_by_did(did)
+
+    def list_by_id(self, clean_log_id: str) -> CleanLog | None:
+        """List clean logs by clean log id."""
+        with db_lock:
+            if (log := super().list_by_id(clean_log_id)) is not None:
+                return log
+            return next((log for shard in self._shard_tables() if (log := shard.list_by_id(clean_log_id))), None)
+
+    def list_all(self) -> list[CleanLog]:
+        """List all clean logs."""
+        with db_lock:
+            return super().list_all() + [log for shard in self._shard_tables() for log in shard.list_all()]
+
+    def page(self, offset: int = 0, limit: int | None = None, after: CleanLog | None = None) -> list[CleanLog]:
+        """Return clean logs of the main table and all per-bot tables newest first, sorted by (ts, did)."""
+        with db_lock:
+            tables = [self, *self._shard_tables()]
+            entries = heapq.merge(*(table._page_entries(after) for table in tables), key=itemgetter(0), reverse=True)  # noqa: SLF001
+            return _page(entries, offset, limit)
+
+    def count(self) -> int:
+        """Return the number of clean logs listed by `page`."""
+        with db_lock:
+            return super().count() + sum(shard.count() for shard in self._shard_tables())
+
+    def export(
+        self,
+        did: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """Yield clean logs of the main table, then of each per-bot table, oldest first per table."""
+        yield from super().export(did, since, until, chunk_size)
+        with db_lock:
+            shards = [shard for shard in self._shard_tables() if did is None or shard._table_name == f"{SHARD_PREFIX}{did}"]  # noqa: SLF001
+        for shard in shards:
+            yield from shard.export(did, since, until, chunk_size)
+
+    def clear(self) -> None:
+        """Clear all clean logs."""
+        with db_lock:
+            super().clear()
+            for name in [shard._table_name for shard in self._shard_tables()]:  # noqa: SLF001
+                self._drop_shard(name)
+
+    def remove_by_id(self, clean_log_id: str) -> None:
+        """Remove a clean log entry by its clean_log_id."""
+        with db_lock:
+            super().remove_by_id(clean_log_id)
+            for shard in self._shard_tables():
+                shard.remove_by_id(clean_log_id)
+
+    def compact(self, max_age_days: int = 0, max_per_bot: int = 0) -> int:
+        """Apply the retention limits to the main table and all per-bot tables."""
+        with db_lock:
+            removed = super().compact(max_age_days, max_per_bot)
+            removed += sum(shard.compact(max_age_days, max_per_bot) for shard in self._shard_tables())
+        if removed:
+            _LOGGER.info(f"Clean logs compacted :: removed: {removed}")
+        return removed
+
+    def reshard(self) -> int:
+        """Move clean logs between the main table and the per-bot tables to match `CLEAN_LOG_SHARDING`.
+
+        Returns the number of moved clean logs.
+        """
+        with db_lock:
+            moved = 0
+            if bumper_isc.CLEAN_LOG_SHARDING:
+                by_did: dict[str, list[Document]] = {}
+                for doc in self._all():
+                    if did := doc.get("did"):
+                        by_did.setdefault(did, []).append(doc)
+                for did, docs in by_did.items():
+                    if (shard := self._shard(did)) is not None:
+                        shard.upsert_many((dict(doc), _key(doc)) for doc in docs)
+                        self._remove_ids(doc.doc_id for doc in docs)
+                        moved += len(docs)
+            else:
+                for shard in self._shard_tables():
+                    docs = shard.table.all()
+                    self.upsert_many((dict(doc), _key(doc)) for doc in docs)
+                    self._drop_shard(shard._table_name)  # noqa: SLF001
+                    moved += len(docs)
+        if moved:
+            _LOGGER.info(f"Clean logs resharded :: sharding: {bumper_isc.CLEAN_LOG_SHARDING} :: moved: {moved}")
+        return moved
+
+    def _buckets(self, did: str) -> dict[Bucket, Totals]:
+        """Return the totals per (day, type) of a bot, from the main and its per-bot table."""
+        buckets = super()._buckets(did)
+        if (name := f"{SHARD_PREFIX}{did}") in get_db().tables():
+            shard = self._shards.get(name) or self._shards.setdefault(name, CleanLogTable(name))
+            for bucket, totals in shard._buckets(did).items():  # noqa: SLF001
+                buckets.setdefault(bucket, Totals()).add(totals)
+        return buckets
+
+    def _dids(self) -> set[str]:
+        """Return all bots having clean logs in the main or a per-bot table."""
+        return super()._dids().union(*(shard._dids() for shard in self._shard_tables()))  # noqa: SLF001
+
+    def _shard(self, did: str | None) -> CleanLogTable | None:
+        """Return the per-bot table of a bot, None when sharding is disabled."""
+        if not bumper_isc.CLEAN_LOG_SHARDING or not did:
+            return None
+        name = f"{SHARD_PREFIX}{did}"
+        if (shard := self._shards.get(name)) is None:
+            shard = self._shards[name] = CleanLogTable(name)
+        return shard
+
+    def _shard_tables(self) -> list[CleanLogTable]:
+        """Return all existing per-bot tables, regardless of the sharding setting."""
+        names = sorted(name for name in get_db().tables() if name.startswith(SHARD_PREFIX))
+        return [self._shards.get(name) or self._shards.setdefault(name, CleanLogTable(name)) for name in names]
+
+    def _drop_shard(self, name: str) -> None:
+        get_db().drop_table(name)
+        self._shards.pop(name, None)
+
+
+class AsyncCleanLogRepo(AsyncRepo[CleanLogRepo]):
+    """Awaitable view of the clean log repo."""
+
+    add_or_update = async_method(CleanLogRepo.add_or_update)
+    clear = async_method(CleanLogRepo.clear)
+    count = async_method(CleanLogRepo.count)
+    list_all = async_method(CleanLogRepo.list_all)
+    list_by_did = async_method(CleanLogRepo.list_by_did)
+    list_by_id = async_method(CleanLogRepo.list_by_id)
+    page = async_method(CleanLogRepo.page)
+    remove_by_id = async_method(CleanLogRepo.remove_by_id)
+    stats = async_method(CleanLogRepo.stats)
@@ -1,14 +1,14 @@
 """Client management operations."""
 
+from collections.abc import Iterator
 import logging
 
-from tinydb.table import Document
-
 from bumper.web.utils import models
 
 from .base import BaseRepo
-from .db import TABLE_CLIENTS, query_instance
-from .helpers import warn_if_not_doc
+from .db import TABLE_CLIENTS
+from .presence import Transport, presence
+from .worker import AsyncRepo, async_method
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -16,44 +16,67 @@ _LOGGER = logging.getLogger(__name__)
 class ClientRepo(BaseRepo):
     """DAO for client records."""
 
+    indexes = ("userid",)
+
     def __init__(self) -> None:
         super().__init__(TABLE_CLIENTS)
 
     def add(self, name: str | None, user_id: str, realm: str, resource: str) -> None:
         """Add a new client."""
-        q = query_instance.userid == user_id
+        q = {"userid": user_id}
         if not self._get(q):
             client = models.VacBotClient(name=name or "", userid=user_id, realm=realm, resource=resource)
             self._upsert(client.as_dict(), q)
 
     def get(self, user_id: str) -> models.VacBotClient | None:
         """Get client by user ID."""
-        rec = self._get(query_instance.userid == user_id)
-        return models.VacBotClient.from_dict(rec) if isinstance(rec, dict | Document) else None
+        client = self._get_model({"userid": user_id}, models.VacBotClient.from_dict)
+        return presence.apply("client", client.userid, client) if client is not None else None
 
     def list_all(self) -> list[models.VacBotClient]:
         """List all clients."""
-        clients = []
-        for rec in self.table.all():
-            warn_if_not_doc(rec, "ClientRepo.list_all entry")
-            clients.append(models.VacBotClient.from_dict(rec))
-        return clients
+        return [presence.apply("client", client.userid, client) for client in self._all_models(models.VacBotClient.from_dict)]
+
+    def list_chunks(self, chunk_size: int) -> Iterator[list[models.VacBotClient]]:
+        """List all clients in chunks of at most chunk_size clients, decoded one chunk at a time."""
+        for chunk in self._model_chunks(models.VacBotClient.from_dict, chunk_size):
+            yield [presence.apply("client", client.userid, client) for client in chunk]
 
     def remove(self, user_id: str) -> None:
         """Remove a client by user ID."""
-        self._remove(query_instance.userid == user_id)
+        self._remove({"userid": user_id})
 
     def set_mqtt(self, user_id: str | None, mqtt: bool) -> None:
-        """Set MQTT connection status."""
-        self._upsert({"mqtt_connection": mqtt}, query_instance.userid == user_id)
+        """Set MQTT connection status of a known client, kept in memory until the next presence snapshot."""
+        self._set_presence(user_id, "mqtt", mqtt)
 
     def set_xmpp(self, user_id: str | None, xmpp: bool) -> None:
-        """Set XMPP connection status."""
-        self._upsert({"xmpp_connection": xmpp}, query_instance.userid == user_id)
+        """Set XMPP connection status of a known client, kept in memory until the next presence snapshot."""
+        self._set_presence(user_id, "xmpp", xmpp)
 
     def reset_all_connections(self) -> None:
         """Reset all clients' connection statuses."""
-        for rec in self.table.all():
-            user = rec.get("userid")
-            self.set_mqtt(user, False)
-            self.set_xmpp(user, False)
+        presence.reset("client")
+        self.update_many({"mqtt_connection": False, "xmpp_connection": False})
+
+    def save_presence(self) -> int:
+        """Write connection statuses changed since the last call to the database."""
+        return presence.snapshot("client", self, "userid")
+
+    def _set_presence(self, user_id: str | None, transport: Transport, connected: bool) -> None:
+        if user_id is None:
+            return
+        if self._get({"userid": user_id}) is None:
+            _LOGGER.debug(f"Connection status of unknown client ignored :: UserID: {user_id} :: {transport}: {connected}")
+            return
+        presence.set("client", user_id, transport, connected)
+
+
+class AsyncClientRepo(AsyncRepo[ClientRepo]):
+    """Awaitable view of the client repo."""
+
+    add = async_method(ClientRepo.add)
+    get = async_method(ClientRepo.get)
+    list_all = async_method(ClientRepo.list_all)
+    remove = async_method(ClientRepo.remove)
+    set_mqtt = async_method(ClientRepo.set_mqtt)
@@ -1,10 +1,32 @@
 """Initialize TinyDB connection and define table constants."""
 
+import asyncio
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import Any
+
 from tinydb import Query, TinyDB
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import Storage
 from tinydb.table import Document
 
+from bumper.utils import json_codec
 from bumper.utils.settings import config as bumper_isc
 
+from .op_timing import op_timings
+from .process_lock import ProcessLock
+from .storages import Changes, CodecJSONStorage, IncrementalStorage, JournalStorage, Persist, SQLiteStorage
+from .worker import db_lock, db_worker
+
+_LOGGER = logging.getLogger(__name__)
+
 # Table names
 TABLE_BOTS = "bots"
 TABLE_USERS = "users"
@@ -16,16 +38,406 @@ TABLE_CLEAN_LOGS = "clean_logs"
 
 TABLE_META = "_meta"
 
+# Storage class per DB_ENGINE, the JSON file storage for any other value
+STORAGES: dict[str, type[Storage]] = {"sqlite": SQLiteStorage, "journal": JournalStorage}
+
 # Shared Query instance for TinyDB queries
 query_instance = Query()
 
 
+def _written() -> None:
+    """Persist of a storage which was already written while serializing."""
+
+
+class WriteBehindCache(CachingMiddleware):
+    """Keep all tables in memory and write them to the storage only on flush.
+
+    The underlying storage is read once; every later read is served from memory.
+    Writes only record what changed, persisting happens through `flush`. Repos report
+    the documents touched by their writes (`mark_dirty`), so storages supporting it
+    persist just those documents; any other write marks its whole table as dirty.
+
+    With a process lock, several processes can share the database. Flushes hold the lock
+    and first merge what other processes wrote, reads reload at most every `sync_interval`
+    seconds and only if the lock's write generation changed. A merge keeps unflushed local
+    changes and replaces only tables whose content differs, so caches and indexes of
+    unchanged tables stay valid.
+
+    A flush serializes the changes while holding the database lock and writes them to disk
+    after releasing it, in the order they were serialized. With a process lock the write
+    stays under the database lock, other processes must see it together with the new generation.
+    """
+
+    # Never flush because of the number of writes, flushing is driven by the flush loop
+    WRITE_CACHE_SIZE = sys.maxsize
+
+    def __init__(
+        self,
+        storage_cls: type = CodecJSONStorage,
+        process_lock: ProcessLock | None = None,
+        sync_interval: float = 1.0,
+    ) -> None:
+        super().__init__(storage_cls)  # type: ignore[no-untyped-call]
+        self.process_lock = process_lock
+        self.sync_interval = sync_interval
+        # Called after tables were reloaded from a write of another process
+        self.on_reload: Callable[[], None] | None = None
+        self.cache: dict[str, Any] | None = None
+        self.writes = 0
+        self.flushes = 0
+        self.closed = False
+        self._known: dict[str, Any] = {}
+        self._changes: dict[str, set[int] | None] = {}
+        self._pending: set[str] = set()
+        self.reloads = 0
+        self._generation = 0
+        self._next_sync = 0.0
+        # Raw tables as last loaded from or written to the storage
+        self._base: dict[str, Any] = {}
+        # Serialized flushes waiting to be written, in order, by the holder of the write guard
+        self._unwritten: deque[tuple[Changes, Persist]] = deque()
+        self._write_guard = threading.Lock()
+
+    def read(self) -> dict[str, Any]:
+        """Return the cached tables, loading them from the storage on first access."""
+        if self.cache is None:
+            with self._locked():
+                self.cache = self.storage.read() or {}
+                self._generation = self.process_lock.generation() if self.process_lock is not None else 0
+            self._known = dict(self.cache)
+            self._base = dict(self.cache)
+        elif self.process_lock is not None and time.monotonic() >= self._next_sync:
+            self.sync()
+        return self.cache
+
+    def sync(self) -> bool:
+        """Reload tables written by another process, returns True if there were any."""
+        if self.process_lock is None or self.cache is None:
+            return False
+        self._next_sync = time.monotonic() + self.sync_interval
+        if self.process_lock.generation() == self._generation:
+            return False
+        with self.process_lock.locked():
+            return self._merge_foreign()
+
+    def write(self, data: dict[str, Any]) -> None:
+        """Store data in the cache, without touching the storage."""
+        self.writes += 1
+        self._settle_pending()
+        # TinyDB replaces the table dict on every write, so identity tells us what changed
+        self._pending = {name for name, table in data.items() if self._known.get(name) is not table}
+        for name in self._known.keys() - data.keys():
+            self._mark(name, None)
+        self._known = dict(data)
+        self.cache = data
+        self._cache_modified_count += 1
+
+    def mark_dirty(self, table: str, doc_ids: Iterable[int]) -> None:
+        """Narrow the last write to `table` down to the given documents."""
+        if table in self._pending:
+            self._pending.discard(table)
+            self._mark(table, set(doc_ids))
+
+    @property
+    def dirty_tables(self) -> set[str]:
+        """Return names of tables changed since the last flush or not yet written."""
+        return set(self._changes) | self._pending | {name for changes, _ in list(self._unwritten) for name in changes}
+
+    def flush(self) -> None:
+        """Write the changes to the storage, if anything changed."""
+        if self.process_lock is None:
+            with db_lock:
+                self._serialize()
+            self._write()
+            return
+        with db_lock, self.process_lock.locked():
+            self._merge_foreign()
+            if self._serialize():
+                self._write()
+                self._generation = self.process_lock.bump()
+
+    def _serialize(self) -> bool:
+        """Serialize the changes for the storage and queue them for writing, must hold the database lock."""
+        self._settle_pending()
+        if self.cache is None or self.closed or not self._changes:
+            return False
+        changes, self._changes = self._changes, {}
+        try:
+            if isinstance(self.storage, IncrementalStorage):
+                persist = self.storage.prepare_changes(self.cache, changes)
+            elif isinstance(self.storage, CodecJSONStorage):
+                persist = self.storage.prepare_write(self.cache)
+            else:
+                self.storage.write(self.cache)
+                persist = _written
+        except Exception:
+            for name, doc_ids in changes.items():
+                self._mark(name, doc_ids)
+            raise
+        self._unwritten.append((changes, persist))
+        self._base = dict(self.cache)
+        self._cache_modified_count = 0
+        return True
+
+    def _write(self) -> None:
+        """Write all serialized flushes in order, a failed one stays queued and is retried by the next flush."""
+        with self._write_guard:
+            while self._unwritten:
+                changes, persist = self._unwritten[0]
+                persist()
+                self._unwritten.popleft()
+                self.flushes += 1
+                _LOGGER.debug(f"Database flushed :: dirty tables: {sorted(changes)}")
+
+    def close(self) -> None:
+        """Flush pending changes and close the storage."""
+        self.flush()
+        with self._write_guard, self._locked():
+            self.storage.close()
+        if self.process_lock is not None:
+            self.process_lock.close()
+        self.closed = True
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the process lock for the block, if there is one."""
+        if self.process_lock is None:
+            yield
+            return
+        with self.process_lock.locked():
+            yield
+
+    def _merge_foreign(self) -> bool:
+        """Merge writes of other processes into the cache, must be called while holding the process lock."""
+        if self.process_lock is None or self.cache is None:
+            return False
+        generation = self.process_lock.generation()
+        if generation == self._generation:
+            return False
+        self._settle_pending()
+        stored = self.storage.read() or {}
+        merged: dict[str, Any] = {}
+        for name in stored.keys() | self.cache.keys():
+            local, foreign = self.cache.get(name), stored.get(name)
+            if name not in self._changes:
+                table = local if local == foreign else foreign
+            else:
+                table = self._merge_table(name, local, foreign)
+            if table is not None:
+                merged[name] = table
+        self.cache = merged
+        self._known = dict(merged)
+        self._base = dict(stored)
+        self._generation = generation
+        self.reloads += 1
+        _LOGGER.debug(f"Database reloaded after a write of another process :: generation {generation}")
+        if self.on_reload is not None:
+            self.on_reload()
+        return True
+
+    def _merge_table(self, name: str, local: dict[str, Any] | None, foreign: dict[str, Any] | None) -> dict[str, Any] | None:
+        """Apply the unflushed local changes of a table on top of its stored content.
+
+        Tables written without reported documents keep their local content.
+        """
+        doc_ids = self._changes[name]
+        if doc_ids is None or foreign is None:
+            return local
+        if local is None:
+            return foreign
+        table = dict(foreign)
+        base = self._base.get(name) or {}
+        next_id = max((int(key) for key in table.keys() | local.keys()), default=0) + 1
+        for doc_id in sorted(doc_ids):
+            key = str(doc_id)
+            if key not in local:
+                table.pop(key, None)
+            elif key in foreign and key not in base and foreign[key] != local[key]:
+                # Both processes inserted a document with this id, ours gets a new one
+                table[str(next_id)] = local[key]
+                doc_ids.add(next_id)
+                next_id += 1
+            else:
+                table[key] = local[key]
+        return table
+
+    def _mark(self, table: str, doc_ids: set[int] | None) -> None:
+        """Record changed documents of a table, None marks the whole table."""
+        current = self._changes.get(table, set())
+        self._changes[table] = None if current is None or doc_ids is None else current | doc_ids
+
+    def _settle_pending(self) -> None:
+        """Mark tables of the last write as fully dirty, when no documents were reported."""
+        for name in self._pending:
+            self._mark(name, None)
+        self._pending = set()
+
+
+class SharedDB:
+    """Process-wide TinyDB handle, opened lazily and reused by all repos."""
+
+    def __init__(self) -> None:
+        self._db: TinyDB | None = None
+        self._cache: WriteBehindCache | None = None
+        self._key: tuple[str, str] | None = None
+
+    def get(self) -> TinyDB:
+        """Return the shared TinyDB instance, (re)opening it when needed."""
+        key = (bumper_isc.db_file, bumper_isc.DB_ENGINE)
+        with db_lock:
+            if self._db is None or self._cache is None or self._cache.closed or self._key != key:
+                self.close()
+                process_lock = ProcessLock(f"{bumper_isc.db_file}.lock") if bumper_isc.DB_MULTI_PROCESS else None
+                self._cache = WriteBehindCache(
+                    STORAGES.get(bumper_isc.DB_ENGINE, CodecJSONStorage),
+                    process_lock,
+                    bumper_isc.DB_SYNC_INTERVAL,
+                )
+                self._cache.on_reload = self._reset_next_ids
+                self._db = TinyDB(bumper_isc.db_file, storage=self._cache)
+                self._key = key
+                for name in (TABLE_USERS, TABLE_TOKENS, TABLE_CLEAN_LOGS, TABLE_CLIENTS, TABLE_BOTS):
+                    self._db.table(name, cache_size=0)
+            return self._db
+
+    def _reset_next_ids(self) -> None:
+        """Forget cached next document ids, another process may have inserted documents."""
+        if self._db is not None:
+            for table in self._db._tables.values():  # noqa: SLF001
+                table._next_id = None  # noqa: SLF001
+
+    def flush(self) -> None:
+        """Persist dirty tables of the shared instance."""
+        with db_lock:
+            cache = self._cache if self._cache is not None and not self._cache.closed else None
+        # The cache writes to disk outside the database lock
+        if cache is not None:
+            cache.flush()
+
+    def mark_dirty(self, table: str, doc_ids: Iterable[int]) -> None:
+        """Report the documents touched by the last write to a table."""
+        if self._cache is not None:
+            self._cache.mark_dirty(table, doc_ids)
+
+    @property
+    def incremental(self) -> bool:
+        """Return True if the storage persists only changed documents."""
+        self.get()
+        return self._cache is not None and isinstance(self._cache.storage, IncrementalStorage)
+
+    def backup(self, target: str) -> None:
+        """Write a consistent copy of the database to target, without blocking writers while it is written.
+
+        SQLite databases are copied with the online backup API, any other engine writes a JSON
+        snapshot of the in-memory state serialized under the lock.
+        """
+        with db_lock:
+            self.get()
+            self.flush()
+            if self._cache is None:
+                return
+            sqlite = self._cache.storage if isinstance(self._cache.storage, SQLiteStorage) else None
+            snapshot = b"" if sqlite is not None else json_codec.dumpb(self._cache.read() or {})
+        if sqlite is not None:
+            sqlite.backup(target)
+            return
+        tmp_path = Path(f"{target}.tmp")
+        tmp_path.write_bytes(snapshot)
+        tmp_path.replace(target)
+
+    def close(self) -> None:
+        """Flush and close the shared instance."""
+        with db_lock:
+            if self._db is not None and self._cache is not None and not self._cache.closed:
+                self._db.close()
+            self._db = None
+            self._cache = None
+            self._key = None
+
+    def stats(self) -> dict[str, int]:
+        """Return read/write/flush/reload counters of the shared instance, reads are logical repo reads."""
+        if self._cache is None:
+            return {"reads": 0, "writes": 0, "flushes": 0, "reloads": 0, "dirty_tables": 0}
+        return {
+            "reads": op_timings.reads,
+            "writes": self._cache.writes,
+            "flushes": self._cache.flushes,
+            "reloads": self._cache.reloads,
+            "dirty_tables": len(self._cache.dirty_tables),
+        }
+
+
+_shared_db = SharedDB()
+
+
 def get_db() -> TinyDB:
     """Return initialized TinyDB instance with all tables created."""
-    db = TinyDB(bumper_isc.db_file)
-    for name in (TABLE_USERS, TABLE_TOKENS, TABLE_CLEAN_LOGS, TABLE_CLIENTS, TABLE_BOTS):
-        db.table(name, cache_size=0)
-    return db
+    return _shared_db.get()
+
+
+def flush_db() -> None:
+    """Write pending changes of the shared TinyDB instance to disk."""
+    _shared_db.flush()
+
+
+def is_incremental() -> bool:
+    """Return True if the shared TinyDB instance persists only changed documents on flush."""
+    return _shared_db.incremental
+
+
+def mark_dirty(table: str, doc_ids: Iterable[int]) -> None:
+    """Report the documents touched by the last write to a table of the shared TinyDB instance."""
+    _shared_db.mark_dirty(table, doc_ids)
+
+
+@contextmanager
+def batch() -> Iterator[None]:
+    """Group database mutations so they are applied atomically and persisted by the same flush.
+
+    The database lock is held for the whole block, a flush or a job of the database worker
+    can not interleave. Blocks can be nested.
+    """
+    with db_lock:
+        yield
+
+
+def backup_db(target: str | None = None) -> str:
+    """Write a consistent copy of the shared database and return its filename.
+
+    Without a target, a timestamped file is created next to the database.
+    """
+    if target is None:
+        ts = datetime.now(tz=bumper_isc.LOCAL_TIMEZONE).strftime("%Y%m%d-%H%M%S")
+        target = f"{bumper_isc.db_file}.bak.{ts}"
+    _shared_db.backup(target)
+    return target
+
+
+def close_db() -> None:
+    """Finish queued database jobs, flush and close the shared TinyDB instance.
+
+    The next `get_db` call reopens it.
+    """
+    db_worker.shutdown()
+    _shared_db.close()
+
+
+def get_db_stats() -> dict[str, Any]:
+    """Return read/write/flush counters of the shared TinyDB instance and the database worker."""
+    return {**_shared_db.stats(), "worker": db_worker.stats()}
+
+
+async def flush_loop() -> None:
+    """Flush the shared TinyDB instance periodically until shutdown."""
+    try:
+        while not bumper_isc.shutting_down:
+            await asyncio.sleep(bumper_isc.DB_FLUSH_INTERVAL)
+            try:
+                await db_worker.run(flush_db)
+            except Exception:
+                _LOGGER.exception("Failed to flush database")
+    except asyncio.CancelledError:
+        pass
 
 
 def get_db_version() -> str | None:
@@ -0,0 +1,207 @@
+"""In-memory hash and ordered indexes over TinyDB tables."""
+
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Hashable, Iterable, Iterator, Mapping
+import logging
+import math
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# Marker for an index which was never built or lost track of its table
+_STALE = object()
+
+# Sort key of an ordered index value, numbers sort before strings so mixed values stay comparable
+OrderKey = tuple[int, float | str]
+# An ordered index covers a single field or, sorted by all of them, a tuple of fields
+OrderedField = str | tuple[str, ...]
+# Sort key of a document in an ordered index, a tuple of OrderKeys for compound indexes
+IndexKey = OrderKey | tuple[OrderKey, ...]
+
+
+def _order_key(value: Any) -> OrderKey | None:
+    """Return the sort key of a value, None for values which can not be ordered."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int | float):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, value)
+    return None
+
+
+class TableIndex:
+    """Hash indexes for a single table, mapping field values to document ids.
+
+    Fields in `fields` are indexed by their value, fields in `multi_fields` hold lists
+    and are indexed by each of their elements. Fields in `ordered_fields` are kept sorted
+    by value (numbers or strings) for range lookups. A tuple of fields in `ordered_fields`
+    is a compound index sorted by all of them, covering documents where all are set.
+
+    The index remembers the raw table dict it was built from. TinyDB replaces that dict
+    on every write, so a write not reported through `changed`/`removed` is detected on
+    the next lookup and the index is rebuilt.
+    """
+
+    def __init__(
+        self,
+        fields: Iterable[str] = (),
+        multi_fields: Iterable[str] = (),
+        ordered_fields: Iterable[OrderedField] = (),
+    ) -> None:
+        self.fields: tuple[str, ...] = tuple(fields)
+        self.multi_fields: tuple[str, ...] = tuple(multi_fields)
+        self.ordered_fields: tuple[OrderedField, ...] = tuple(ordered_fields)
+        self._values: dict[str, dict[Hashable, set[int]]] = {}
+        self._doc_keys: dict[int, dict[str, tuple[Hashable, ...]]] = {}
+        self._ordered: dict[OrderedField, list[tuple[IndexKey, int]]] = {}
+        self._doc_order: dict[int, dict[OrderedField, IndexKey]] = {}
+        self._source: object = _STALE
+        self.rebuilds = 0
+
+    def __contains__(self, field: str) -> bool:
+        """Return True if the field is indexed."""
+        return field in self.fields or field in self.multi_fields
+
+    def lookup(self, raw_table: Mapping[str, Any] | None, field: str, value: Any) -> set[int]:
+        """Return ids of documents whose field equals (or for multi fields contains) value."""
+        self._sync(raw_table)
+        if not isinstance(value, Hashable):
+            return set()
+        return set(self._values.get(field, {}).get(value, ()))
+
+    def lookup_range(
+        self,
+        raw_table: Mapping[str, Any] | None,
+        field: str,
+        lower: float | str | None = None,
+        upper: float | str | None = None,
+        limit: int | None = None,
+    ) -> list[int]:
+        """Return ids of documents with lower <= value < upper of an ordered field, sorted by value.
+
+        Only values of the same kind as the given bounds (numbers or strings) are returned,
+        at most `limit` ids if given.
+        """
+        self._sync(raw_table)
+        entries = self._ordered.get(field, [])
+        lower_key = _order_key(lower)
+        upper_key = _order_key(upper)
+        rank = lower_key[0] if lower_key else upper_key[0] if upper_key else None
+        start, end = 0, len(entries)
+        if rank is not None:
+            start = bisect_left(entries, (lower_key or (rank,),))
+            end = bisect_left(entries, (upper_key or (rank + 1,),))
+        if limit is not None:
+            end = min(end, start + limit)
+        return [doc_id for _, doc_id in entries[start:end]]
+
+    def iter_ordered(
+        self,
+        raw_table: Mapping[str, Any] | None,
+        field: OrderedField,
+        reverse: bool = False,
+        after: IndexKey | None = None,
+        after_id: int | None = None,
+    ) -> Iterator[tuple[IndexKey, int]]:
+        """Yield (key, doc id) of an ordered index in key order, only entries past `after` if given.
+
+        Documents with the same key are ordered by doc id. With `after_id` iteration resumes
+        after that document of key `after`, without it all documents of key `after` are skipped.
+        The iterator reads the live index, it has to be consumed before the table changes.
+        """
+        self._sync(raw_table)
+        entries = self._ordered.get(field, [])
+        if reverse:
+            end = len(entries) if after is None else bisect_left(entries, (after, -math.inf if after_id is None else after_id))
+            return (entries[i] for i in range(end - 1, -1, -1))
+        start = 0 if after is None else bisect_right(entries, (after, math.inf if after_id is None else after_id))
+        return (entries[i] for i in range(start, len(entries)))
+
+    def count_ordered(self, raw_table: Mapping[str, Any] | None, field: OrderedField) -> int:
+        """Return the number of documents covered by an ordered index."""
+        self._sync(raw_table)
+        return len(self._ordered.get(field, ()))
+
+    def key(self, field: OrderedField, doc: Mapping[str, Any]) -> IndexKey | None:
+        """Return the key of a document in an ordered index, None if it is not covered."""
+        if isinstance(field, str):
+            return _order_key(doc.get(field))
+        keys = tuple(_order_key(doc.get(f)) for f in field)
+        return None if None in keys else keys  # type: ignore[return-value]
+
+    def changed(self, before: Mapping[str, Any] | None, after: Mapping[str, Any] | None, doc_ids: Iterable[int]) -> None:
+        """Re-index documents inserted or updated by a write which turned `before` into `after`."""
+        if self._source is not before or after is None:
+            self._source = _STALE
+            return
+        for doc_id in doc_ids:
+            self._discard(doc_id)
+            if (doc := after.get(str(doc_id))) is not None:
+                self._add(doc_id, doc)
+        self._source = after
+
+    def removed(self, before: Mapping[str, Any] | None, after: Mapping[str, Any] | None, doc_ids: Iterable[int]) -> None:
+        """Drop documents removed by a write which turned `before` into `after`."""
+        if self._source is not before:
+            self._source = _STALE
+            return
+        for doc_id in doc_ids:
+            self._discard(doc_id)
+        self._source = after
+
+    def _sync(self, raw_table: Mapping[str, Any] | None) -> None:
+        """Rebuild the index if the table changed without being reported."""
+        if self._source is raw_table:
+            return
+        self._values = {}
+        self._doc_keys = {}
+        self._ordered = {}
+        self._doc_order = {}
+        for doc_id, doc in (raw_table or {}).items():
+            self._add(int(doc_id), doc, keep_sorted=False)
+        for entries in self._ordered.values():
+            entries.sort()
+        self._source = raw_table
+        self.rebuilds += 1
+        fields = self.fields + self.multi_fields + self.ordered_fields
+        _LOGGER.debug(f"Index rebuilt :: fields: {fields} :: documents: {len(self._doc_keys)}")
+
+    def _add(self, doc_id: int, doc: Mapping[str, Any], keep_sorted: bool = True) -> None:
+        keys: dict[str, tuple[Hashable, ...]] = {}
+        for field in self.fields:
+            if field in doc and isinstance(value := doc[field], Hashable):
+                keys[field] = (value,)
+        for field in self.multi_fields:
+            if isinstance(values := doc.get(field), list):
+                keys[field] = tuple(v for v in values if isinstance(v, Hashable))
+        for field, values in keys.items():
+            by_value = self._values.setdefault(field, {})
+            for value in values:
+                by_value.setdefault(value, set()).add(doc_id)
+        self._doc_keys[doc_id] = keys
+        order: dict[OrderedField, IndexKey] = {}
+        for ordered in self.ordered_fields:
+            if (key := self.key(ordered, doc)) is not None:
+                order[ordered] = key
+                entries = self._ordered.setdefault(ordered, [])
+                if keep_sorted:
+                    insort(entries, (key, doc_id))
+                else:
+                    entries.append((key, doc_id))
+        if order:
+            self._doc_order[doc_id] = order
+
+    def _discard(self, doc_id: int) -> None:
+        for field, values in self._doc_keys.pop(doc_id, {}).items():
+            by_value = self._values.get(field, {})
+            for value in values:
+                if (ids := by_value.get(value)) is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del by_value[value]
+        for ordered, key in self._doc_order.pop(doc_id, {}).items():
+            entries = self._ordered.get(ordered, [])
+            pos = bisect_left(entries, (key, doc_id))
+            if pos < len(entries) and entries[pos] == (key, doc_id):
+                del entries[pos]
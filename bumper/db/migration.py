@@ -1,7 +1,9 @@
 """Manage clean log entries."""
 
+from collections.abc import Callable, Iterator
 from datetime import datetime
 import logging
+from pathlib import Path
 import shutil
 
 from tinydb import TinyDB
@@ -9,24 +11,49 @@ from tinydb import TinyDB
 from bumper.utils.errors import MigrationError
 from bumper.utils.settings import config as bumper_isc
 
-from .db import TABLE_CLEAN_LOGS, get_db, get_db_version, set_db_version
+from .db import (
+    TABLE_CLEAN_LOGS,
+    backup_db,
+    batch,
+    close_db,
+    flush_db,
+    get_db,
+    get_db_version,
+    is_incremental,
+    set_db_version,
+)
+from .storages import CodecJSONStorage, fold_journal, is_sqlite_file
 
 _LOGGER = logging.getLogger(__name__)
 
+# Old documents converted per atomic migration batch
+MIGRATION_BATCH_SIZE = 500
+
 
 def migrate_db() -> None:
-    """Perform database migrations to the latest version."""
+    """Perform database migrations to the latest version.
+
+    A single backup is taken before the first step. Each step runs in batches, every batch is
+    applied atomically. Storages writing only changed documents persist every batch, so an
+    interrupted migration resumes with the remaining documents on the next start.
+    """
+    if bumper_isc.DB_ENGINE != "journal":
+        # Switched away from the journal engine without a clean shutdown
+        fold_journal(bumper_isc.db_file)
+    if bumper_isc.DB_ENGINE == "sqlite":
+        _convert_json_db_file()
+
     db = get_db()
     version = get_db_version() or "0.0.0"
 
     try:
+        if version in MIGRATIONS:
+            backup_file = backup_db()
+            _LOGGER.info(f"Database backup created :: {backup_file}")
         while version in MIGRATIONS:
             next_version, fn = MIGRATIONS[version]
             _LOGGER.info(f"Starting database migration :: {version} → {next_version}")
-            backup_file = _backup_db()
-            _LOGGER.info(f"Database backup created :: {backup_file}")
-            fn(db)
-            set_db_version(next_version)
+            _run_migration(fn(db), next_version)
             version = next_version
             _LOGGER.info(f"Database migration completed :: now at version {version}")
 
@@ -34,48 +61,92 @@ def migrate_db() -> None:
             set_db_version()
             _LOGGER.info(f"Database version aligned with application :: {version} → {bumper_isc.APP_VERSION}")
             version = bumper_isc.APP_VERSION
+        flush_db()
     except Exception:
         _LOGGER.exception("Database migration failed")
         raise
 
 
-def _backup_db() -> str:
-    """Create a timestamped backup of the database and return its filename."""
+def _run_migration(steps: Iterator[tuple[int, int]], next_version: str) -> None:
+    """Apply every batch of a migration step, then the version bump.
+
+    A JSON file would be rewritten completely per batch, so without an incremental storage
+    the step runs in memory and is persisted once together with the version bump.
+    """
+    flush_batches = is_incremental()
+    while True:
+        with batch():
+            progress = next(steps, None)
+            if progress is None:
+                set_db_version(next_version)
+        if flush_batches or progress is None:
+            flush_db()
+        if progress is None:
+            return
+        done, total = progress
+        _LOGGER.info(f"Database migration progress :: {next_version} :: {done}/{total}")
+
+
+def import_json_db(json_file: str) -> None:
+    """Replace the content of the current database with all tables of a TinyDB JSON file."""
+    source = TinyDB(json_file, storage=CodecJSONStorage, access_mode="r")
+    try:
+        tables = source.storage.read() or {}
+    finally:
+        source.close()
+
+    db = get_db()
+    db.drop_tables()
+    db.storage.write(tables)
+    flush_db()
+    _LOGGER.info(f"Database imported :: {json_file} :: tables: {sorted(tables)}")
+
+
+def _convert_json_db_file() -> None:
+    """Move a TinyDB JSON file found at the configured path aside and import it into SQLite."""
+    db_file = Path(bumper_isc.db_file)
+    if not db_file.exists() or db_file.stat().st_size == 0 or is_sqlite_file(db_file):
+        return
+
+    close_db()
     ts = datetime.now(tz=bumper_isc.LOCAL_TIMEZONE).strftime("%Y%m%d-%H%M%S")
-    backup_file = f"{bumper_isc.db_file}.bak.{ts}"
-    shutil.copy(bumper_isc.db_file, backup_file)
-    return backup_file
+    json_file = f"{bumper_isc.db_file}.json.bak.{ts}"
+    shutil.move(db_file, json_file)
+    _LOGGER.info(f"Converting TinyDB JSON database to SQLite :: JSON copy kept at {json_file}")
+    import_json_db(json_file)
 
 
-def _migrate_clean_logs_0_2_2_to_0_2_3(db: TinyDB) -> None:
-    """Flatten clean_logs nested lists into individual documents."""
+def _migrate_clean_logs_0_2_2_to_0_2_3(db: TinyDB) -> Iterator[tuple[int, int]]:
+    """Flatten clean_logs nested lists into individual documents, yields after each batch."""
     table = db.table(TABLE_CLEAN_LOGS)
-    new_entries = []
-
-    # old schema: each doc has "logs": [...]
-    for doc in table.all():
-        logs = doc.get("logs")
-        if logs is None:
-            continue
-        if not isinstance(logs, list):
-            msg = "Invalid clean_logs schema: logs is not a list"
-            raise MigrationError(msg)
-
-        for log in logs:
-            if not isinstance(log, dict):
-                msg = "Invalid clean_logs entry"
+    # old schema: each doc has "logs": [...], docs already flattened by an interrupted run are skipped
+    doc_ids = [doc.doc_id for doc in table.all() if "logs" in doc]
+
+    for start in range(0, len(doc_ids), MIGRATION_BATCH_SIZE):
+        chunk = doc_ids[start : start + MIGRATION_BATCH_SIZE]
+        new_entries = []
+        for doc in table.get(doc_ids=chunk) or []:
+            logs = doc["logs"]
+            if not isinstance(logs, list):
+                msg = "Invalid clean_logs schema: logs is not a list"
                 raise MigrationError(msg)
-            # Flatten
-            log_copy = log.copy()
-            log_copy["did"] = doc.get("did")
-            new_entries.append(log_copy)
 
-    # clear old table and insert flattened entries
-    table.truncate()
-    table.insert_multiple(new_entries)
+            for log in logs:
+                if not isinstance(log, dict):
+                    msg = "Invalid clean_logs entry"
+                    raise MigrationError(msg)
+                # Flatten
+                log_copy = log.copy()
+                log_copy["did"] = doc.get("did")
+                new_entries.append(log_copy)
+
+        # replace the old documents of this batch by the flattened entries
+        table.remove(doc_ids=chunk)
+        table.insert_multiple(new_entries)
+        yield start + len(chunk), len(doc_ids)
 
 
-MIGRATIONS = {
+MIGRATIONS: dict[str, tuple[str, Callable[[TinyDB], Iterator[tuple[int, int]]]]] = {
     "0.0.0": ("0.2.3", _migrate_clean_logs_0_2_2_to_0_2_3),
     "0.2.2": ("0.2.3", _migrate_clean_logs_0_2_2_to_0_2_3),
 }
@@ -0,0 +1,70 @@
+"""Cache of model objects decoded from TinyDB documents."""
+
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+# Marker for a cache which was never filled or lost track of its table
+_STALE = object()
+
+Decoder = Callable[[dict[str, Any]], Any]
+
+
+class ModelCache:
+    """Decoded models of a single table by document id.
+
+    Like TableIndex, the cache remembers the raw table dict it belongs to. Documents reported
+    through `changed` are dropped and decoded again on next use, any other write
+    replaces the raw table dict and empties the whole cache on the next lookup.
+
+    Models are shared between callers, which is safe as they are frozen dataclasses.
+    """
+
+    def __init__(self) -> None:
+        self._models: dict[int, Any] = {}
+        self._all: list[Any] | None = None
+        self._source: object = _STALE
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, raw_table: Mapping[str, Any] | None, doc_id: int, decode: Decoder) -> Any | None:
+        """Return the model of a document, None if it does not exist."""
+        self._sync(raw_table)
+        if (model := self._models.get(doc_id)) is not None:
+            self.hits += 1
+            return model
+        if raw_table is None or (doc := raw_table.get(str(doc_id))) is None:
+            return None
+        self.misses += 1
+        model = self._models[doc_id] = decode(doc)
+        return model
+
+    def all(self, raw_table: Mapping[str, Any] | None, decode: Decoder) -> list[Any]:
+        """Return the models of all documents in table order."""
+        self._sync(raw_table)
+        if self._all is None:
+            self._all = [self.get(raw_table, int(doc_id), decode) for doc_id in raw_table or {}]
+        else:
+            self.hits += len(self._all)
+        return list(self._all)
+
+    def changed(self, before: Mapping[str, Any] | None, after: Mapping[str, Any] | None, doc_ids: Iterable[int]) -> None:
+        """Drop documents inserted, updated or removed by a write which turned `before` into `after`."""
+        if self._source is not before:
+            self._source = _STALE
+            return
+        for doc_id in doc_ids:
+            self._models.pop(doc_id, None)
+        self._all = None
+        self._source = after
+
+    def stats(self) -> dict[str, int]:
+        """Return hit and miss counters and the number of cached models."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._models)}
+
+    def _sync(self, raw_table: Mapping[str, Any] | None) -> None:
+        """Empty the cache if the table changed without being reported."""
+        if self._source is raw_table:
+            return
+        self._models = {}
+        self._all = None
+        self._source = raw_table
@@ -0,0 +1,121 @@
+"""Count and time repository operations per table and method."""
+
+from bisect import bisect_left
+from collections.abc import Callable
+import functools
+import logging
+import threading
+import time
+from typing import Any, Concatenate, ParamSpec, TypeVar
+
+from bumper.utils.settings import config as bumper_isc
+
+_LOGGER = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Upper bounds in milliseconds of the histogram buckets, slower operations go to a last open bucket
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+_BUCKETS_NS = tuple(int(ms * 1_000_000) for ms in BUCKETS_MS)
+
+
+class OpStats:
+    """Count, duration and histogram of a single operation."""
+
+    __slots__ = ("buckets", "count", "max_ns", "slow", "total_ns")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.slow = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * (len(_BUCKETS_NS) + 1)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters in milliseconds, the histogram as bucket upper bound -> count."""
+        bounds = [f"{ms:g}" for ms in BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "slow": self.slow,
+            "total_ms": round(self.total_ns / 1_000_000, 3),
+            "avg_ms": round(self.total_ns / self.count / 1_000_000, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ns / 1_000_000, 3),
+            "histogram": {bound: n for bound, n in zip(bounds, self.buckets, strict=True) if n},
+        }
+
+
+class OpTimings:
+    """Operation statistics per table and method, recorded from any thread.
+
+    Per-bot tables (`<table>/<did>`) are counted with their main table, so the number of
+    tracked entries does not grow with the fleet. `reads` counts logical repo reads, a read
+    done as part of another repo operation is timed but not counted again.
+    """
+
+    def __init__(self) -> None:
+        self._ops: dict[tuple[str, str], OpStats] = {}
+        self._guard = threading.Lock()
+        self.reads = 0
+
+    def record(self, table: str, op: str, duration_ns: int, read: bool = False) -> None:
+        """Record a single operation, logging it if it took at least DB_SLOW_OP_MS."""
+        table = table.partition("/")[0]
+        slow = duration_ns >= bumper_isc.DB_SLOW_OP_MS * 1_000_000
+        with self._guard:
+            self.reads += read
+            if (stats := self._ops.get((table, op))) is None:
+                stats = self._ops[table, op] = OpStats()
+            stats.count += 1
+            stats.total_ns += duration_ns
+            stats.max_ns = max(stats.max_ns, duration_ns)
+            stats.buckets[bisect_left(_BUCKETS_NS, duration_ns)] += 1
+            stats.slow += slow
+        if slow:
+            _LOGGER.debug(f"Slow database operation :: {table}.{op} took {duration_ns / 1_000_000:.1f} ms")
+
+    def stats(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """Return the statistics as table -> method -> counters."""
+        result: dict[str, dict[str, dict[str, Any]]] = {}
+        with self._guard:
+            for (table, op), stats in sorted(self._ops.items()):
+                result.setdefault(table, {})[op] = stats.as_dict()
+        return result
+
+    def reset(self) -> None:
+        """Forget all recorded operations."""
+        with self._guard:
+            self._ops.clear()
+            self.reads = 0
+
+
+op_timings = OpTimings()
+# Number of timed repo methods running in the current thread
+_nesting = threading.local()
+
+
+def _timed(fn: Callable[Concatenate[Any, P], R], read: bool) -> Callable[Concatenate[Any, P], R]:  # noqa: UP047
+    op = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(self: Any, /, *args: P.args, **kwargs: P.kwargs) -> R:
+        depth = getattr(_nesting, "depth", 0)
+        _nesting.depth = depth + 1
+        start = time.perf_counter_ns()
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            _nesting.depth = depth
+            op_timings.record(self._table_name, op, time.perf_counter_ns() - start, read=read and not depth)
+
+    return wrapper
+
+
+def timed(fn: Callable[Concatenate[Any, P], R]) -> Callable[Concatenate[Any, P], R]:  # noqa: UP047
+    """Record duration of a repo method in `op_timings`, under the table of the repo."""
+    return _timed(fn, read=False)
+
+
+def timed_read(fn: Callable[Concatenate[Any, P], R]) -> Callable[Concatenate[Any, P], R]:  # noqa: UP047
+    """Record duration of a repo read method, counting it as a read unless called by another repo method."""
+    return _timed(fn, read=True)
@@ -0,0 +1,123 @@
+"""Track live MQTT and XMPP connection state in memory, the database only receives periodic snapshots."""
+
+from dataclasses import dataclass, replace
+from datetime import datetime
+import threading
+from typing import Any, Literal, TypeVar
+
+from tinydb import where
+
+from bumper.utils.settings import config as bumper_isc
+from bumper.web.utils.models import VacBotClient, VacBotDevice
+
+from .base import BaseRepo
+
+Kind = Literal["bot", "client"]
+Transport = Literal["mqtt", "xmpp"]
+M = TypeVar("M", VacBotDevice, VacBotClient)
+
+
+@dataclass
+class Presence:
+    """Connection state of a single bot or client."""
+
+    mqtt: bool = False
+    xmpp: bool = False
+    since: datetime | None = None  # last state change
+    connects: int = 0
+    disconnects: int = 0
+
+    @property
+    def online(self) -> bool:
+        """Return if connected over any transport."""
+        return self.mqtt or self.xmpp
+
+    def as_dict(self) -> dict[str, Any]:
+        """Convert to dict."""
+        return {
+            "mqtt_connection": self.mqtt,
+            "xmpp_connection": self.xmpp,
+            "since": self.since.isoformat() if self.since else None,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+        }
+
+
+class PresenceRegistry:
+    """Connection state of bots (by did) and clients (by userid), safe to use from any thread."""
+
+    def __init__(self) -> None:
+        self._guard = threading.Lock()
+        self._entries: dict[Kind, dict[str, Presence]] = {"bot": {}, "client": {}}
+        # Keys changed since the last snapshot
+        self._dirty: dict[Kind, set[str]] = {"bot": set(), "client": set()}
+
+    def set(self, kind: Kind, key: str, transport: Transport, connected: bool) -> Presence:
+        """Record a connect or disconnect."""
+        with self._guard:
+            presence = self._entries[kind].setdefault(key, Presence())
+            if getattr(presence, transport) == connected:
+                return presence
+            setattr(presence, transport, connected)
+            presence.since = datetime.now(tz=bumper_isc.LOCAL_TIMEZONE)
+            if connected:
+                presence.connects += 1
+            else:
+                presence.disconnects += 1
+            self._dirty[kind].add(key)
+            return presence
+
+    def get(self, kind: Kind, key: str) -> Presence | None:
+        """Return the connection state, None if never seen since start."""
+        with self._guard:
+            return self._entries[kind].get(key)
+
+    def apply(self, kind: Kind, key: str, model: M) -> M:
+        """Return a bot or client model with its live connection state, a changed copy as models are frozen."""
+        state = self.get(kind, key)
+        if state is not None and (state.mqtt, state.xmpp) != (model.mqtt_connection, model.xmpp_connection):
+            model = replace(model, mqtt_connection=state.mqtt, xmpp_connection=state.xmpp)
+        return model
+
+    def online(self, kind: Kind) -> list[str]:
+        """Return the keys of all connected bots or clients."""
+        with self._guard:
+            return [key for key, presence in self._entries[kind].items() if presence.online]
+
+    def reset(self, kind: Kind | None = None) -> None:
+        """Forget all connection states, of one kind or all."""
+        with self._guard:
+            for k in (kind,) if kind else self._entries:
+                self._entries[k].clear()
+                self._dirty[k].clear()
+
+    def snapshot(self, kind: Kind, repo: BaseRepo, key_field: str) -> int:
+        """Write connection states changed since the last snapshot to the repo, returns the number of written keys.
+
+        Entries are grouped by state, so at most one table write per combination is done.
+        """
+        with self._guard:
+            keys, self._dirty[kind] = self._dirty[kind], set()
+            groups: dict[tuple[bool, bool], list[str]] = {}
+            for key in keys:
+                if (presence := self._entries[kind].get(key)) is not None:
+                    groups.setdefault((presence.mqtt, presence.xmpp), []).append(key)
+        with repo.batch():
+            for (mqtt, xmpp), group in groups.items():
+                repo.update_many({"mqtt_connection": mqtt, "xmpp_connection": xmpp}, where(key_field).one_of(group))
+        return sum(len(group) for group in groups.values())
+
+    def stats(self) -> dict[str, int]:
+        """Return counts of connected bots and clients and of connects and disconnects since start."""
+        with self._guard:
+            entries = [presence for kind in self._entries.values() for presence in kind.values()]
+            return {
+                "bots_online": sum(presence.online for presence in self._entries["bot"].values()),
+                "clients_online": sum(presence.online for presence in self._entries["client"].values()),
+                "connects": sum(presence.connects for presence in entries),
+                "disconnects": sum(presence.disconnects for presence in entries),
+                "pending": sum(len(keys) for keys in self._dirty.values()),
+            }
+
+
+presence = PresenceRegistry()
@@ -0,0 +1,54 @@
+"""Lock file serializing database writes of several bumper processes."""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import os
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+# Width of the zero padded generation counter stored in the lock file
+_WIDTH = 20
+
+
+class ProcessLock:
+    """Advisory lock file next to the database, holding a write generation counter.
+
+    Writers bump the generation while holding the lock. Readers compare it with the
+    generation they last loaded, which costs a single small read, and reload only when
+    another process wrote in between. Without fcntl (Windows) the lock is not enforced.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the exclusive lock for the block."""
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def generation(self) -> int:
+        """Return the current write generation, 0 if nothing was written yet."""
+        data = os.pread(self._fd, _WIDTH, 0)
+        return int(data) if data.strip() else 0
+
+    def bump(self) -> int:
+        """Increase the write generation and return it, must be called while holding the lock."""
+        generation = self.generation() + 1
+        os.pwrite(self._fd, str(generation).zfill(_WIDTH).encode(), 0)
+        return generation
+
+    def close(self) -> None:
+        """Close the lock file, releasing a held lock."""
+        os.close(self._fd)
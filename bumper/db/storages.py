@@ -0,0 +1,337 @@
+"""TinyDB storages persisting only changed documents."""
+
+from abc import abstractmethod
+from collections.abc import Callable, Mapping
+import logging
+import os
+from pathlib import Path
+import sqlite3
+from typing import Any
+
+from tinydb.storages import JSONStorage, Storage
+
+from bumper.utils import json_codec
+from bumper.utils.settings import config as bumper_isc
+
+_LOGGER = logging.getLogger(__name__)
+
+# Changed documents per table, None when the whole table has to be rewritten
+Changes = Mapping[str, set[int] | None]
+# Writes already serialized data to disk, called without holding the database lock
+Persist = Callable[[], None]
+
+
+def _nothing_to_persist() -> None:
+    pass
+
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+def is_sqlite_file(path: str | Path) -> bool:
+    """Return True if the file exists and is a SQLite database."""
+    try:
+        with Path(path).open("rb") as file:
+            return file.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+    except FileNotFoundError:
+        return False
+
+
+class CodecJSONStorage(JSONStorage):
+    """TinyDB JSON file storage serializing with the fastest available JSON codec."""
+
+    def __init__(self, path: str, **kwargs: Any) -> None:
+        kwargs.setdefault("encoding", "utf-8")
+        super().__init__(path, **kwargs)
+
+    def read(self) -> dict[str, dict[str, Any]] | None:
+        """Load the whole file, None if it is empty."""
+        self._handle.seek(0, os.SEEK_END)
+        if not self._handle.tell():
+            return None
+        self._handle.seek(0)
+        data: dict[str, dict[str, Any]] = json_codec.loads(self._handle.read())
+        return data
+
+    def write(self, data: dict[str, dict[str, Any]]) -> None:
+        """Rewrite the whole file."""
+        self.prepare_write(data)()
+
+    def prepare_write(self, data: dict[str, dict[str, Any]]) -> Persist:
+        """Serialize the whole database, the returned callable rewrites the file with it."""
+        payload = json_codec.dumps(data)
+
+        def persist() -> None:
+            self._handle.seek(0)
+            self._handle.write(payload)
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+            self._handle.truncate()
+
+        return persist
+
+
+class IncrementalStorage(Storage):
+    """Storage which can persist a set of changed documents instead of the whole database."""
+
+    def write_changes(self, data: dict[str, dict[str, Any]], changes: Changes) -> None:
+        """Persist the given changes, `data` is the complete current database state."""
+        self.prepare_changes(data, changes)()
+
+    @abstractmethod
+    def prepare_changes(self, data: dict[str, dict[str, Any]], changes: Changes) -> Persist:
+        """Serialize the given changes, the returned callable persists them.
+
+        Documents are updated in place, so serializing has to happen while the database lock is
+        held, the returned callable may run after it was released.
+        """
+
+    @abstractmethod
+    def backup(self, target: str) -> None:
+        """Write a consistent copy of the persisted database to target."""
+
+
+class SQLiteStorage(IncrementalStorage):
+    """Store every document as a JSON blob row of a SQLite database in WAL mode.
+
+    This is a write-through snapshot store, not a SQL backend: the `documents` table has no
+    columns or indexes per field, the whole database is loaded into memory on start and all
+    queries run on the in-memory tables. SQLite only makes writes of changed documents cheap.
+
+    Lookups by did, userid, token, auth_code, it_token or clean log ts are answered by the
+    hash and ordered indexes of the repos (`TableIndex`), which never query SQLite, so SQL
+    indexes on these keys would only slow down writes.
+    """
+
+    _SQL_CREATE = (
+        "CREATE TABLE IF NOT EXISTS documents ("
+        "tbl TEXT NOT NULL, doc_id INTEGER NOT NULL, data TEXT NOT NULL, PRIMARY KEY (tbl, doc_id)"
+        ") WITHOUT ROWID"
+    )
+    _SQL_SELECT = "SELECT tbl, doc_id, data FROM documents"
+    _SQL_UPSERT = "INSERT OR REPLACE INTO documents (tbl, doc_id, data) VALUES (?, ?, ?)"
+    _SQL_DELETE_DOC = "DELETE FROM documents WHERE tbl = ? AND doc_id = ?"
+    _SQL_DELETE_TABLE = "DELETE FROM documents WHERE tbl = ?"
+    _SQL_DELETE_ALL = "DELETE FROM documents"
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self._path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Flushes may run outside the event loop thread, access is serialized by the caller
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(self._SQL_CREATE)
+
+    def read(self) -> dict[str, dict[str, Any]] | None:
+        """Load all documents."""
+        data: dict[str, dict[str, Any]] = {}
+        for tbl, doc_id, doc in self._conn.execute(self._SQL_SELECT):
+            data.setdefault(tbl, {})[str(doc_id)] = json_codec.loads(doc)
+        return data or None
+
+    def write(self, data: dict[str, dict[str, Any]]) -> None:
+        """Replace all stored documents."""
+        with self._conn:
+            self._conn.execute(self._SQL_DELETE_ALL)
+            self._conn.executemany(self._SQL_UPSERT, self._rows(data))
+
+    def prepare_changes(self, data: dict[str, dict[str, Any]], changes: Changes) -> Persist:
+        """Serialize the changed documents, the returned callable inserts, replaces or deletes them in one transaction."""
+        statements: list[tuple[str, list[tuple[Any, ...]]]] = []
+        for tbl, doc_ids in changes.items():
+            table = data.get(tbl)
+            if doc_ids is None or table is None:
+                statements.append((self._SQL_DELETE_TABLE, [(tbl,)]))
+                if table:
+                    statements.append((self._SQL_UPSERT, self._rows({tbl: table})))
+                continue
+            statements.append((self._SQL_UPSERT, [(tbl, i, json_codec.dumps(table[str(i)])) for i in doc_ids if str(i) in table]))
+            statements.append((self._SQL_DELETE_DOC, [(tbl, i) for i in doc_ids if str(i) not in table]))
+
+        def persist() -> None:
+            with self._conn:
+                for sql, rows in statements:
+                    self._conn.executemany(sql, rows)
+
+        return persist
+
+    def backup(self, target: str) -> None:
+        """Copy the database with the SQLite online backup API.
+
+        A separate connection reads a WAL snapshot, so the copy does not block writes of this storage.
+        """
+        source_conn = sqlite3.connect(self._path)
+        target_conn = sqlite3.connect(target)
+        try:
+            source_conn.backup(target_conn)
+        finally:
+            target_conn.close()
+            source_conn.close()
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._conn.close()
+
+    @staticmethod
+    def _rows(data: Mapping[str, Mapping[str, Any]]) -> list[tuple[str, int, str]]:
+        return [(tbl, int(doc_id), json_codec.dumps(doc)) for tbl, table in data.items() for doc_id, doc in table.items()]
+
+
+class JournalStorage(IncrementalStorage):
+    """Append changed documents to a journal next to a JSON snapshot of the database.
+
+    Every flush appends one line per changed document to `<path>.journal`, so its cost
+    follows the size of the change. Reading loads the snapshot and replays the journal.
+    Once the journal holds more than `compact_records` records or outgrows the snapshot,
+    the snapshot is rewritten and the journal emptied, which also happens on close.
+
+    Journal records are `{"t": table, "i": doc_id, "d": doc}` for an upserted document,
+    without "d" for a removed one and `{"t": table, "d": table_or_null}` for a replaced
+    table. Records hold whole documents, so replaying one twice gives the same state.
+    """
+
+    def __init__(self, path: str, compact_records: int | None = None) -> None:
+        super().__init__()
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self.journal_path = Path(f"{path}.journal")
+        self.compact_records = compact_records if compact_records is not None else bumper_isc.DB_JOURNAL_COMPACT_RECORDS
+        self.records = 0
+        self.compactions = 0
+        self._data: dict[str, dict[str, Any]] | None = None
+
+    def read(self) -> dict[str, dict[str, Any]] | None:
+        """Load the snapshot and replay the journal, dropping a torn last record."""
+        data, records, valid_size = self._load()
+        if self.journal_path.exists() and self.journal_path.stat().st_size > valid_size:
+            _LOGGER.warning(f"Database journal has an incomplete record, dropping it :: {self.journal_path}")
+            with self.journal_path.open("r+b") as journal:
+                journal.truncate(valid_size)
+        self.records = records
+        return data or None
+
+    def write(self, data: dict[str, dict[str, Any]]) -> None:
+        """Replace the whole database, by writing a new snapshot."""
+        self._data = data
+        self.compact()
+
+    def prepare_changes(self, data: dict[str, dict[str, Any]], changes: Changes) -> Persist:
+        """Serialize the changed documents as journal records, the returned callable appends them.
+
+        When the journal is due for compaction, the snapshot is serialized as well and written after the records.
+        """
+        self._data = data
+        lines = []
+        for tbl, doc_ids in changes.items():
+            table = data.get(tbl)
+            if doc_ids is None or table is None:
+                lines.append(json_codec.dumpb({"t": tbl, "d": table}))
+                continue
+            for doc_id in sorted(doc_ids):
+                record = (
+                    {"t": tbl, "i": doc_id, "d": doc} if (doc := table.get(str(doc_id))) is not None else {"t": tbl, "i": doc_id}
+                )
+                lines.append(json_codec.dumpb(record))
+        if not lines:
+            return _nothing_to_persist
+        records = b"\n".join(lines) + b"\n"
+        self.records += len(lines)
+        snapshot = None
+        if self.records > self.compact_records or self._journal_size() + len(records) > max(self._snapshot_size(), 1 << 20):
+            snapshot = json_codec.dumpb(data)
+            self.records = 0
+
+        def persist() -> None:
+            with self.journal_path.open("ab") as journal:
+                journal.write(records)
+                journal.flush()
+                os.fsync(journal.fileno())
+            if snapshot is not None:
+                self._write_snapshot(snapshot)
+
+        return persist
+
+    def compact(self) -> None:
+        """Rewrite the snapshot with the current state and empty the journal."""
+        if self._data is None:
+            self._data = self._load()[0]
+        self._write_snapshot(json_codec.dumpb(self._data))
+
+    def _write_snapshot(self, payload: bytes) -> None:
+        """Replace the snapshot and empty the journal."""
+        tmp_path = self._path.with_name(f"{self._path.name}.tmp")
+        with tmp_path.open("wb") as snapshot:
+            snapshot.write(payload)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        tmp_path.replace(self._path)
+        # A crash before this point only leaves records the new snapshot already contains
+        self.journal_path.unlink(missing_ok=True)
+        self.records = 0
+        self.compactions += 1
+        _LOGGER.debug(f"Database journal compacted :: {self._path}")
+
+    def backup(self, target: str) -> None:
+        """Write the persisted state as a single JSON snapshot to target."""
+        Path(target).write_bytes(json_codec.dumpb(self._load()[0]))
+
+    def close(self) -> None:
+        """Compact a non-empty journal, so the snapshot alone holds the database."""
+        if self.records:
+            self.compact()
+
+    def _load(self) -> tuple[dict[str, dict[str, Any]], int, int]:
+        """Return the replayed state, the number of replayed records and the size of the valid journal part."""
+        data: dict[str, dict[str, Any]] = {}
+        if self._snapshot_size():
+            data = json_codec.loads(self._path.read_bytes())
+        records = valid_size = 0
+        if not self.journal_path.exists():
+            return data, records, valid_size
+        with self.journal_path.open("rb") as journal:
+            for line in journal:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json_codec.loads(line)
+                # Decode errors have a different type per JSON codec
+                except Exception:
+                    break
+                _replay(data, record)
+                records += 1
+                valid_size += len(line)
+        return data, records, valid_size
+
+    def _snapshot_size(self) -> int:
+        return self._path.stat().st_size if self._path.exists() else 0
+
+    def _journal_size(self) -> int:
+        return self.journal_path.stat().st_size if self.journal_path.exists() else 0
+
+
+def _replay(data: dict[str, dict[str, Any]], record: Mapping[str, Any]) -> None:
+    """Apply a single journal record to the database state."""
+    tbl = record["t"]
+    if "i" not in record:
+        if record["d"] is None:
+            data.pop(tbl, None)
+        else:
+            data[tbl] = record["d"]
+    elif "d" in record:
+        data.setdefault(tbl, {})[str(record["i"])] = record["d"]
+    else:
+        data.get(tbl, {}).pop(str(record["i"]), None)
+
+
+def fold_journal(path: str) -> bool:
+    """Merge a journal left by the journal engine into its snapshot, returns True if there was one."""
+    storage = JournalStorage(path)
+    if not storage.journal_path.exists():
+        return False
+    storage.read()
+    storage.compact()
+    _LOGGER.info(f"Database journal merged into snapshot :: {path}")
+    return True
@@ -3,14 +3,14 @@
 from datetime import datetime, timedelta
 import logging
 
-from tinydb import where
 from tinydb.table import Document
 
 from bumper.utils.settings import config as bumper_isc
 from bumper.web.utils.models import Token
 
 from .base import BaseRepo
-from .db import TABLE_TOKENS, query_instance
+from .db import TABLE_TOKENS
+from .worker import AsyncRepo, async_method
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,6 +18,10 @@ _LOGGER = logging.getLogger(__name__)
 class TokenRepo(BaseRepo):
     """Data access object for Token records."""
 
+    indexes = ("token", "userid", "auth_code", "it_token")
+    # Tokens ordered by expiry, so revoking touches only expired ones
+    ordered_indexes = ("expiration",)
+
     def __init__(self) -> None:
         super().__init__(TABLE_TOKENS)
 
@@ -25,23 +29,22 @@ class TokenRepo(BaseRepo):
         """Create and insert a new Token for a user."""
         expiration = datetime.now(tz=bumper_isc.LOCAL_TIMEZONE) + timedelta(seconds=bumper_isc.TOKEN_VALIDITY_SECONDS)
         token = Token(userid=userid, token=token_str, expiration=expiration)
-        q = (query_instance.userid == userid) & (query_instance.token == token_str)
-        if not self.table.contains(q):
-            self.table.insert(token.to_db())
+        if not self._get({"token": token_str, "userid": userid}):
+            self._insert(token.to_db())
 
     def get(self, user_id: str, token_str: str) -> Token | None:
         """Get Token by user and token string."""
-        rec = self._get((query_instance.userid == user_id) & (query_instance.token == token_str))
+        rec = self._get({"token": token_str, "userid": user_id})
         return Token.from_dict(rec) if isinstance(rec, dict | Document) else None
 
     def get_first(self, user_id: str) -> Token | None:
         """Get first Token by user."""
-        rec = self._get_first(query_instance.userid == user_id)
+        rec = self._get_first({"userid": user_id})
         return Token.from_dict(rec) if isinstance(rec, dict | Document) else None
 
     def list_for_user(self, user_id: str) -> list[Token]:
         """List all Tokens for user."""
-        recs = self._get_multi(query_instance.userid == user_id)
+        recs = self._get_multi({"userid": user_id})
         return [Token.from_dict(r) for r in recs]
 
     def verify(self, user_id: str, token_str: str) -> bool:
@@ -52,55 +55,78 @@ class TokenRepo(BaseRepo):
 
     def add_auth_code(self, user_id: str, auth_code: str) -> bool:
         """Add auth code to existing Token."""
-        if self._get_first(query_instance.userid == user_id):
-            return len(self._upsert({"auth_code": auth_code}, query_instance.userid == user_id)) > 0
+        if self._get_first({"userid": user_id}):
+            return len(self._upsert({"auth_code": auth_code}, {"userid": user_id})) > 0
         return False
 
     def add_it_token(self, user_id: str, it_token: str) -> bool:
         """Add IT token to existing Token."""
-        if self._get_first(query_instance.userid == user_id):
-            return len(self._upsert({"it_token": it_token}, query_instance.userid == user_id)) > 0
+        if self._get_first({"userid": user_id}):
+            return len(self._upsert({"it_token": it_token}, {"userid": user_id})) > 0
         return False
 
     def get_by_auth_code(self, auth_code: str) -> Token | None:
         """Get Token by auth code."""
-        rec = self._get_first(query_instance.auth_code == auth_code)
+        rec = self._get_first({"auth_code": auth_code})
         return Token.from_dict(rec) if isinstance(rec, dict | Document) else None
 
     def verify_it(self, user_id: str, it_token: str) -> bool:
         """Verify IT token existence."""
-        return bool(self.table.contains((query_instance.userid == user_id) & (query_instance.it_token == it_token)))
+        return self._get_first({"it_token": it_token, "userid": user_id}) is not None
 
     def verify_auth_code(self, user_id: str, auth_code: str) -> bool:
         """Verify auth code existence."""
-        return bool(self.table.contains((query_instance.userid == user_id) & (query_instance.auth_code == auth_code)))
+        return self._get_first({"auth_code": auth_code, "userid": user_id}) is not None
 
     def login_by_it_token(self, it_token: str) -> Token | None:
         """Login by IT token."""
-        rec = self._get_first(query_instance.it_token == it_token)
+        rec = self._get_first({"it_token": it_token})
         return Token.from_dict(rec) if isinstance(rec, dict | Document) else None
 
     def revoke_user_expired(self, user_id: str) -> None:
         """Revoke expired Tokens for user."""
         now_iso = datetime.now(tz=bumper_isc.LOCAL_TIMEZONE).isoformat()
-        expired = self._get_multi((query_instance.userid == user_id) & (where("expiration") < now_iso))
+        expired = [r for r in self._get_multi({"userid": user_id}) if _is_expired(r, now_iso)]
         for r in expired:
             _LOGGER.debug(f"Revoking expired token {r.get('token')}")
-            self.table.remove(doc_ids=[r.doc_id])
+        self._remove_ids(r.doc_id for r in expired)
 
     def revoke_token(self, user_id: str, token_str: str) -> None:
         """Revoke specific Token for user."""
-        self.table.remove((query_instance.userid == user_id) & (query_instance.token == token_str))
+        self._remove_multi({"token": token_str, "userid": user_id})
 
     def revoke_expired(self) -> None:
-        """Revoke all expired Tokens."""
+        """Revoke all expired Tokens with a single delete."""
         now_iso = datetime.now(tz=bumper_isc.LOCAL_TIMEZONE).isoformat()
-        expired = self._get_multi(where("expiration") < now_iso)
+        expired = self._get_range("expiration", upper=now_iso)
         for r in expired:
             _LOGGER.debug(f"Revoking expired token {r.get('token')}")
-            self.table.remove(doc_ids=[r.doc_id])
+        self._remove_ids(r.doc_id for r in expired)
+
+    def next_expiration(self) -> datetime | None:
+        """Return the earliest expiration of all Tokens, None if there are no Tokens."""
+        rec = next(iter(self._get_range("expiration", lower="", limit=1)), None)
+        return Token.from_dict(rec).expiration if rec is not None else None
 
     def revoke_all_for_user(self, user_id: str) -> None:
         """Revoke all Tokens for user."""
-        recs = self._get_multi(query_instance.userid == user_id)
-        self.table.remove(doc_ids=[r.doc_id for r in recs])
+        self._remove_multi({"userid": user_id})
+
+
+class AsyncTokenRepo(AsyncRepo[TokenRepo]):
+    """Awaitable view of the token repo."""
+
+    get_by_auth_code = async_method(TokenRepo.get_by_auth_code)
+    get_first = async_method(TokenRepo.get_first)
+    login_by_it_token = async_method(TokenRepo.login_by_it_token)
+    revoke_token = async_method(TokenRepo.revoke_token)
+    revoke_user_expired = async_method(TokenRepo.revoke_user_expired)
+    verify = async_method(TokenRepo.verify)
+    verify_auth_code = async_method(TokenRepo.verify_auth_code)
+    verify_it = async_method(TokenRepo.verify_it)
+
+
+def _is_expired(doc: Document, now_iso: str) -> bool:
+    """Check the stored ISO expiration of a token document against now."""
+    expiration = doc.get("expiration")
+    return isinstance(expiration, str) and expiration < now_iso
@@ -1,17 +1,21 @@
 """CRUD operations for BumperUser records."""
 
-from tinydb.table import Document
+from collections.abc import Iterable, Iterator
 
 from bumper.utils.settings import config as bumper_isc
 from bumper.web.utils.models import BumperUser
 
 from .base import BaseRepo
-from .db import TABLE_USERS, query_instance
+from .db import TABLE_USERS
+from .worker import AsyncRepo, async_method
 
 
 class UserRepo(BaseRepo):
     """Data access object for BumperUser."""
 
+    indexes = ("userid",)
+    multi_indexes = ("devices", "homeids")
+
     def __init__(self) -> None:
         super().__init__(TABLE_USERS)
 
@@ -19,60 +23,84 @@ class UserRepo(BaseRepo):
         """Create a new user if not exists."""
         if not self.get_by_id(user_id):
             user = BumperUser(userid=user_id)
-            if len(self._upsert(user.as_dict(), query_instance.userid == user_id)) > 0:
+            if len(self._upsert(user.as_dict(), {"userid": user_id})) > 0:
                 self.add_home_id(user.userid, bumper_isc.HOME_ID)
 
     def remove(self, user_id: str) -> None:
         """Remove a user if exists."""
-        self._remove(query_instance.userid == user_id)
+        self._remove({"userid": user_id})
 
     def get_by_id(self, user_id: str) -> BumperUser | None:
         """Get user by ID."""
-        doc = self._get(query_instance.userid == user_id)
-        return BumperUser.from_dict(doc) if isinstance(doc, dict | Document) else None
+        user: BumperUser | None = self._get_model({"userid": user_id}, BumperUser.from_dict)
+        return user
 
     def get_by_device_id(self, device_id: str) -> BumperUser | None:
         """Get user by device ID."""
-        doc = self._get(query_instance.devices.any([device_id]))
-        return BumperUser.from_dict(doc) if isinstance(doc, dict | Document) else None
+        user: BumperUser | None = self._get_model({"devices": device_id}, BumperUser.from_dict)
+        return user
 
     def get_by_home_id(self, home_id: str) -> BumperUser | None:
         """Get user by home ID."""
-        doc = self._get(query_instance.homeids.any([home_id]))
-        return BumperUser.from_dict(doc) if isinstance(doc, dict | Document) else None
+        user: BumperUser | None = self._get_model({"homeids": home_id}, BumperUser.from_dict)
+        return user
 
     def list_all(self) -> list[BumperUser]:
         """List all users."""
-        return [BumperUser.from_dict(doc) for doc in self.table.all() if isinstance(doc, dict)]
+        return self._all_models(BumperUser.from_dict)
+
+    def list_chunks(self, chunk_size: int) -> Iterator[list[BumperUser]]:
+        """List all users in chunks of at most chunk_size users, decoded one chunk at a time."""
+        return self._model_chunks(BumperUser.from_dict, chunk_size)
 
     # ******************************************************************************
 
     def add_device(self, user_id: str, did: str) -> None:
         """Add device to user."""
-        q = query_instance.userid == user_id
-        self.update_list_field(q, "devices", did, True)
+        self.add_to_user(user_id, devices=[did])
 
     def remove_device(self, user_id: str, did: str) -> None:
         """Remove device from user."""
-        q = query_instance.userid == user_id
-        self.update_list_field(q, "devices", did, False)
+        self.update_sets({"userid": user_id}, remove={"devices": [did]})
 
     def add_bot(self, user_id: str, did: str) -> None:
         """Add bot to user."""
-        q = query_instance.userid == user_id
-        self.update_list_field(q, "bots", did, True)
+        self.add_to_user(user_id, bots=[did])
+
+    def add_bots(self, user_id: str, dids: Iterable[str]) -> None:
+        """Add multiple bots to user."""
+        self.add_to_user(user_id, bots=dids)
 
     def remove_bot(self, user_id: str, did: str) -> None:
         """Remove bot from user."""
-        q = query_instance.userid == user_id
-        self.update_list_field(q, "bots", did, False)
+        self.update_sets({"userid": user_id}, remove={"bots": [did]})
 
     def add_home_id(self, user_id: str, did: str) -> None:
         """Add home_id to user."""
-        q = query_instance.userid == user_id
-        self.update_list_field(q, "homeids", did, True)
+        self.add_to_user(user_id, home_ids=[did])
 
     def remove_home_id(self, user_id: str, did: str) -> None:
         """Remove home_id from user."""
-        q = query_instance.userid == user_id
-        self.update_list_field(q, "homeids", did, False)
+        self.update_sets({"userid": user_id}, remove={"homeids": [did]})
+
+    def add_to_user(
+        self,
+        user_id: str,
+        devices: Iterable[str] = (),
+        bots: Iterable[str] = (),
+        home_ids: Iterable[str] = (),
+    ) -> None:
+        """Add devices, bots and home ids missing from a user, with at most one write."""
+        self.update_sets({"userid": user_id}, add={"devices": devices, "bots": bots, "homeids": home_ids})
+
+
+class AsyncUserRepo(AsyncRepo[UserRepo]):
+    """Awaitable view of the user repo."""
+
+    add_home_id = async_method(UserRepo.add_home_id)
+    get_by_device_id = async_method(UserRepo.get_by_device_id)
+    get_by_home_id = async_method(UserRepo.get_by_home_id)
+    get_by_id = async_method(UserRepo.get_by_id)
+    list_all = async_method(UserRepo.list_all)
+    remove = async_method(UserRepo.remove)
+    remove_home_id = async_method(UserRepo.remove_home_id)
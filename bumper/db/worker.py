@@ -0,0 +1,122 @@
+"""Run database work on a dedicated thread, off the event loop."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+import functools
+import logging
+import threading
+import time
+from typing import Any, Concatenate, Generic, ParamSpec, TypeVar
+
+_LOGGER = logging.getLogger(__name__)
+
+# Guards the shared TinyDB instance, held by the worker for each job and by every repo operation
+db_lock = threading.RLock()
+
+T = TypeVar("T")
+T_co = TypeVar("T_co", covariant=True)
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class DBWorker:
+    """Single thread executing database jobs one at a time, in submission order."""
+
+    def __init__(self) -> None:
+        self._executor: ThreadPoolExecutor | None = None
+        self._guard = threading.Lock()
+        self.jobs = 0
+        self.failed = 0
+        self.queued = 0
+        self.busy_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future[Any]:
+        """Queue a job and return its future."""
+        with self._guard:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bumper-db")
+            self.queued += 1
+            return self._executor.submit(self._call, time.perf_counter(), functools.partial(fn, *args, **kwargs))
+
+    async def run(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+        """Run a job on the worker and wait for its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def post(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> None:
+        """Queue a job without waiting for it, failures are logged."""
+        self.submit(fn, *args, **kwargs).add_done_callback(self._log_failure)
+
+    def shutdown(self) -> None:
+        """Finish all queued jobs and stop the thread, the next submit starts a new one."""
+        with self._guard:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict[str, float]:
+        """Return job counters and timings."""
+        return {
+            "jobs": self.jobs,
+            "failed": self.failed,
+            "queued": self.queued,
+            "busy_ms": round(self.busy_seconds * 1000, 3),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+
+    def _call(self, queued_at: float, job: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            with db_lock:
+                return job()
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            with self._guard:
+                self.queued -= 1
+                self.jobs += 1
+                self.busy_seconds += time.perf_counter() - started
+                self.max_wait_seconds = max(self.max_wait_seconds, started - queued_at)
+
+    @staticmethod
+    def _log_failure(future: Future[Any]) -> None:
+        if not future.cancelled() and (exc := future.exception()) is not None:
+            _LOGGER.error("Database job failed", exc_info=exc)
+
+
+class AsyncRepo(Generic[T_co]):  # noqa: UP046
+    """Awaitable view of a repo, the methods declared with `async_method` run on the database worker."""
+
+    def __init__(self, repo: T_co) -> None:
+        self._repo = repo
+
+
+class _AsyncMethod(Generic[T, P, R]):  # noqa: UP046
+    """Descriptor of an `AsyncRepo` method, typed like the repo method but awaitable."""
+
+    def __init__(self, method: Callable[Concatenate[T, P], R]) -> None:
+        self._name = method.__name__
+
+    def __get__(self, facade: AsyncRepo[T], owner: type | None = None) -> Callable[P, Awaitable[R]]:
+        async def call(*args: P.args, **kwargs: P.kwargs) -> R:
+            # Resolved per call, so the method can be replaced on the repo instance
+            method: Callable[P, R] = getattr(facade._repo, self._name)  # noqa: SLF001
+            result: R = await db_worker.run(method, *args, **kwargs)
+            return result
+
+        return call
+
+
+def async_method(method: Callable[Concatenate[T, P], R]) -> _AsyncMethod[T, P, R]:  # noqa: UP047
+    """Declare a repo method on an `AsyncRepo`, keeping its signature with an awaitable result."""
+    return _AsyncMethod(method)
+
+
+db_worker = DBWorker()
+
+
+async def run_in_db(fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """Run fn on the database worker, use for a group of repo calls that belong together."""
+    return await db_worker.run(fn, *args, **kwargs)
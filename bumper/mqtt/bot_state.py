@@ -0,0 +1,82 @@
+"""Latest state bots broadcast over ATR topics, to answer read commands without asking the bot."""
+
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any
+
+from bumper.utils import json_codec
+
+_LOGGER = logging.getLogger(__name__)
+
+# States whose broadcast carries the same data as the response to the read command, by ATR function
+# and by read command. Others like onStats/reportStats differ from getStats and are never cached.
+_BROADCAST_STATES = {
+    "onBattery": "battery",
+    "onChargeState": "charge_state",
+    "onCleanInfo": "clean_info",
+    "onCleanInfo_V2": "clean_info_v2",
+    "onError": "error",
+}
+_READ_STATES = {
+    "getBattery": "battery",
+    "getChargeState": "charge_state",
+    "getCleanInfo": "clean_info",
+    "getCleanInfo_V2": "clean_info_v2",
+    "getError": "error",
+}
+
+
+@dataclass(slots=True)
+class BotState:
+    """Last broadcast of a state with its header, received at `updated` (monotonic seconds)."""
+
+    header: dict[str, Any]
+    data: Any
+    updated: float
+
+
+class BotStateCache:
+    """Per bot the data of the last JSON ATR broadcast of every known state.
+
+    Bots push a broadcast whenever a state like the battery level changes, so a read command
+    for the same state can be answered with it while it is younger than a max age. Only the
+    states listed in `_BROADCAST_STATES` are cached, other broadcasts are ignored.
+    """
+
+    def __init__(self) -> None:
+        self._states: dict[str, dict[str, BotState]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, did: str, function: str, payload: str) -> bool:
+        """Store the data of a broadcast, returns False if it is no JSON broadcast of a known state."""
+        if (name := _BROADCAST_STATES.get(function)) is None:
+            return False
+        try:
+            message = json_codec.loads(payload)
+        # Decode errors have a different type per JSON codec
+        except Exception:
+            return False
+        if not isinstance(message, dict) or not isinstance(body := message.get("body"), dict) or "data" not in body:
+            return False
+        if not isinstance(header := message.get("header"), dict):
+            header = {}
+        self._states.setdefault(did, {})[name] = BotState(header, body["data"], time.monotonic())
+        return True
+
+    def response(self, did: str | None, cmd_name: str | None, max_age: float) -> dict[str, Any] | None:
+        """Return a response to a read command built from a broadcast younger than max_age seconds."""
+        if did is None or cmd_name is None or (name := _READ_STATES.get(cmd_name)) is None:
+            return None
+        state = self._states.get(did, {}).get(name)
+        if state is None or time.monotonic() - state.updated > max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        _LOGGER.debug(f"Answering from broadcast state :: did='{did}' :: cmd='{cmd_name}'")
+        return {"header": dict(state.header), "body": {"code": 0, "msg": "ok", "data": state.data}}
+
+    def stats(self) -> dict[str, int]:
+        """Return hit and miss counters and the number of bots with states."""
+        return {"hits": self.hits, "misses": self.misses, "bots": len(self._states)}
@@ -0,0 +1,118 @@
+"""Limit and order the commands the helper bot sends to each bot."""
+
+import asyncio
+from dataclasses import dataclass, field
+import heapq
+import itertools
+
+from bumper.utils.errors import CommandQueueFullError
+
+# Priority classes, lower values are sent first
+PRIORITY_CONTROL = 0
+PRIORITY_POLL = 1
+
+
+def command_priority(cmd_name: str | None) -> int:
+    """Return the priority class of a command, status polls (get*) yield to control commands."""
+    return PRIORITY_POLL if (cmd_name or "").lower().startswith("get") else PRIORITY_CONTROL
+
+
+@dataclass(order=True, slots=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: asyncio.Future[None] = field(compare=False)
+
+
+class BotCommandQueue:
+    """Commands of a single bot, at most `max_in_flight` sent at once and `max_queued` waiting.
+
+    Waiting commands get a free slot by priority, then in arrival order.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int) -> None:
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self._waiting: list[_Waiter] = []
+        self._seq = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        """Return the number of commands waiting for a slot."""
+        return sum(1 for waiter in self._waiting if not waiter.future.done())
+
+    @property
+    def idle(self) -> bool:
+        """Return True if no command is in flight or waiting."""
+        return not self.in_flight and not self.queued
+
+    async def acquire(self, priority: int) -> None:
+        """Wait for a slot, raises CommandQueueFullError if the queue is full."""
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            return
+        if self.queued >= self.max_queued:
+            msg = f"Command queue of bot is full ({self.max_queued} waiting)"
+            raise CommandQueueFullError(msg)
+        waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiting, waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()
+            waiter.future.cancel()
+            raise
+
+    def release(self) -> None:
+        """Free a slot, handing it over to the next waiting command."""
+        while self._waiting:
+            waiter = heapq.heappop(self._waiting)
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class CommandScheduler:
+    """Command queues per bot, created on first use and dropped when idle."""
+
+    def __init__(self) -> None:
+        self._queues: dict[str, BotCommandQueue] = {}
+        self.rejected = 0
+
+    async def acquire(self, did: str | None, priority: int, max_in_flight: int, max_queued: int) -> None:
+        """Wait for a slot to send a command to a bot, raises CommandQueueFullError if its queue is full."""
+        key = did or ""
+        if (queue := self._queues.get(key)) is None:
+            queue = self._queues[key] = BotCommandQueue(max_in_flight, max_queued)
+        try:
+            await queue.acquire(priority)
+        except CommandQueueFullError:
+            self.rejected += 1
+            raise
+        finally:
+            self._drop_idle(key, queue)
+
+    def release(self, did: str | None) -> None:
+        """Free the slot of a sent command."""
+        key = did or ""
+        if (queue := self._queues.get(key)) is None:
+            return
+        queue.release()
+        self._drop_idle(key, queue)
+
+    def _drop_idle(self, key: str, queue: BotCommandQueue) -> None:
+        if queue.idle and self._queues.get(key) is queue:
+            del self._queues[key]
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of bots with commands, commands in flight, waiting and rejected."""
+        return {
+            "bots": len(self._queues),
+            "in_flight": sum(queue.in_flight for queue in self._queues.values()),
+            "queued": sum(queue.queued for queue in self._queues.values()),
+            "rejected": self.rejected,
+        }
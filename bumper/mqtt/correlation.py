@@ -0,0 +1,94 @@
+"""Correlate MQTT command responses with the requests waiting for them."""
+
+import asyncio
+from dataclasses import dataclass
+import itertools
+import logging
+import secrets
+
+_LOGGER = logging.getLogger(__name__)
+
+# Random per process, so responses to commands of a previous run never match a new command
+_ID_PREFIX = secrets.token_hex(4)
+_ID_COUNTER = itertools.count(1)
+
+
+def next_request_id() -> str:
+    """Return a request id unique for the lifetime of the process."""
+    return f"{_ID_PREFIX}{next(_ID_COUNTER):x}"
+
+
+@dataclass(slots=True)
+class _Pending:
+    future: asyncio.Future[str]
+    timer: asyncio.TimerHandle
+
+
+class CommandRegistry:
+    """Commands waiting for a response, by request id.
+
+    Every command gets its own deadline, after which its future fails with TimeoutError,
+    so the number of commands in flight is not limited and none is evicted early.
+    Responses without a waiting command are counted as orphaned.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[str, _Pending] = {}
+        self.registered = 0
+        self.completed = 0
+        self.timed_out = 0
+        self.orphaned = 0
+
+    def __contains__(self, request_id: str) -> bool:
+        """Return True if the command is waiting for its response."""
+        return request_id in self._pending
+
+    def __len__(self) -> int:
+        """Return the number of commands in flight."""
+        return len(self._pending)
+
+    def register(self, request_id: str, timeout: float) -> asyncio.Future[str]:
+        """Register a command and return the future of its response, failing after timeout seconds."""
+        if request_id in self._pending:
+            msg = f"Command already in flight :: {request_id}"
+            raise ValueError(msg)
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[str] = loop.create_future()
+        self._pending[request_id] = _Pending(future, loop.call_later(timeout, self._expire, request_id))
+        self.registered += 1
+        return future
+
+    def resolve(self, request_id: str, response: str) -> bool:
+        """Complete the command with its response, returns False for an orphaned response."""
+        if (pending := self._pending.pop(request_id, None)) is None:
+            self.orphaned += 1
+            _LOGGER.debug(f"Response without waiting command :: {request_id}")
+            return False
+        pending.timer.cancel()
+        if not pending.future.done():
+            pending.future.set_result(response)
+        self.completed += 1
+        return True
+
+    def discard(self, request_id: str) -> None:
+        """Forget a command, cancelling its future if it is still waiting."""
+        if (pending := self._pending.pop(request_id, None)) is not None:
+            pending.timer.cancel()
+            pending.future.cancel()
+
+    def stats(self) -> dict[str, int]:
+        """Return command counters."""
+        return {
+            "in_flight": len(self._pending),
+            "registered": self.registered,
+            "completed": self.completed,
+            "timed_out": self.timed_out,
+            "orphaned": self.orphaned,
+        }
+
+    def _expire(self, request_id: str) -> None:
+        if (pending := self._pending.pop(request_id, None)) is None:
+            return
+        self.timed_out += 1
+        if not pending.future.done():
+            pending.future.set_exception(TimeoutError(f"No response for command :: {request_id}"))
@@ -3,13 +3,13 @@
 import json
 import logging
 
-from bumper.db import clean_log_repo
+from bumper.db import async_clean_log_repo
 from bumper.web.utils.models import CleanLog
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def clean_log(did: str, rid: str, payload: str) -> None:
+async def clean_log(did: str, rid: str, payload: str) -> None:
     """Add clean log.
 
     type: "onStats" or "reportStats"
@@ -31,4 +31,4 @@ def clean_log(did: str, rid: str, payload: str) -> None:
         return
 
     t_clean_log = CleanLog.from_dict(did=did, rid=rid, data=body_data)
-    clean_log_repo.add_or_update(t_clean_log)
+    await async_clean_log_repo.add_or_update(t_clean_log)
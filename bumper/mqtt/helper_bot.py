@@ -1,25 +1,26 @@
 """Helper bot module."""
 
 import asyncio
+from collections.abc import Sequence
 import contextlib
+from dataclasses import dataclass
 import json
 import logging
-import random
 import ssl
-import string
-from typing import TYPE_CHECKING, Any
+from typing import Any
 
 from aiohttp import web
 from aiohttp.web_response import Response
 from aiomqtt import Client as MQTTClient, MqttError, Topic
-from cachetools import TTLCache
 
+from bumper.mqtt.bot_state import BotStateCache
+from bumper.mqtt.command_queue import CommandScheduler, command_priority
+from bumper.mqtt.correlation import CommandRegistry, next_request_id
 from bumper.mqtt.handle_atr import clean_log
-from bumper.utils import utils
-from bumper.web.utils.response_helper import response_error_v8, response_success_v2
-
-if TYPE_CHECKING:
-    from collections.abc import MutableMapping
+from bumper.utils import json_codec, utils
+from bumper.utils.errors import CommandQueueFullError
+from bumper.utils.settings import config as bumper_isc
+from bumper.web.utils.response_helper import json_response, response_error_v8, response_success_v2
 
 _LOGGER = logging.getLogger(__name__)
 HELPER_BOT_CLIENT_ID = "helperbot@bumper/helperbot"
@@ -47,7 +48,7 @@ class MQTTCommandModel:
 
     def __init__(self, cmdjson: dict[str, Any], version: str = VERSION_OLD) -> None:
         """MQTT Command Model init."""
-        self.request_id = "".join(random.sample(string.ascii_letters, 4))
+        self.request_id = next_request_id()
         self.version = version
         if version == self.VERSION_OLD:
             self.from_version_1(cmdjson)
@@ -128,6 +129,33 @@ class MQTTCommandModel:
         )
 
 
+@dataclass(slots=True)
+class _SharedCommand:
+    task: asyncio.Future[str | dict[str, Any] | None]
+    sent: float  # loop time
+
+
+def _coalesce_key(cmd: MQTTCommandModel) -> tuple[str | None, ...] | None:
+    """Return what identifies a read command for coalescing, None if it must always be sent."""
+    if bumper_isc.HELPER_BOT_COALESCE_WINDOW <= 0 or not (cmd.cmd_name or "").lower().startswith("get"):
+        return None
+    return (cmd.version, cmd.did, cmd.cmd_name, cmd.payload_type, cmd.payload)
+
+
+def _has_arguments(cmd: MQTTCommandModel) -> bool:
+    """Return True if a JSON command passes data besides the target state ("td")."""
+    try:
+        payload = json_codec.loads(cmd.payload)
+    # Decode errors have a different type per JSON codec
+    except Exception:
+        return True
+    body = payload.get("body") if isinstance(payload, dict) else None
+    data = body.get("data") if isinstance(body, dict) else None
+    if isinstance(data, dict):
+        return any(key != "td" for key in data)
+    return bool(data)
+
+
 class MQTTHelperBot:
     """Helper bot, which converts commands from the rest api to mqtt ones."""
 
@@ -139,7 +167,12 @@ class MQTTHelperBot:
         self._timeout = timeout
         self._is_connected = False  # Track connection state
         self._client: MQTTClient | None = None  # MQTT client instance
-        self._commands: MutableMapping[str, CommandDto] = TTLCache(maxsize=timeout * 60, ttl=timeout * 1.1)
+        self._commands = CommandRegistry()  # Commands waiting for their response
+        self._scheduler = CommandScheduler()  # Commands in flight and waiting per bot
+        self.bot_states = BotStateCache()  # Last broadcast states per bot
+        self._coalesced: dict[tuple[str | None, ...], _SharedCommand] = {}  # Recent read commands by their content
+        self._coalesce_hits = 0
+        self._coalesce_misses = 0
         self._mqtt_task: asyncio.Task[None] | None = None  # Task for managing MQTT connection
 
     @property
@@ -203,12 +236,16 @@ class MQTTHelperBot:
 
     async def send_command(self, cmd: MQTTCommandModel) -> Response:
         """Send command over MQTT."""
-        if cmd.version == cmd.VERSION_OLD:
-            return await self._send_command_old(cmd)
-        if cmd.version == cmd.VERSION_NEW:
-            return await self._send_command_new(cmd)
-        if cmd.version == cmd.VERSION_P2P:
-            return await self._send_command_p2p(cmd)
+        try:
+            if cmd.version == cmd.VERSION_OLD:
+                return await self._send_command_old(cmd)
+            if cmd.version == cmd.VERSION_NEW:
+                return await self._send_command_new(cmd)
+            if cmd.version == cmd.VERSION_P2P:
+                return await self._send_command_p2p(cmd)
+        except CommandQueueFullError as e:
+            _LOGGER.warning(f"Command rejected :: did='{cmd.did}' :: cmd='{cmd.cmd_name}' :: {e}")
+            return response_error_v8(cmd.request_id, str(e))
 
         msg = f"Unsupported version :: '{cmd.version}'"
         _LOGGER.error(msg)
@@ -225,7 +262,7 @@ class MQTTHelperBot:
         if not cmd_response:
             return response_error_v8(cmd.request_id, "mqtt wait for response failed, see logs form more information")
 
-        return web.json_response(
+        return json_response(
             {
                 "id": cmd.request_id,
                 "ret": "ok",
@@ -246,7 +283,7 @@ class MQTTHelperBot:
             return response_error_v8(cmd.request_id, "mqtt wait for response failed, see logs form more information")
 
         return web.Response(
-            body=json.dumps(cmd_response, separators=(",", ":")).encode("utf-8"),
+            body=json_codec.dumpb(cmd_response),
             content_type="application/octet-stream",
             charset="utf-8",
             headers={"x-ngiot-fmt": "b", "x-ngiot-ret": "ok"},
@@ -282,20 +319,103 @@ class MQTTHelperBot:
             )
         return response_success_v2(data={cmd.cmd_name_orig: {"ret": "ok", "did": cmd.did}})
 
-    async def send_command_plain(self, cmd: MQTTCommandModel) -> str | dict[str, Any] | None:
-        """Send command over MQTT."""
+    async def send_commands(
+        self,
+        cmds: Sequence[MQTTCommandModel],
+        max_wait: float | None = None,
+    ) -> list[str | dict[str, Any] | None]:
+        """Send commands concurrently and return their responses in order, None for the unanswered ones.
+
+        All commands share one deadline, commands rejected by a full bot queue count as unanswered.
+        Once the deadline passes the responses received so far are returned.
+        """
+        max_wait = self._timeout if max_wait is None else max_wait
+        tasks = [asyncio.create_task(self.send_command_plain(cmd, max_wait)) for cmd in cmds]
+        if not tasks:
+            return []
+        _, pending = await asyncio.wait(tasks, timeout=max_wait)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return [None if task in pending or task.exception() else task.result() for task in tasks]
+
+    async def send_command_plain(self, cmd: MQTTCommandModel, max_wait: float | None = None) -> str | dict[str, Any] | None:
+        """Send command over MQTT and wait for the response, at most max_wait seconds (default: bot timeout).
+
+        An identical read command (get*) to the same bot sent less than HELPER_BOT_COALESCE_WINDOW
+        seconds before is not sent again, its response is shared instead. A read command without
+        arguments is answered from the last broadcast of a known state if it is younger than
+        HELPER_BOT_STATE_MAX_AGE seconds.
+
+        Commands sent to a bot go through its queue, see `_send_command_plain`.
+        """
+        if (
+            bumper_isc.HELPER_BOT_STATE_MAX_AGE > 0
+            and cmd.payload_type == "j"
+            and not _has_arguments(cmd)
+            and (cached := self.bot_states.response(cmd.did, cmd.cmd_name, bumper_isc.HELPER_BOT_STATE_MAX_AGE)) is not None
+        ):
+            return cached
+        if (key := _coalesce_key(cmd)) is None:
+            return await self._send_command_plain(cmd, max_wait)
+        loop = asyncio.get_running_loop()
+        if (shared := self._coalesced.get(key)) is not None and loop.time() - shared.sent < bumper_isc.HELPER_BOT_COALESCE_WINDOW:
+            self._coalesce_hits += 1
+            _LOGGER.debug(f"Sharing response of identical command :: did='{cmd.did}' :: cmd='{cmd.cmd_name}'")
+        else:
+            self._coalesce_misses += 1
+            task = asyncio.ensure_future(self._send_command_plain(cmd, max_wait))
+            shared = self._coalesced[key] = _SharedCommand(task, loop.time())
+            shared.task.add_done_callback(lambda task: self._release_coalesced(key, task))
+        try:
+            # A caller giving up must not cancel the command for the others waiting for it
+            return await asyncio.wait_for(asyncio.shield(shared.task), max_wait)
+        except TimeoutError:
+            return None
+
+    def _release_coalesced(self, key: tuple[str | None, ...], task: asyncio.Future[Any]) -> None:
+        """Forget a finished command once its window passed, at once if it got no response."""
+        if (shared := self._coalesced.get(key)) is None or shared.task is not task:
+            return
+        remaining = shared.sent + bumper_isc.HELPER_BOT_COALESCE_WINDOW - asyncio.get_running_loop().time()
+        if task.cancelled() or task.exception() or task.result() is None or remaining <= 0:
+            del self._coalesced[key]
+        else:
+            asyncio.get_running_loop().call_later(remaining, self._release_coalesced, key, task)
+
+    async def _send_command_plain(self, cmd: MQTTCommandModel, max_wait: float | None) -> str | dict[str, Any] | None:
+        """Publish a command and wait for its response, the wait for a free slot of the bot counts towards max_wait.
+
+        At most HELPER_BOT_MAX_COMMANDS_PER_BOT commands are in flight per bot, others wait by
+        priority, control commands first. Raises CommandQueueFullError if
+        HELPER_BOT_MAX_QUEUED_PER_BOT commands are already waiting.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self._timeout if max_wait is None else max_wait)
+        try:
+            await asyncio.wait_for(
+                self._scheduler.acquire(
+                    cmd.did,
+                    command_priority(cmd.cmd_name),
+                    bumper_isc.HELPER_BOT_MAX_COMMANDS_PER_BOT,
+                    bumper_isc.HELPER_BOT_MAX_QUEUED_PER_BOT,
+                ),
+                deadline - loop.time(),
+            )
+        except TimeoutError:
+            _LOGGER.warning(f"No free command slot :: did='{cmd.did}' :: cmd='{cmd.cmd_name}'")
+            return None
         try:
             if not await self.is_connected:
                 await self.start()
 
             topic = cmd.create_topic()
-            command_dto = CommandDto(cmd.payload_type)
-            self._commands[cmd.request_id] = command_dto
+            response = self._commands.register(cmd.request_id, max(deadline - loop.time(), 0))
 
             _LOGGER.debug(f"Sending message :: topic={topic} :: payload={cmd.payload}")
             await self.publish(topic, cmd.payload)
 
-            cmd_response = await self._wait_for_resp(command_dto)
+            cmd_response = await self._wait_for_resp(response, cmd.payload_type)
             _LOGGER.debug(f"To   Bot  Request :: {cmd.__dict__}")
             _LOGGER.debug(f"From Bot Response :: {cmd_response}")
 
@@ -306,7 +426,8 @@ class MQTTHelperBot:
         except Exception:
             _LOGGER.exception("Could not send command")
         finally:
-            self._commands.pop(cmd.request_id, None)
+            self._commands.discard(cmd.request_id)
+            self._scheduler.release(cmd.did)
         return None
 
     async def publish(self, topic: str, payload: str) -> None:
@@ -316,10 +437,23 @@ class MQTTHelperBot:
             raise MqttError(error_message)
         await self._client.publish(topic, payload.encode())
 
-    async def _wait_for_resp(self, command_dto: "CommandDto") -> str | dict[str, Any] | None:
-        """Wait for response."""
+    def command_stats(self) -> dict[str, float]:
+        """Return counters of commands in flight, queued, rejected, completed, timed out, of orphaned and shared responses."""
+        lookups = self._coalesce_hits + self._coalesce_misses
+        scheduler = self._scheduler.stats()
+        return {
+            **self._commands.stats(),
+            "coalesced": self._coalesce_hits,
+            "coalesce_hit_rate": round(self._coalesce_hits / lookups, 3) if lookups else 0.0,
+            "state_hits": self.bot_states.hits,
+            "queued": scheduler["queued"],
+            "rejected": scheduler["rejected"],
+        }
+
+    async def _wait_for_resp(self, response: asyncio.Future[str], payload_type: str) -> str | dict[str, Any] | None:
+        """Wait for the response of a command until its deadline."""
         try:
-            return await asyncio.wait_for(command_dto.wait_for_response(), timeout=self._timeout)
+            return _decode_response(await response, payload_type)
         except TimeoutError:
             _LOGGER.debug("wait_for_resp timeout reached")
         except asyncio.CancelledError:
@@ -343,24 +477,25 @@ class MQTTHelperBot:
 
             _LOGGER.debug(f"Got message :: topic={topic.value} :: payload={decoded_payload}")
             topic_split = topic.value.split("/")  # Use `topic.value` to get the string representation
-            if topic_split[1] == "p2p" and topic_split[10] in self._commands:
-                self._commands[topic_split[10]].add_response(decoded_payload)
-            elif topic_split[1] == "atr" and topic_split[2] in ("onStats", "reportStats"):
-                clean_log(did=topic_split[3], rid=topic_split[5], payload=decoded_payload)
+            if topic_split[1] == "p2p" and topic_split[9] == "p":
+                self._commands.resolve(topic_split[10], decoded_payload)
             elif topic_split[1] == "atr":
-                # pass  # NOTE: check later to use for some server side information to display
-                _LOGGER.debug(
-                    {
-                        "info": "ATR :: Provided message is not implemented to be processed",
-                        "type": topic_split[1],
-                        "function": topic_split[2],
-                        "did": topic_split[3],
-                        "class": topic_split[4],
-                        "rid": topic_split[5],
-                        "payloadType": topic_split[6],
-                        "payload": decoded_payload,
-                    },
-                )
+                cached = topic_split[6] == "j" and self.bot_states.update(topic_split[3], topic_split[2], decoded_payload)
+                if topic_split[2] in ("onStats", "reportStats"):
+                    await clean_log(did=topic_split[3], rid=topic_split[5], payload=decoded_payload)
+                elif not cached:
+                    _LOGGER.debug(
+                        {
+                            "info": "ATR :: Provided message is not implemented to be processed",
+                            "type": topic_split[1],
+                            "function": topic_split[2],
+                            "did": topic_split[3],
+                            "class": topic_split[4],
+                            "rid": topic_split[5],
+                            "payloadType": topic_split[6],
+                            "payload": decoded_payload,
+                        },
+                    )
             elif topic_split[1] == "p2p":
                 _LOGGER.debug(
                     {
@@ -379,25 +514,10 @@ class MQTTHelperBot:
             raise
 
 
-class CommandDto:
-    """Command DTO."""
-
-    def __init__(self, payload_type: str) -> None:
-        """Command DTO init."""
-        self._payload_type = payload_type
-        self._event = asyncio.Event()
-        self._response: str | bytes | None = None
-
-    async def wait_for_response(self) -> str | dict[str, Any] | None:
-        """Wait for the response to be received."""
-        await self._event.wait()
-        if self._payload_type == "j" and self._response is not None:
-            res = json.loads(self._response)
-            if isinstance(res, dict):
-                return res
-        return str(self._response) if self._response is not None else None
-
-    def add_response(self, response: str | bytes) -> None:
-        """Add received response."""
-        self._response = response
-        self._event.set()
+def _decode_response(response: str, payload_type: str) -> str | dict[str, Any]:
+    """Return a JSON response as dict, any other response as received."""
+    if payload_type == "j":
+        res = json_codec.loads(response)
+        if isinstance(res, dict):
+            return res
+    return response
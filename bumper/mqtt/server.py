@@ -16,7 +16,7 @@ from amqtt.plugins.base import BaseAuthPlugin
 from amqtt.session import IncomingApplicationMessage, Session
 from passlib.apps import custom_app_context as pwd_context
 
-from bumper.db import bot_repo, client_repo, token_repo
+from bumper.db import async_bot_repo, async_client_repo, async_token_repo
 from bumper.mqtt import helper_bot, proxy as mqtt_proxy
 from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
@@ -245,12 +245,12 @@ class BumperMQTTServerPlugin(BaseAuthPlugin):  # type: ignore[misc]
                         "No password provided and password authentication is enabled ('USE_AUTH')",
                     )
                     raise Exception(error_msg)
-                if not token_repo.verify_auth_code(did, password):
+                if not await async_token_repo.verify_auth_code(did, password):
                     _LOGGER.warning("Bumper Authentication Failed :: Wrong password")
                     raise Exception(error_msg)
 
             if username and client_type == "bot":
-                bot_repo.add(username, did, class_id, resource, "eco-ng")
+                await async_bot_repo.add(username, did, class_id, resource, "eco-ng")
                 _LOGGER.info(f"Bumper Authentication Success :: Bot :: Username: {username} :: ClientID: {client_id}")
 
                 if bumper_isc.BUMPER_PROXY_MQTT and username is not None and password is not None:
@@ -263,7 +263,7 @@ class BumperMQTTServerPlugin(BaseAuthPlugin):  # type: ignore[misc]
                 return True
 
             # all other will add as a client
-            client_repo.add(username, did, class_id, resource)
+            await async_client_repo.add(username, did, class_id, resource)
             _LOGGER.info(f"Bumper Authentication Success :: Client :: Username: {username} :: ClientID: {client_id}")
             return True
         except Exception:
@@ -371,15 +371,15 @@ class BumperMQTTServerPlugin(BaseAuthPlugin):  # type: ignore[misc]
 
     async def on_broker_client_connected(self, client_id: str, client_session: Session) -> None:
         """On client connected."""
-        self._set_client_connected(client_id, True, client_session)
+        await self._set_client_connected(client_id, True, client_session)
 
     async def on_broker_client_disconnected(self, client_id: str, client_session: Session) -> None:
         """On client disconnect."""
         if bumper_isc.BUMPER_PROXY_MQTT and client_id in self._proxy_clients:
             await self._proxy_clients.pop(client_id).disconnect()
-        self._set_client_connected(client_id, False, client_session)
+        await self._set_client_connected(client_id, False, client_session)
 
-    def _set_client_connected(self, client_id: str, connected: bool, _: Session) -> None:
+    async def _set_client_connected(self, client_id: str, connected: bool, _: Session) -> None:
         try:
             # Skip the HelperBot
             if client_id == helper_bot.HELPER_BOT_CLIENT_ID:
@@ -389,15 +389,14 @@ class BumperMQTTServerPlugin(BaseAuthPlugin):  # type: ignore[misc]
                 return
             did, _, __, client_type = result
 
+            # Connection states of known bots and clients are kept in memory, the database only gets periodic snapshots
             if client_type == "bot":
-                if bot := bot_repo.get(did):
-                    bot_repo.set_mqtt(bot.did, connected)
-                    if connected:
-                        asyncio.create_task(self._set_bot_timezone(did))  # noqa: RUF006
+                await async_bot_repo.set_mqtt(did, connected)
+                if connected:
+                    asyncio.create_task(self._set_bot_timezone(did))  # noqa: RUF006
                 return
             if client_type == "user":
-                if client := client_repo.get(did):
-                    client_repo.set_mqtt(client.userid, connected)
+                await async_client_repo.set_mqtt(did, connected)
                 return
         except Exception:
             _LOGGER.exception("Failed to connect client")
@@ -422,7 +421,7 @@ class BumperMQTTServerPlugin(BaseAuthPlugin):  # type: ignore[misc]
             if bumper_isc.mqtt_helperbot is None:
                 msg = "'bumper_isc.mqtt_helperbot' is None"
                 raise Exception(msg)
-            if not (bot := bot_repo.get(did)):
+            if not (bot := await async_bot_repo.get(did)):
                 return
 
             offset_minutes, timestamp_s = utils.get_tzm_and_ts()
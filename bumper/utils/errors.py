@@ -3,3 +3,7 @@
 
 class MigrationError(Exception):
     """Raised when a database migration fails."""
+
+
+class CommandQueueFullError(Exception):
+    """Raised when a command is rejected because the command queue of the bot is full."""
@@ -0,0 +1,102 @@
+"""JSON encoding and decoding, using orjson or msgspec when installed and the stdlib otherwise."""
+
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, is_dataclass
+from datetime import date, datetime, time
+from enum import Enum
+import json
+import logging
+from typing import Any
+from uuid import UUID
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class JSONCodec:
+    """Compact JSON encoder and decoder of a single backend, output is UTF-8 without escaping."""
+
+    name: str
+    dumpb: Callable[[Any], bytes]
+    loads: Callable[[str | bytes], Any]
+
+    def dumps(self, obj: Any) -> str:
+        """Serialize to a str."""
+        return self.dumpb(obj).decode()
+
+
+def _default(obj: Any) -> Any:
+    """Encode values JSON has no type for the same way on every backend, raise TypeError for others.
+
+    The output follows what msgspec writes natively (a zero UTC offset as Z), orjson is told
+    to pass dates and dataclasses through to this hook.
+    """
+    if isinstance(obj, datetime | date | time):
+        text = obj.isoformat()
+        return f"{text[:-6]}Z" if text.endswith("+00:00") else text
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, set | frozenset):
+        return list(obj)
+    msg = f"Object of type {type(obj).__name__} is not JSON serializable"
+    raise TypeError(msg)
+
+
+def _stdlib_dumpb(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+
+STDLIB = JSONCodec("json", _stdlib_dumpb, json.loads)
+
+
+def _orjson_codec() -> JSONCodec | None:
+    try:
+        import orjson  # noqa: PLC0415
+    except ImportError:
+        return None
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumpb(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=_default, option=options)
+        except TypeError:
+            # e.g. integers beyond 64 bit, which the stdlib handles
+            return _stdlib_dumpb(obj)
+
+    return JSONCodec("orjson", dumpb, orjson.loads)
+
+
+def _msgspec_codec() -> JSONCodec | None:
+    try:
+        import msgspec  # noqa: PLC0415
+    except ImportError:
+        return None
+
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+
+    def dumpb(obj: Any) -> bytes:
+        try:
+            encoded: bytes = encoder.encode(obj)
+        except (TypeError, OverflowError):
+            return _stdlib_dumpb(obj)
+        return encoded
+
+    return JSONCodec("msgspec", dumpb, msgspec.json.decode)
+
+
+def available_codecs() -> list[JSONCodec]:
+    """Return all usable codecs, fastest first."""
+    return [c for c in (_orjson_codec(), _msgspec_codec()) if c is not None] + [STDLIB]
+
+
+codec = available_codecs()[0]
+_LOGGER.debug(f"JSON codec :: {codec.name}")
+
+dumpb = codec.dumpb
+dumps = codec.dumps
+loads = codec.loads
@@ -0,0 +1,67 @@
+"""Measure how late the event loop wakes up, as an indicator for blocking calls."""
+
+import asyncio
+from collections import deque
+import logging
+import math
+
+from bumper.utils.settings import config as bumper_isc
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds between two samples
+SAMPLE_INTERVAL = 0.5
+# Number of recent samples used for average and percentile
+WINDOW_SIZE = 600
+# Lag in seconds from which a sample is counted and logged as slow
+SLOW_THRESHOLD = 0.1
+
+
+class LoopLagMonitor:
+    """Sleep for a fixed interval and record how much later than scheduled the loop resumed."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, window_size: int = WINDOW_SIZE) -> None:
+        self.interval = interval
+        self._window: deque[float] = deque(maxlen=window_size)
+        self.samples = 0
+        self.slow = 0
+        self.last = 0.0
+        self.max = 0.0
+
+    def record(self, lag: float) -> None:
+        """Record a single lag sample in seconds."""
+        lag = max(lag, 0.0)
+        self._window.append(lag)
+        self.samples += 1
+        self.last = lag
+        self.max = max(self.max, lag)
+        if lag >= SLOW_THRESHOLD:
+            self.slow += 1
+            _LOGGER.debug(f"Event loop lag :: {lag * 1000:.1f} ms")
+
+    def stats(self) -> dict[str, float]:
+        """Return lag statistics in milliseconds, average and p99 over the recent window."""
+        window = sorted(self._window)
+        p99 = window[min(len(window) - 1, math.ceil(len(window) * 0.99) - 1)] if window else 0.0
+        return {
+            "samples": self.samples,
+            "slow": self.slow,
+            "last_ms": round(self.last * 1000, 3),
+            "avg_ms": round(sum(window) / len(window) * 1000, 3) if window else 0.0,
+            "p99_ms": round(p99 * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+    async def run(self) -> None:
+        """Sample the loop lag until shutdown."""
+        loop = asyncio.get_running_loop()
+        try:
+            while not bumper_isc.shutting_down:
+                scheduled = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                self.record(loop.time() - scheduled)
+        except asyncio.CancelledError:
+            pass
+
+
+loop_monitor = LoopLagMonitor()
@@ -69,6 +69,21 @@ class Config:
 
     # Data Files
     db_file = str(Path(os.environ.get("DB_FILE") or data_dir / "bumper.db"))
+    DbEngineStr = Literal["json", "sqlite", "journal"]
+    DB_ENGINE: DbEngineStr = cast("DbEngineStr", (os.environ.get("DB_ENGINE") or "json").lower())
+    DB_FLUSH_INTERVAL: float = float(os.environ.get("DB_FLUSH_INTERVAL") or 5)  # seconds
+    DB_JOURNAL_COMPACT_RECORDS: int = int(os.environ.get("DB_JOURNAL_COMPACT_RECORDS") or 10000)
+    DB_MULTI_PROCESS: bool = str_to_bool(os.environ.get("DB_MULTI_PROCESS")) or False
+    DB_SYNC_INTERVAL: float = float(os.environ.get("DB_SYNC_INTERVAL") or 1)  # seconds
+    DB_SLOW_OP_MS: float = float(os.environ.get("DB_SLOW_OP_MS") or 20)
+
+    PRESENCE_SNAPSHOT_INTERVAL: float = float(os.environ.get("PRESENCE_SNAPSHOT_INTERVAL") or 60)  # seconds
+
+    # Clean logs
+    CLEAN_LOG_MAX_AGE_DAYS: int = int(os.environ.get("CLEAN_LOG_MAX_AGE_DAYS") or 0)  # 0 = keep forever
+    CLEAN_LOG_MAX_PER_BOT: int = int(os.environ.get("CLEAN_LOG_MAX_PER_BOT") or 0)  # 0 = unlimited
+    CLEAN_LOG_COMPACT_INTERVAL: float = float(os.environ.get("CLEAN_LOG_COMPACT_INTERVAL") or 3600)  # seconds
+    CLEAN_LOG_SHARDING: bool = str_to_bool(os.environ.get("CLEAN_LOG_SHARDING")) or False
 
     # Listeners
     bumper_listen: str | None = os.environ.get("BUMPER_LISTEN", socket.gethostbyname(socket.gethostname()))
@@ -90,6 +105,10 @@ class Config:
     TOKEN_JWT_ALG: str = os.environ.get("TOKEN_JWT_ALG") or "ES256"
     BUMPER_PROXY_MQTT: bool = str_to_bool(os.environ.get("BUMPER_PROXY_MQTT")) or False
     BUMPER_PROXY_WEB: bool = str_to_bool(os.environ.get("BUMPER_PROXY_WEB")) or False
+    HELPER_BOT_MAX_COMMANDS_PER_BOT: int = int(os.environ.get("HELPER_BOT_MAX_COMMANDS_PER_BOT") or 4)
+    HELPER_BOT_MAX_QUEUED_PER_BOT: int = int(os.environ.get("HELPER_BOT_MAX_QUEUED_PER_BOT") or 32)
+    HELPER_BOT_COALESCE_WINDOW: float = float(os.environ.get("HELPER_BOT_COALESCE_WINDOW") or 1)  # seconds, 0 = off
+    HELPER_BOT_STATE_MAX_AGE: float = float(os.environ.get("HELPER_BOT_STATE_MAX_AGE") or 10)  # seconds, 0 = off
 
     # Proxy
     PROXY_NAMESERVER: list[str] = ["1.1.1.1", "8.8.8.8"]
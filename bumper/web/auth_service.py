@@ -13,7 +13,8 @@ from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 import jwt
 
-from bumper.db import bot_repo, client_repo, token_repo, user_repo
+from bumper.db import async_client_repo, async_token_repo, async_user_repo, bot_repo, token_repo, user_repo
+from bumper.db.worker import run_in_db
 from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
 from bumper.web.utils import models
@@ -68,19 +69,23 @@ async def login(request: Request) -> Response:
             _LOGGER.info(f"Client with devid {device_id} attempting login")
             if device_id is not None and app_type is not None:
                 # Performing basic "auth" using devid, super insecure
-                user = user_repo.get_by_device_id(device_id)
+                user = await async_user_repo.get_by_device_id(device_id)
                 if user is None:
                     _LOGGER.warning(f"No user found for {device_id} (login)")
                 else:
                     if "checkLogin" in request.path:
-                        return _check_token(app_type, country_code, user, request.query.get("accessToken", ""))[1]
+                        access_token = request.query.get("accessToken", "")
+                        checked: tuple[bool, Response] = await run_in_db(_check_token, app_type, country_code, user, access_token)
+                        return checked[1]
                     # Deactivate old tokens and authcodes
-                    token_repo.revoke_user_expired(user.userid)
-                    return response_success_v1(_get_login_details(app_type, country_code, user, _generate_token(user.userid)))
+                    await async_token_repo.revoke_user_expired(user.userid)
+                    token = await run_in_db(_generate_token, user.userid)
+                    return response_success_v1(_get_login_details(app_type, country_code, user, token))
             return response_error_v1(msg="Parameter error. Please try again later.", code=ERR_TOKEN_INVALID)
 
         if device_id is not None and app_type is not None:
-            return _auth_any(uid, access_token, device_id, app_type, country_code, check)
+            response: Response = await run_in_db(_auth_any, uid, access_token, device_id, app_type, country_code, check)
+            return response
     except Exception:
         _LOGGER.exception(utils.default_exception_str_builder(info="during login"))
     raise HTTPInternalServerError
@@ -133,17 +138,18 @@ def _auth_any(
 
 
 def _auth_any_user_extends(user: models.BumperUser, device_id: str) -> None:
-    # Add current used device to user
-    user_repo.add_device(user.userid, device_id)
-    # Add all known bots to the user
-    for bot in bot_repo.list_all():
-        if bot.did is not None and bot.did != "":
-            user_repo.add_bot(user.userid, bot.did)
-        else:
-            _LOGGER.error(f"Bot has not a DID assigned :: {bot.as_dict()}")
+    with user_repo.batch():
+        # Add current used device and all known bots to the user
+        dids: list[str] = []
+        for bot in bot_repo.list_all():
+            if bot.did is not None and bot.did != "":
+                dids.append(bot.did)
+            else:
+                _LOGGER.error(f"Bot has not a DID assigned :: {bot.as_dict()}")
+        user_repo.add_to_user(user.userid, devices=[device_id], bots=dids)
 
-    # Deactivate old tokens and auth_codes
-    token_repo.revoke_user_expired(user.userid)
+        # Deactivate old tokens and auth_codes
+        token_repo.revoke_user_expired(user.userid)
 
 
 # ******************************************************************************
@@ -161,14 +167,14 @@ async def get_auth_code(request: Request) -> Response:
 
         user: models.BumperUser | None = None
         if user_id is not None:
-            user = user_repo.get_by_id(user_id)
+            user = await async_user_repo.get_by_id(user_id)
         if user is None:
-            user = _fallback_user_by_device_id(request)
+            user = await run_in_db(_fallback_user_by_device_id, request)
         if user is None:
             _LOGGER.warning(f"No user found for {user_id} (get_auth_code)")
             return response_error_v9(msg=f"No user found for {user_id}", code=ERR_TOKEN_INVALID)
 
-        if (auth_code := _generate_it_token(user.userid)) is not None:
+        if (auth_code := await run_in_db(_generate_it_token, user.userid)) is not None:
             return response_success_v1(
                 {
                     "authCode": auth_code,
@@ -218,16 +224,16 @@ async def get_new_auth(request: Request) -> Response:
         if it_token is None:
             _LOGGER.warning("New auth failed, 'itToken' not provided")
             return response_error_v2(msg="New auth failed, 'itToken' not provided", code=ERR_TOKEN_INVALID)
-        if (token := token_repo.login_by_it_token(it_token)) is None:
+        if (token := await async_token_repo.login_by_it_token(it_token)) is None:
             _LOGGER.warning("New auth failed, no token found for it-token")
             return response_error_v2(msg="New auth failed, no token found for it-token", code=ERR_TOKEN_INVALID)
 
-        token_repo.revoke_user_expired(token.userid)
+        await async_token_repo.revoke_user_expired(token.userid)
 
         auth_code: str | None = None
         if token.auth_code and (auth_code := token.auth_code) is not None:
             return response_success_v2(data=auth_code, data_key="authCode", code=None, result_key="result")
-        if (auth_code := _generate_auth_code(token.userid)) is not None:
+        if (auth_code := await run_in_db(_generate_auth_code, token.userid)) is not None:
             return response_success_v2(data=auth_code, data_key="authCode", code=None, result_key="result")
 
         _LOGGER.warning(f"Expired client login {token.userid}")
@@ -253,7 +259,7 @@ async def get_auth_code_v2(request: Request) -> Response:
 
         user: models.BumperUser | None = None
         if user_id is not None:
-            user = user_repo.get_by_id(user_id)
+            user = await async_user_repo.get_by_id(user_id)
         # if user is None:
         #     user_repo.add(user_id)
         #     user = user_repo.get_by_id(user_id)
@@ -261,12 +267,12 @@ async def get_auth_code_v2(request: Request) -> Response:
             _LOGGER.warning(f"No user found for {user_id} (get_auth_code_v2)")
             return response_error_v2(msg=f"No user found for {user_id}", code=ERR_USER_DISABLE)
 
-        token_repo.revoke_user_expired(user_id)
-        token = token_repo.get_first(user_id)
+        await async_token_repo.revoke_user_expired(user_id)
+        token = await async_token_repo.get_first(user_id)
 
         if (token and (auth_code := token.auth_code)) is not None:
             return response_success_v2(data=auth_code, data_key="code", code=None, result_key="result")
-        if (auth_code := _generate_auth_code(user.userid)) is not None:
+        if (auth_code := await run_in_db(_generate_auth_code, user.userid)) is not None:
             return response_success_v2(data=auth_code, data_key="code", code=None, result_key="result")
 
         _LOGGER.warning(f"Auth error for {user_id}")
@@ -288,10 +294,10 @@ async def oauth_callback(request: Request) -> Response:
     try:
         if (auth_code := _get_auth_code(request)) is None:
             return response_error_v4(msg="You not provide a auth_code")
-        if (token := token_repo.get_by_auth_code(auth_code)) is None:
+        if (token := await async_token_repo.get_by_auth_code(auth_code)) is None:
             return response_error_v4(msg="Auth code not known")
 
-        client = client_repo.get(token.userid)
+        client = await async_client_repo.get(token.userid)
 
         client_id = client.userid if client is not None else None
         client_resource = client.resource if client is not None else None
@@ -14,7 +14,7 @@ from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from aiohttp.web_routedef import AbstractRouteDef
 
-from bumper.db import bot_repo
+from bumper.db import async_bot_repo
 from bumper.mqtt.helper_bot import MQTTCommandModel
 from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
@@ -28,7 +28,13 @@ from bumper.web.static_api import (
     get_product_iot_map,
 )
 from bumper.web.utils.models import VacBotDevice
-from bumper.web.utils.response_helper import response_error_v5, response_success_v2, response_success_v3, response_success_v4
+from bumper.web.utils.response_helper import (
+    json_response,
+    response_error_v5,
+    response_success_v2,
+    response_success_v3,
+    response_success_v4,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -72,7 +78,7 @@ async def _handle_app_do(request: Request) -> Response:
         todo = post_body.get("todo", "")
 
         if todo == "GetGlobalDeviceList":
-            return response_success_v2(data=create_device_list(), data_key="devices")
+            return response_success_v2(data=await create_device_list(), data_key="devices")
 
         if todo == "GetCodepush":
             return response_success_v2(
@@ -427,12 +433,12 @@ async def _handle_improve(request: Request) -> Response:
 
 async def _handle_improve_accept(_: Request) -> Response:
     """Improve accept."""
-    return web.json_response({"code": 0})
+    return json_response({"code": 0})
 
 
 async def _handle_improve_user_accept(_: Request) -> Response:
     """Improve accept."""
-    return web.json_response({"code": 0, "data": {"accept": False}})
+    return json_response({"code": 0, "data": {"accept": False}})
 
 
 async def _handle_notice_home(_: Request) -> Response:
@@ -447,7 +453,7 @@ async def _handle_notice_list(_: Request) -> Response:
 
 async def _handle_ota_firmware(_: Request) -> Response:
     """OTA firmware."""
-    return web.json_response({"code": -1, "message": "No upgrades at this time"})
+    return json_response({"code": -1, "message": "No upgrades at this time"})
 
 
 async def _handle_device_blacklist_check(_: Request) -> Response:
@@ -455,11 +461,11 @@ async def _handle_device_blacklist_check(_: Request) -> Response:
     return response_success_v3(data=[])
 
 
-def create_device_list() -> list[dict[str, Any]]:
+async def create_device_list() -> list[dict[str, Any]]:
     """Create bot device list."""
     return [
         device
-        for bot in bot_repo.list_all()
+        for bot in await async_bot_repo.list_all()
         if bot.class_id and bot.class_id != "" and (device := _include_product_iot_map_info(bot)) is not None
     ]
 
@@ -557,7 +563,7 @@ async def _handle_akvs_start_watch(request: Request) -> Response:
     query_auth = json.loads(query_auth) if isinstance(query_auth, str) else query_auth
     user_id = query_auth.get("userid", "")
     resource = query_auth.get("resource", "")
-    return web.json_response(
+    return json_response(
         {
             "ret": "ok",
             "region": "eu-central-1",
@@ -611,31 +617,25 @@ async def _handle_device_prop_list(request: Request) -> Response:
     ts = utils.get_current_time_as_millis()
 
     props_result = []
-    for prop_o in props:
-        if bumper_isc.mqtt_helperbot is None:
-            break
-
-        prop = "get" + prop_o[2:] if prop_o.startswith("on") else prop_o
-        cmd_json: dict[str, Any] = {
-            "cmd": prop,
-            "did": did,
-            "mid": mid,
-            "res": res,
-            "data": {"td": prop},
-        }
-        cmd_request = MQTTCommandModel(cmd_json, version=MQTTCommandModel.VERSION_P2P)
-
-        cmd_response = await bumper_isc.mqtt_helperbot.send_command_plain(cmd_request)
-        if not isinstance(cmd_response, dict):
-            continue
-        if body_value := cmd_response.get("body", {}).get("data"):
-            props_result.append(
-                {
-                    "key": prop_o,
-                    "value": json.dumps({"body": {"data": body_value}}, separators=(",", ":")),
-                    "ts": utils.get_millis_to_iso_z(ts),
-                },
-            )
+    if bumper_isc.mqtt_helperbot is not None and (props := [prop_o for prop_o in props if prop_o]):
+        # All props are queried at once, answered ones are returned when the bot timeout is reached
+        cmd_requests = []
+        for prop_o in props:
+            prop = "get" + prop_o[2:] if prop_o.startswith("on") else prop_o
+            cmd_json: dict[str, Any] = {"cmd": prop, "did": did, "mid": mid, "res": res, "data": {"td": prop}}
+            cmd_requests.append(MQTTCommandModel(cmd_json, version=MQTTCommandModel.VERSION_P2P))
+        cmd_responses = await bumper_isc.mqtt_helperbot.send_commands(cmd_requests)
+        for prop_o, cmd_response in zip(props, cmd_responses, strict=True):
+            if not isinstance(cmd_response, dict):
+                continue
+            if body_value := cmd_response.get("body", {}).get("data"):
+                props_result.append(
+                    {
+                        "key": prop_o,
+                        "value": json.dumps({"body": {"data": body_value}}, separators=(",", ":")),
+                        "ts": utils.get_millis_to_iso_z(ts),
+                    },
+                )
 
     return response_success_v3(
         data={
@@ -12,7 +12,7 @@ from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from aiohttp.web_routedef import AbstractRouteDef
 
-from bumper.db import token_repo, user_repo
+from bumper.db import async_token_repo, async_user_repo
 from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
 from bumper.web.auth_service import get_jwt_details
@@ -44,7 +44,7 @@ async def _handle_home_list(request: Request) -> Response:
         user_id = request.query.get("userid")
         data = []
         if user_id is not None:
-            user = user_repo.get_by_id(user_id)
+            user = await async_user_repo.get_by_id(user_id)
             if user is not None:
                 for index, home_id in enumerate(user.homeids):
                     data.append(
@@ -75,9 +75,9 @@ async def _handle_home_create(request: Request) -> Response:
         return response_error_v2()
 
     name = json_body.get("name")
-    token = token_repo.get_by_auth_code(jwt_info.get("auth_code", ""))
+    token = await async_token_repo.get_by_auth_code(jwt_info.get("auth_code", ""))
     if token and token.userid is not None:
-        user_repo.add_home_id(token.userid, uuid.uuid4().hex)
+        await async_user_repo.add_home_id(token.userid, uuid.uuid4().hex)
         _LOGGER.debug(f"Create :: {name}")
     return response_success_v3(result_key=None)
 
@@ -99,9 +99,9 @@ async def _handle_home_delete(request: Request) -> Response:
     utils.default_log_warn_not_impl("_handle_home_delete")
     json_body = json.loads(await request.text())
     home_id = json_body.get("homeId")
-    user = user_repo.get_by_home_id(home_id)
+    user = await async_user_repo.get_by_home_id(home_id)
     if user is not None:
-        user_repo.remove_home_id(user.userid, home_id)
+        await async_user_repo.remove_home_id(user.userid, home_id)
     _LOGGER.debug(f"Delete :: {home_id}")
     return response_success_v3(result_key=None)
 
@@ -112,7 +112,7 @@ async def _handle_member_list(request: Request) -> Response:
     utils.default_log_warn_not_impl("_handle_member_list")
     try:
         home_id = request.query.get("homeId", bumper_isc.HOME_ID)
-        user = user_repo.get_by_home_id(home_id)
+        user = await async_user_repo.get_by_home_id(home_id)
         if user is None:
             _LOGGER.warning(f"No user found for {home_id}")
         else:
@@ -10,12 +10,12 @@ from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from aiohttp.web_routedef import AbstractRouteDef
 
-from bumper.db import bot_repo
+from bumper.db import async_bot_repo
 from bumper.mqtt.helper_bot import MQTTCommandModel
 from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
 from bumper.web.plugins import WebserverPlugin
-from bumper.web.utils.response_helper import response_error_v7, response_error_v8
+from bumper.web.utils.response_helper import json_response, response_error_v7, response_error_v8
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -65,7 +65,7 @@ async def handle_commands(
 
         # Its a command
         if cmd_request.did is not None:
-            if (bot := bot_repo.get(cmd_request.did)) is None:
+            if (bot := await async_bot_repo.get(cmd_request.did)) is None:
                 _LOGGER.warning(f"No bots with DID :: {cmd_request.did} :: connected to MQTT")
                 return response_error_v8(cmd_request.request_id, "requested bot is not supported")
             if bot.company != "eco-ng":
@@ -80,7 +80,7 @@ async def handle_commands(
         if cmd_request.td is not None:
             if cmd_request.td == "PollSCResult":  # Seen when doing initial wifi config
                 # TODO: check how to use "sck" in request info
-                return web.json_response(
+                return json_response(
                     {
                         "ret": "ok",  # TODO: extend below
                         # "did": "DID",
@@ -90,9 +90,9 @@ async def handle_commands(
                     },
                 )
             if cmd_request.td == "HasUnreadMsg":  # EcoVacs Home
-                return web.json_response({"ret": "ok", "unRead": False})
+                return json_response({"ret": "ok", "unRead": False})
             if cmd_request.td == "PreWifiConfig":  # EcoVacs Home
-                return web.json_response({"ret": "ok"})
+                return json_response({"ret": "ok"})
             _LOGGER.warning(f"TD is not know :: {cmd_request.td} :: connected to MQTT")
 
     except Exception:
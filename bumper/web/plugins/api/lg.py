@@ -10,10 +10,10 @@ from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from aiohttp.web_routedef import AbstractRouteDef
 
-from bumper.db import bot_repo, clean_log_repo
+from bumper.db import async_bot_repo, async_clean_log_repo
 from bumper.utils import utils
 from bumper.web.plugins import WebserverPlugin
-from bumper.web.utils.response_helper import response_error_v7
+from bumper.web.utils.response_helper import json_response, response_error_v7
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -40,14 +40,14 @@ async def _handle_lg_log(request: Request) -> Response:
         if did is None:
             _LOGGER.error("No DID specified :: connected to MQTT")
         elif td == "GetCleanLogs":
-            bot = bot_repo.get(did)
+            bot = await async_bot_repo.get(did)
             if bot is None or bot.company != "eco-ng":
                 _LOGGER.error(f"No bots with DID :: {did} :: connected to MQTT")
             else:
-                clean_logs = clean_log_repo.list_by_did(did)
+                clean_logs = await async_clean_log_repo.list_by_did(did)
                 logs.extend(clean_log.as_dict() for clean_log in clean_logs)
 
-        return web.json_response(
+        return json_response(
             {
                 "ret": "ok",
                 "logs": sorted(logs, key=lambda x: x["ts"], reverse=True),
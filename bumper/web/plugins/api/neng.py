@@ -7,7 +7,7 @@ from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from aiohttp.web_routedef import AbstractRouteDef
 
-from bumper.db import bot_repo
+from bumper.db import async_bot_repo
 from bumper.web.plugins import WebserverPlugin
 from bumper.web.utils.response_helper import response_success_v3, response_success_v4
 
@@ -72,7 +72,7 @@ async def _handle_v3_message_push_status(request: Request) -> Response:
                     "msgPushStatus": True,
                     "nickName": bot.nick,
                 }
-                for bot in bot_repo.list_all()
+                for bot in await async_bot_repo.list_all()
             ],
         },
     )
@@ -10,6 +10,7 @@ from aiohttp.web_response import Response
 from aiohttp.web_routedef import AbstractRouteDef
 
 from bumper.web.plugins import WebserverPlugin
+from bumper.web.utils.response_helper import json_response
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -47,4 +48,4 @@ async def _handle_products_firmware_latest(request: Request, todo: bool = False)
             "urls": [],
         },
     }
-    return web.json_response(data)
+    return json_response(data)
@@ -11,13 +11,13 @@ from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from aiohttp.web_routedef import AbstractRouteDef
 
-from bumper.db import bot_repo, client_repo, token_repo, user_repo
+from bumper.db import async_bot_repo, async_client_repo, async_token_repo, async_user_repo
 from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
 from bumper.web import auth_service
 from bumper.web.plugins import WebserverPlugin
 from bumper.web.plugins.api.appsvr import create_device_list
-from bumper.web.utils.response_helper import response_error_v6, response_success_v2
+from bumper.web.utils.response_helper import json_response, response_error_v6, response_success_v2
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -71,9 +71,9 @@ async def _handle_user(request: Request) -> Response:
 async def _handle_find_best(post_body: Mapping[str, Any], _: Request) -> Response | None:
     service = post_body.get("service", "")
     if service == "EcoMsgNew":
-        return web.json_response({"ip": bumper_isc.bumper_announce_ip, "port": bumper_isc.XMPP_LISTEN_PORT_TLS, "result": "ok"})
+        return json_response({"ip": bumper_isc.bumper_announce_ip, "port": bumper_isc.XMPP_LISTEN_PORT_TLS, "result": "ok"})
     if service == "EcoUpdate":
-        return web.json_response(
+        return json_response(
             {"ip": bumper_isc.ECOVACS_UPDATE_SERVER, "port": bumper_isc.ECOVACS_UPDATE_SERVER_PORT, "result": "ok"},
         )
     return None
@@ -81,8 +81,8 @@ async def _handle_find_best(post_body: Mapping[str, Any], _: Request) -> Respons
 
 async def _handle_login_by_it_token(post_body: Mapping[str, Any], _: Request) -> Response | None:
     if "userId" in post_body:
-        if token_repo.verify_it(post_body["userId"], post_body["token"]):
-            return web.json_response(
+        if await async_token_repo.verify_it(post_body["userId"], post_body["token"]):
+            return json_response(
                 {
                     "resource": post_body["resource"],
                     "result": "ok",
@@ -92,9 +92,9 @@ async def _handle_login_by_it_token(post_body: Mapping[str, Any], _: Request) ->
                 },
             )
     else:
-        login_token = token_repo.login_by_it_token(post_body["token"])
+        login_token = await async_token_repo.login_by_it_token(post_body["token"])
         if login_token:
-            return web.json_response(
+            return json_response(
                 {
                     "resource": post_body["resource"],
                     "result": "ok",
@@ -111,35 +111,35 @@ async def _handle_get_auth_code(_: Mapping[str, Any], request: Request) -> Respo
 
 
 async def _handle_get_device_list(_: Mapping[str, Any], __: Request) -> Response | None:
-    return web.json_response({"devices": create_device_list(), "result": "ok", "todo": "result"})
+    return json_response({"devices": await create_device_list(), "result": "ok", "todo": "result"})
 
 
 async def _handle_set_device_nick(post_body: Mapping[str, Any], _: Request) -> Response | None:
     if did := post_body.get("did"):
-        bot_repo.set_nick(did, post_body.get("nick", ""))
+        await async_bot_repo.set_nick(did, post_body.get("nick", ""))
         return response_success_v2(result_key="result")
     return None
 
 
 async def _handle_add_one_device(post_body: Mapping[str, Any], _: Request) -> Response | None:
     if did := post_body.get("did"):
-        bot_repo.set_nick(did, post_body.get("nick", ""))
+        await async_bot_repo.set_nick(did, post_body.get("nick", ""))
         return response_success_v2(result_key="result")
     return None
 
 
 async def _handle_delete_one_device(post_body: Mapping[str, Any], _: Request) -> Response | None:
     if did := post_body.get("did"):
-        bot_repo.remove(did)
+        await async_bot_repo.remove(did)
         return response_success_v2(result_key="result")
     return None
 
 
 async def _handle_logout(post_body: Mapping[str, Any], __: Request) -> Response | None:
     user_id: str = post_body["userId"]
-    user_repo.remove(user_id)
-    client_repo.remove(user_id)
-    return web.json_response({"todo": "result", "result": "ok"})
+    await async_user_repo.remove(user_id)
+    await async_client_repo.remove(user_id)
+    return json_response({"todo": "result", "result": "ok"})
 
 
 # ----------- Mapping -----------
@@ -10,7 +10,7 @@ from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from aiohttp.web_routedef import AbstractRouteDef
 
-from bumper.db import bot_repo, clean_log_repo
+from bumper.db import async_bot_repo, async_clean_log_repo
 from bumper.utils import utils
 from bumper.web.plugins import WebserverPlugin
 from bumper.web.utils.response_helper import response_success_v3
@@ -40,11 +40,11 @@ async def _handle_clean_result_list(request: Request) -> Response:
         if did is None:
             _LOGGER.error("No DID specified :: connected to MQTT")
         elif log_type == "clean":
-            bot = bot_repo.get(did)
+            bot = await async_bot_repo.get(did)
             if bot is None or bot.company != "eco-ng":
                 _LOGGER.error(f"No bots with DID :: {did} :: connected to MQTT")
             else:
-                clean_logs = clean_log_repo.list_by_did(did)
+                clean_logs = await async_clean_log_repo.list_by_did(did)
                 for clean_log in clean_logs:
                     log = clean_log.as_dict()
                     log.update({"did": did})
@@ -61,5 +61,5 @@ async def _handle_clean_result_del(request: Request) -> Response:
     json_data: dict[str, Any] = await request.json()
     log_ids: list[str] = json_data.get("logIds", [])
     for log_id in log_ids:
-        clean_log_repo.remove_by_id(log_id)
+        await async_clean_log_repo.remove_by_id(log_id)
     return response_success_v3(data=None)
@@ -15,7 +15,7 @@ from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
 
-from bumper.db import user_repo
+from bumper.db import async_user_repo
 from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
 from bumper.web.plugins import WebserverPlugin
@@ -155,7 +155,7 @@ async def _handle_get_user_config(request: Request) -> Response:
     """Get user config."""
     try:
         user_dev_id = request.match_info.get("devid", "")
-        user = user_repo.get_by_device_id(user_dev_id)
+        user = await async_user_repo.get_by_device_id(user_dev_id)
         if user is None:
             _LOGGER.warning(f"No user found for {user_dev_id}")
         else:
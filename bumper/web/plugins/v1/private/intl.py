@@ -9,7 +9,7 @@ from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from aiohttp.web_routedef import AbstractRouteDef
 
-from bumper.db import user_repo
+from bumper.db import async_user_repo
 from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
 from bumper.web.plugins import WebserverPlugin
@@ -36,7 +36,7 @@ async def _handle_basic_info(request: Request) -> Response:
     """Get basic info."""
     try:
         user_dev_id = request.match_info.get("devid", "")
-        user = user_repo.get_by_device_id(user_dev_id)
+        user = await async_user_repo.get_by_device_id(user_dev_id)
         if user is None:
             _LOGGER.warning(f"No user found for {user_dev_id}")
         else:
@@ -9,7 +9,7 @@ from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from aiohttp.web_routedef import AbstractRouteDef
 
-from bumper.db import token_repo, user_repo
+from bumper.db import async_token_repo, async_user_repo
 from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
 from bumper.web import auth_service
@@ -51,12 +51,12 @@ async def _logout(request: Request) -> Response:
         device_id = request.match_info.get("devid")
         access_token = request.query.get("accessToken")
         if device_id is not None and access_token is not None:
-            user = user_repo.get_by_device_id(device_id)
+            user = await async_user_repo.get_by_device_id(device_id)
             if user is None:
                 _LOGGER.warning(f"No user found for {device_id} (logout)")
-            elif token_repo.verify(user.userid, access_token):
+            elif await async_token_repo.verify(user.userid, access_token):
                 # Deactivate old tokens and authcodes
-                token_repo.revoke_token(user.userid, access_token)
+                await async_token_repo.revoke_token(user.userid, access_token)
         return response_success_v1(None)
     except Exception:
         _LOGGER.exception(utils.default_exception_str_builder())
@@ -67,7 +67,7 @@ async def _handle_get_user_account_info(request: Request) -> Response:
     """Get user account info."""
     try:
         user_device_id = request.match_info.get("devid", "")
-        user = user_repo.get_by_device_id(user_device_id)
+        user = await async_user_repo.get_by_device_id(user_device_id)
         if user is None:
             _LOGGER.warning(f"No user found for {user_device_id} (get_user_account_info)")
         else:
@@ -317,7 +317,7 @@ async def _handle_get_member_info(request: Request) -> Response:
     user_id = request.query.get("uid")
     user_name = bumper_isc.USER_USERNAME_DEFAULT
 
-    if user_id and (user := user_repo.get_by_id(user_id)):
+    if user_id and (user := await async_user_repo.get_by_id(user_id)):
         user_name = user.username
     return response_success_v1(
         {
@@ -20,7 +20,7 @@ from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
 from bumper.web.auth_service import get_new_auth
 from bumper.web.plugins.api.appsvr import get_codepush_update_check_data
-from bumper.web.utils.response_helper import ERR_UNKNOWN_TODO, response_error_v2, response_success_v3
+from bumper.web.utils.response_helper import ERR_UNKNOWN_TODO, json_response, response_error_v2, response_success_v3
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -133,11 +133,11 @@ async def handle_lookup(request: Request) -> Response:
                 srv_ip = bumper_isc.ECOVACS_UPDATE_SERVER
                 srv_port = bumper_isc.ECOVACS_UPDATE_SERVER_PORT
                 _LOGGER.info(f"Announcing EcoUpdate Server to bot as: {srv_ip}:{srv_port}")
-                return web.json_response({"result": "ok", "ip": srv_ip, "port": srv_port})
+                return json_response({"result": "ok", "ip": srv_ip, "port": srv_port})
             _LOGGER.warning(f"service is not know :: {service!s}")
         _LOGGER.warning(f"todo is not know :: {todo!s}")
 
-        return web.json_response({})
+        return json_response({})
     except Exception:
         _LOGGER.exception(utils.default_exception_str_builder())
     raise HTTPInternalServerError
@@ -146,7 +146,7 @@ async def handle_lookup(request: Request) -> Response:
 async def handle_config_android_conf(_: Request) -> Response:
     """Handle config android conf (/config/Android.conf)."""
     try:
-        return web.json_response(
+        return json_response(
             {
                 "v": "v1",
                 "configs": {"disableSDK": False, "disableDebugMode": False},
@@ -160,7 +160,7 @@ async def handle_config_android_conf(_: Request) -> Response:
 async def handle_data_collect(_: Request) -> Response:
     """Handle data collect (/data_collect/upload/generalData)."""
     try:
-        return web.json_response(None)
+        return json_response(None)
     except Exception:
         _LOGGER.exception(utils.default_exception_str_builder())
     raise HTTPInternalServerError
@@ -181,7 +181,7 @@ async def handle_sa(request: Request) -> Response:
                 decoded_data = base64.b64decode(data_list)
                 decompressed_data = gzip.decompress(decoded_data).decode("utf-8")
                 _LOGGER.info(decompressed_data)
-        return web.json_response(None)
+        return json_response(None)
     except Exception:
         _LOGGER.exception(utils.default_exception_str_builder())
     raise HTTPInternalServerError
@@ -195,12 +195,12 @@ async def handle_codepush_report_status_deploy(_: Request) -> Response:
 async def handle_codepush_update_check(request: Request) -> Response:
     """CodePush Update check (/v0.1/public/codepush/update_check)."""
     response = get_codepush_update_check_data(request)
-    return web.json_response(response)
+    return json_response(response)
 
 
 async def handle_global_app_bury_point_api(_: Request) -> Response:
     """Global APP BuryPoint API (/Global_APP_BuryPoint/api)."""
-    return web.json_response(
+    return json_response(
         {
             "header": {
                 "result_code": "000000",
@@ -219,7 +219,7 @@ async def handle_global_app_bury_point_api(_: Request) -> Response:
 
 async def handle_global_app_bury_point_api_appevent(_: Request) -> Response:
     """Global APP BuryPoint API app-event (/Global_APP_BuryPoint/api/appevent)."""
-    return web.json_response(
+    return json_response(
         {
             "header": {
                 "result_code": "000000",
@@ -0,0 +1,42 @@
+"""Encode exported rows as NDJSON or CSV, chunk by chunk."""
+
+from collections.abc import Iterable
+import csv
+import io
+from typing import Any
+
+from bumper.utils import json_codec
+
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _csv_value(value: Any) -> Any:
+    """Return a CSV cell, lists and dicts are written as JSON."""
+    return json_codec.dumps(value) if isinstance(value, list | dict) else value
+
+
+class RowEncoder:
+    """Encode chunks of rows, the CSV header is taken from the first row and written once."""
+
+    def __init__(self, fmt: str) -> None:
+        if fmt not in CONTENT_TYPES:
+            msg = f"Unsupported export format: {fmt}"
+            raise ValueError(msg)
+        self.fmt = fmt
+        self._fields: list[str] | None = None
+
+    def encode(self, rows: Iterable[dict[str, Any]]) -> bytes:
+        """Return the encoded rows."""
+        if self.fmt == "ndjson":
+            return b"".join(json_codec.dumpb(row) + b"\n" for row in rows)
+        buffer = io.StringIO()
+        writer: csv.DictWriter[str] | None = None
+        for row in rows:
+            if writer is None:
+                header = self._fields is None
+                self._fields = self._fields or list(row)
+                writer = csv.DictWriter(buffer, self._fields, extrasaction="ignore")
+                if header:
+                    writer.writeheader()
+            writer.writerow({key: _csv_value(value) for key, value in row.items()})
+        return buffer.getvalue().encode()
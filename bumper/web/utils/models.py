@@ -1,5 +1,6 @@
 """Models module."""
 
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any
 
@@ -7,27 +8,18 @@ from bumper.utils.settings import config as bumper_isc
 from bumper.utils.utils import to_int
 
 
+@dataclass(frozen=True, slots=True)
 class VacBotDevice:
     """Vacuum bot device."""
 
-    def __init__(
-        self,
-        did: str = "",
-        class_id: str = "",
-        resource: str = "",
-        name: str = "",
-        nick: str = "",
-        company: str = "",
-    ) -> None:
-        """Vacuum bot device init."""
-        self.class_id = class_id
-        self.company = company
-        self.did = did
-        self.name = name
-        self.nick = nick
-        self.resource = resource
-        self.mqtt_connection = False
-        self.xmpp_connection = False
+    did: str = ""
+    class_id: str = ""
+    resource: str = ""
+    name: str = ""
+    nick: str = ""
+    company: str = ""
+    mqtt_connection: bool = False
+    xmpp_connection: bool = False
 
     def as_dict(self) -> dict[str, str | bool]:
         """Convert to dict."""
@@ -45,28 +37,28 @@ class VacBotDevice:
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "VacBotDevice":
         """Create a VacBotDevice instance from a dictionary."""
-        bot = cls(did=data.get("did", ""))
-        bot.class_id = data.get("class", "")
-        bot.company = data.get("company", "")
-        bot.name = data.get("name", "")
-        bot.nick = data.get("nick", "")
-        bot.resource = data.get("resource", "")
-        bot.mqtt_connection = data.get("mqtt_connection", False)
-        bot.xmpp_connection = data.get("xmpp_connection", False)
-        return bot
+        return cls(
+            did=data.get("did", ""),
+            class_id=data.get("class", ""),
+            resource=data.get("resource", ""),
+            name=data.get("name", ""),
+            nick=data.get("nick", ""),
+            company=data.get("company", ""),
+            mqtt_connection=data.get("mqtt_connection", False),
+            xmpp_connection=data.get("xmpp_connection", False),
+        )
 
 
+@dataclass(frozen=True, slots=True)
 class VacBotClient:
     """Vacuum client."""
 
-    def __init__(self, name: str = "", userid: str = "", realm: str = "", resource: str = "") -> None:
-        """Vacuum client init."""
-        self.userid = userid
-        self.name = name
-        self.realm = realm
-        self.resource = resource
-        self.mqtt_connection = False
-        self.xmpp_connection = False
+    name: str = ""
+    userid: str = ""
+    realm: str = ""
+    resource: str = ""
+    mqtt_connection: bool = False
+    xmpp_connection: bool = False
 
     def as_dict(self) -> dict[str, Any]:
         """Convert to dict."""
@@ -82,65 +74,57 @@ class VacBotClient:
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "VacBotClient":
         """Create a VacBotClient instance from a dictionary."""
-        bot = cls(
-            userid=data.get("userid", ""),
+        return cls(
             name=data.get("name", ""),
+            userid=data.get("userid", ""),
             realm=data.get("realm", ""),
             resource=data.get("resource", ""),
+            mqtt_connection=data.get("mqtt_connection", False),
+            xmpp_connection=data.get("xmpp_connection", False),
         )
-        bot.mqtt_connection = data.get("mqtt_connection", False)
-        bot.xmpp_connection = data.get("xmpp_connection", False)
-        return bot
 
 
+@dataclass(frozen=True, slots=True)
 class BumperUser:
     """Bumper user."""
 
-    def __init__(self, userid: str = "") -> None:
-        """Bumper user init."""
-        self.userid: str = userid
-        self.username: str = bumper_isc.USER_USERNAME_DEFAULT
-        self.homeids: list[str] = []
-        self.devices: list[str] = []
-        self.bots: list[str] = []
+    userid: str = ""
+    username: str = field(default_factory=lambda: bumper_isc.USER_USERNAME_DEFAULT)
+    homeids: tuple[str, ...] = ()
+    devices: tuple[str, ...] = ()
+    bots: tuple[str, ...] = ()
 
     def as_dict(self) -> dict[str, Any]:
         """Convert to dict."""
         return {
             "userid": self.userid,
             "username": self.username,
-            "homeids": self.homeids,
-            "devices": self.devices,
-            "bots": self.bots,
+            "homeids": list(self.homeids),
+            "devices": list(self.devices),
+            "bots": list(self.bots),
         }
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "BumperUser":
         """Create a BumperUser instance from a dictionary."""
-        user = cls(userid=data.get("userid", ""))
-        user.username = data.get("username", bumper_isc.USER_USERNAME_DEFAULT)
-        user.homeids = data.get("homeids", [])
-        user.devices = data.get("devices", [])
-        user.bots = data.get("bots", [])
-        return user
+        return cls(
+            userid=data.get("userid", ""),
+            username=data.get("username", bumper_isc.USER_USERNAME_DEFAULT),
+            homeids=tuple(data.get("homeids") or ()),
+            devices=tuple(data.get("devices") or ()),
+            bots=tuple(data.get("bots") or ()),
+        )
 
 
+@dataclass(slots=True)
 class Token:
     """User authentication token."""
 
-    def __init__(
-        self,
-        userid: str,
-        token: str,
-        expiration: datetime,
-        auth_code: str | None = None,
-        it_token: str | None = None,
-    ) -> None:
-        self.userid = userid
-        self.token = token
-        self.expiration = expiration
-        self.auth_code = auth_code
-        self.it_token = it_token
+    userid: str
+    token: str
+    expiration: datetime
+    auth_code: str | None = None
+    it_token: str | None = None
 
     def to_db(self) -> dict[str, Any]:
         """Convert Token to a TinyDB-compatible dict."""
@@ -172,29 +156,29 @@ class Token:
         )
 
 
+@dataclass(slots=True)
 class CleanLogs:
     """Clean logs."""
 
-    logs: list["CleanLog"] = []
-
-    def __init__(self, did: str, cid: str) -> None:
-        """Clean logs init."""
-        self.did = did
-        self.cid = cid
+    did: str
+    cid: str
+    logs: list["CleanLog"] = field(default_factory=list)
 
     def to_db(self) -> dict[str, Any]:
         """Convert for db."""
-        return self.__dict__
+        return {"did": self.did, "cid": self.cid, "logs": [log.to_db() for log in self.logs]}
 
 
+@dataclass(frozen=True, slots=True)
 class CleanLog:
     """Clean log."""
 
+    clean_log_id: str
     did: str | None = None
     cid: str | None = None
     # Older and Newer Bots
     aiavoid: int = 0
-    aitypes: list[Any] = []
+    aitypes: tuple[Any, ...] = ()
     area: int | None = None
     image_url: str | None = None
     stop_reason: int | None = None
@@ -214,35 +198,50 @@ class CleanLog:
     # sceneName:int|None = None
     # triggerMode:int|None = None
 
-    def __init__(self, clean_log_id: str) -> None:
-        """Clean log init."""
-        self.clean_log_id = clean_log_id
-
     def to_db(self) -> dict[str, Any]:
         """Convert for db."""
-        return self.__dict__
+        return {
+            "clean_log_id": self.clean_log_id,
+            "did": self.did,
+            "cid": self.cid,
+            # Older and Newer Bots
+            "aiavoid": self.aiavoid,
+            "aitypes": list(self.aitypes),
+            "area": self.area,
+            "image_url": self.image_url,
+            "stop_reason": self.stop_reason,
+            "last": self.last,
+            "ts": self.ts,
+            "type": self.type,
+            # Newer Bots
+            "avoid_count": self.avoid_count,
+            "enable_power_mop": self.enable_power_mop,
+            "power_mop_type": self.power_mop_type,
+            "ai_open": self.ai_open,
+        }
 
     @classmethod
     def from_db(cls, data: dict[str, Any]) -> "CleanLog":
         """Create a CleanLog instance from a dictionary."""
-        clean_log = cls(clean_log_id=data["clean_log_id"])
-        clean_log.did = data.get("did")
-        clean_log.cid = data.get("cid")
-        # Older and Newer Bots
-        clean_log.aiavoid = to_int(data.get("aiavoid")) or 0
-        clean_log.aitypes = data.get("aitypes", [])
-        clean_log.area = to_int(data.get("area"))
-        clean_log.image_url = data.get("image_url")
-        clean_log.stop_reason = to_int(data.get("stop_reason"))
-        clean_log.last = to_int(data.get("last"))
-        clean_log.ts = to_int(data.get("ts"))
-        clean_log.type = data.get("type")
-        # Newer Bots
-        clean_log.avoid_count = to_int(data.get("avoid_count"))
-        clean_log.enable_power_mop = to_int(data.get("enable_power_mop"))
-        clean_log.power_mop_type = to_int(data.get("power_mop_type"))
-        clean_log.ai_open = to_int(data.get("ai_open"))
-        return clean_log
+        return cls(
+            clean_log_id=data["clean_log_id"],
+            did=data.get("did"),
+            cid=data.get("cid"),
+            # Older and Newer Bots
+            aiavoid=to_int(data.get("aiavoid")) or 0,
+            aitypes=tuple(data.get("aitypes") or ()),
+            area=to_int(data.get("area")),
+            image_url=data.get("image_url"),
+            stop_reason=to_int(data.get("stop_reason")),
+            last=to_int(data.get("last")),
+            ts=to_int(data.get("ts")),
+            type=data.get("type"),
+            # Newer Bots
+            avoid_count=to_int(data.get("avoid_count")),
+            enable_power_mop=to_int(data.get("enable_power_mop")),
+            power_mop_type=to_int(data.get("power_mop_type")),
+            ai_open=to_int(data.get("ai_open")),
+        )
 
     def as_dict(self) -> dict[str, Any]:
         """Convert to dict."""
@@ -252,7 +251,7 @@ class CleanLog:
             # "cid": self.cid,
             # Older and Newer Bots
             "aiavoid": self.aiavoid,
-            "aitypes": self.aitypes,
+            "aitypes": list(self.aitypes),
             "area": self.area,
             "imageUrl": self.image_url if self.image_url is not None else "",
             "stopReason": self.stop_reason if self.stop_reason is not None else -2,
@@ -270,27 +269,26 @@ class CleanLog:
     def from_dict(cls, did: str, rid: str, data: dict[str, Any]) -> "CleanLog":
         """Create a CleanLog instance from a dictionary."""
         start = data.get("start")
-        clean_log = cls(clean_log_id=f"{did}@{start}@{rid}")
-        clean_log.did = did
-        clean_log.cid = data.get("cid")
-
-        # Older and Newer Bots
-        clean_log.aiavoid = data.get("aiavoid", 0)
-        clean_log.aitypes = data.get("aitypes", [])
-        clean_log.area = data.get("area")
-        clean_log.image_url = data.get("imageUrl")
-        clean_log.stop_reason = data.get("stopReason")
-        clean_log.last = data.get("time")
-        clean_log.ts = start
-        clean_log.type = data.get("type")
-        # Newer Bots
-        clean_log.avoid_count = data.get("avoidCount")
-        clean_log.enable_power_mop = data.get("enablePowerMop")
-        clean_log.power_mop_type = data.get("powerMopType")
-        clean_log.ai_open = data.get("aiopen")
-
         # stop = body.get("stop") # if the clean is started (0) or stopped (1)
         # map_count = body.get("mapCount")
         # content = body.get("content")
 
-        return clean_log
+        return cls(
+            clean_log_id=f"{did}@{start}@{rid}",
+            did=did,
+            cid=data.get("cid"),
+            # Older and Newer Bots
+            aiavoid=data.get("aiavoid", 0),
+            aitypes=tuple(data.get("aitypes") or ()),
+            area=data.get("area"),
+            image_url=data.get("imageUrl"),
+            stop_reason=data.get("stopReason"),
+            last=data.get("time"),
+            ts=to_int(start),
+            type=data.get("type"),
+            # Newer Bots
+            avoid_count=data.get("avoidCount"),
+            enable_power_mop=data.get("enablePowerMop"),
+            power_mop_type=data.get("powerMopType"),
+            ai_open=data.get("aiopen"),
+        )
@@ -6,7 +6,7 @@ from typing import TYPE_CHECKING, Any
 
 from aiohttp import web
 
-from bumper.utils import utils
+from bumper.utils import json_codec, utils
 
 if TYPE_CHECKING:
     from aiohttp.web_response import Response
@@ -59,9 +59,14 @@ API_ERRORS: dict[str, str] = {
 # ******************************************************************************
 
 
+def json_response(data: Any, status: int = 200) -> Response:
+    """Return a JSON response, serialized with the fastest available JSON codec."""
+    return web.Response(body=json_codec.dumpb(data), status=status, content_type="application/json", charset="utf-8")
+
+
 def response_success_v1(data: Any, time: int = utils.get_current_time_as_millis()) -> Response:
     """Get success response with provided data."""
-    return web.json_response(
+    return json_response(
         {
             "code": RETURN_API_SUCCESS,
             "data": data,
@@ -88,7 +93,7 @@ def response_success_v2(
         payload[data_key] = data
     if code is not None:
         payload["code"] = code
-    return web.json_response(payload)
+    return json_response(payload)
 
 
 def response_success_v3(
@@ -112,12 +117,12 @@ def response_success_v3(
         payload[data_key] = data
     if include_success:
         payload["success"] = True
-    return web.json_response(payload)
+    return json_response(payload)
 
 
 def response_success_v4(data: Any, code: int = 0, data_key: str = "data") -> Response:
     """Response success v4."""
-    return web.json_response(
+    return json_response(
         {
             "code": code,
             data_key: data,
@@ -130,7 +135,7 @@ def response_success_v4(data: Any, code: int = 0, data_key: str = "data") -> Res
 
 def response_error_v1(msg: str = "Parameter error. Please try again later", code: str = ERR_COMMON) -> Response:
     """Response error v1."""
-    return web.json_response(
+    return json_response(
         {
             "code": code,
             "msg": msg,
@@ -141,7 +146,7 @@ def response_error_v1(msg: str = "Parameter error. Please try again later", code
 
 def response_error_v2(msg: str = "Parameter error. Please try again later", code: str = ERR_COMMON) -> Response:
     """Response error v2."""
-    return web.json_response(
+    return json_response(
         {
             "errno": code,
             "error": msg,
@@ -153,7 +158,7 @@ def response_error_v2(msg: str = "Parameter error. Please try again later", code
 
 def response_error_v3(msg: str = "Parameter error. Please try again later", code: str = ERR_COMMON) -> Response:
     """Response error v3."""
-    return web.json_response(
+    return json_response(
         {
             "errno": code,
             "error": msg,
@@ -165,7 +170,7 @@ def response_error_v3(msg: str = "Parameter error. Please try again later", code
 
 def response_error_v4(msg: str = "Parameter error. Please try again later") -> Response:
     """Response error v4."""
-    return web.json_response(
+    return json_response(
         {
             "todo": "result",
             "ret": "fail",
@@ -176,7 +181,7 @@ def response_error_v4(msg: str = "Parameter error. Please try again later") -> R
 
 def response_error_v5() -> Response:
     """Response error v5."""
-    return web.json_response(
+    return json_response(
         {
             "todo": "result",
             "ret": "fail",
@@ -189,7 +194,7 @@ def response_error_v5() -> Response:
 
 def response_error_v6(debug: str, error: str = "Error request, unknown todo") -> Response:
     """Response error v6."""
-    return web.json_response(
+    return json_response(
         {
             "todo": "result",
             "result": "fail",
@@ -202,7 +207,7 @@ def response_error_v6(debug: str, error: str = "Error request, unknown todo") ->
 
 def response_error_v7(errno: int = 1, error: str = "unknown") -> Response:
     """Response error v7."""
-    return web.json_response(
+    return json_response(
         {
             "ret": "fail",
             "errno": errno,
@@ -213,7 +218,7 @@ def response_error_v7(errno: int = 1, error: str = "unknown") -> Response:
 
 def response_error_v8(request_id: str, error: str) -> Response:
     """Response error v8."""
-    return web.json_response(
+    return json_response(
         {
             "id": request_id,
             "errno": 500,
@@ -225,7 +230,7 @@ def response_error_v8(request_id: str, error: str) -> Response:
 
 def response_error_v9(msg: str = "Expired user login", code: str = ERR_TOKEN_INVALID) -> Response:
     """Response error v9."""
-    return web.json_response(
+    return json_response(
         {
             "code": code,
             "msg": msg,
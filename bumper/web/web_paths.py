@@ -1,28 +1,50 @@
 """Web paths for bumper web server."""
 
-from collections.abc import Awaitable, Callable, Iterable
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable, Iterator, Mapping, Sequence
 from datetime import datetime
 from importlib.resources import files
+from ipaddress import ip_address
 import logging
 from pathlib import Path
+import time
 from typing import TYPE_CHECKING, Any
 
 from aiohttp import web
-from aiohttp.web_exceptions import HTTPInternalServerError
+from aiohttp.web_exceptions import HTTPBadRequest, HTTPForbidden, HTTPInternalServerError
 from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from aiohttp.web_routedef import RouteDef, StaticDef
 import aiohttp_jinja2
 
-from bumper.db import bot_repo, clean_log_repo, client_repo, user_repo
+from bumper.db import (
+    async_bot_repo,
+    async_clean_log_repo,
+    async_client_repo,
+    async_user_repo,
+    bot_repo,
+    clean_log_repo,
+    client_repo,
+    db,
+    presence,
+    user_repo,
+)
+from bumper.db.clean_logs import EXPORT_CHUNK_SIZE
+from bumper.db.op_timing import op_timings
 from bumper.utils import utils
+from bumper.utils.loop_monitor import loop_monitor
 from bumper.utils.settings import config as bumper_isc
+from bumper.web.utils.export import CONTENT_TYPES, RowEncoder
+from bumper.web.utils.response_helper import json_response
 
 if TYPE_CHECKING:
     from bumper.web.utils.models import BumperUser, CleanLog, VacBotClient, VacBotDevice
 
 _LOGGER = logging.getLogger(__name__)
 
+# Minimum seconds between two database backups requested over the web interface
+BACKUP_MIN_INTERVAL = 60.0
+
 
 def bumper_routes() -> Iterable[RouteDef | StaticDef]:
     """Bumper web routes."""
@@ -31,6 +53,9 @@ def bumper_routes() -> Iterable[RouteDef | StaticDef]:
         web.get("/favicon.ico", _handle_favicon),
         web.get("/restart_{service}", _handle_restart_service),
         web.get("/server-status", _handle_partial("server_status")),
+        web.get("/metrics", _handle_metrics),
+        web.post("/backup", _handle_backup),
+        web.get("/export/{entity}", _handle_export),
         web.get("/bots", _handle_partial("bots")),
         web.get("/bot/remove/{did}", _handle_remove_entity("bot")),
         web.get("/clients", _handle_partial("clients")),
@@ -38,6 +63,7 @@ def bumper_routes() -> Iterable[RouteDef | StaticDef]:
         web.get("/users", _handle_partial("users")),
         web.get("/user/remove/{userid}", _handle_remove_entity("user")),
         web.get("/clean_logs", _handle_partial("clean_logs")),
+        web.get("/clean_logs/stats", _handle_clean_log_stats),
         web.get("/clean_log/remove/{clean_log_id}", _handle_remove_entity("clean_log")),
         web.get("/clean_logs/remove/{placeholder}", _handle_remove_entity("clean_logs")),
     ]
@@ -68,17 +94,137 @@ async def _handle_restart_service(request: Request) -> Response:
         service = request.match_info.get("service", "")
         if service == "Helperbot":
             if await _restart_helper_bot():
-                return web.json_response({"status": "complete"})
-            return web.json_response({"status": "failed"})
+                return json_response({"status": "complete"})
+            return json_response({"status": "failed"})
         if service == "MQTTServer":
             if await _restart_mqtt_server():
-                return web.json_response({"status": "complete"})
-            return web.json_response({"status": "failed"})
+                return json_response({"status": "complete"})
+            return json_response({"status": "failed"})
         if service == "XMPPServer" and bumper_isc.xmpp_server is not None:
             await bumper_isc.xmpp_server.disconnect()
             await bumper_isc.xmpp_server.start_async_server()
-            return web.json_response({"status": "complete"})
-        return web.json_response({"status": "invalid service"})
+            return json_response({"status": "complete"})
+        return json_response({"status": "invalid service"})
+    except Exception:
+        _LOGGER.exception(utils.default_exception_str_builder())
+    raise HTTPInternalServerError
+
+
+class _BackupJob:
+    """Backups requested over the web, concurrent requests share a running backup.
+
+    A backup younger than BACKUP_MIN_INTERVAL seconds is returned instead of writing a new one.
+    """
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task[str] | None = None
+        self._last: tuple[float, str] | None = None
+
+    async def run(self) -> tuple[str, bool]:
+        """Return the file of a new, running or recent backup and if it was reused."""
+        if self._task is None and self._last is not None and time.monotonic() - self._last[0] < BACKUP_MIN_INTERVAL:
+            return self._last[1], True
+        reused = self._task is not None
+        if self._task is None:
+            # The copy is written outside the event loop, MQTT and XMPP traffic keeps being served
+            self._task = asyncio.create_task(asyncio.to_thread(db.backup_db))
+            self._task.add_done_callback(self._done)
+        # A cancelled request does not cancel the backup other requests wait for
+        return await asyncio.shield(self._task), reused
+
+    def _done(self, task: asyncio.Task[str]) -> None:
+        self._task = None
+        if not task.cancelled() and task.exception() is None:
+            self._last = (time.monotonic(), task.result())
+
+
+_backups = _BackupJob()
+
+
+def _from_local_network(request: Request) -> bool:
+    """Return True if the request comes from a loopback or private network address."""
+    try:
+        address = ip_address(request.remote or "")
+    except ValueError:
+        return False
+    return address.is_loopback or address.is_private
+
+
+async def _handle_backup(request: Request) -> Response:
+    """Write an online backup of the database next to the database file.
+
+    The web interface has no login, so only clients of the local network may trigger a backup.
+    """
+    if not _from_local_network(request):
+        raise HTTPForbidden
+    try:
+        backup_file, reused = await _backups.run()
+        return json_response({"status": "complete", "file": backup_file, "reused": reused})
+    except Exception:
+        _LOGGER.exception(utils.default_exception_str_builder())
+    raise HTTPInternalServerError
+
+
+def _export_chunks(entity: str, query: Mapping[str, str]) -> Iterator[list[dict[str, Any]]]:
+    """Return the chunks of rows to export of an entity."""
+    if entity == "clean_logs":
+        since, until = query.get("since"), query.get("until")
+        return clean_log_repo.export(
+            query.get("did"),
+            float(since) if since else None,
+            float(until) if until else None,
+        )
+    repos: dict[str, Callable[[int], Iterator[Sequence[VacBotDevice | VacBotClient | BumperUser]]]] = {
+        "bots": bot_repo.list_chunks,
+        "clients": client_repo.list_chunks,
+        "users": user_repo.list_chunks,
+    }
+    if (list_chunks := repos.get(entity)) is None:
+        msg = f"Unknown export entity: {entity}"
+        raise ValueError(msg)
+    return ([item.as_dict() for item in chunk] for chunk in list_chunks(EXPORT_CHUNK_SIZE))
+
+
+async def _handle_export(request: Request) -> web.StreamResponse:
+    """Stream clean logs, bots, clients or users as NDJSON (default) or CSV.
+
+    Rows are read from the database chunk by chunk outside the event loop, so exporting a long
+    clean log history keeps memory flat. Clean logs can be filtered by `did` and by their start
+    within [`since`, `until`) in seconds, clean logs without start timestamp are never exported.
+
+    Exports hold user and bot data, so like backups they are only served to the local network.
+    """
+    if not _from_local_network(request):
+        raise HTTPForbidden
+    entity = request.match_info["entity"]
+    fmt = request.query.get("format", "ndjson")
+    try:
+        encoder = RowEncoder(fmt)
+        chunks = _export_chunks(entity, request.query)
+    except ValueError as e:
+        raise HTTPBadRequest(text=str(e)) from e
+
+    response = web.StreamResponse(
+        headers={
+            "Content-Type": CONTENT_TYPES[fmt],
+            "Content-Disposition": f'attachment; filename="{entity}.{fmt}"',
+        },
+    )
+    await response.prepare(request)
+    while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+        await response.write(encoder.encode(chunk))
+    await response.write_eof()
+    return response
+
+
+async def _handle_clean_log_stats(request: Request) -> Response:
+    """Return clean log totals per bot, optionally of a single bot given by `did`.
+
+    The totals are kept in memory, the first request after startup scans the clean logs once.
+    They cover the retained clean logs only, logs removed by the clean log retention no longer count.
+    """
+    try:
+        return json_response({"bots": await async_clean_log_repo.stats(request.query.get("did"))})
     except Exception:
         _LOGGER.exception(utils.default_exception_str_builder())
     raise HTTPInternalServerError
@@ -114,6 +260,33 @@ async def _restart_mqtt_server() -> bool:
 # ******************************************************************************
 
 
+async def _handle_metrics(_: Request) -> Response:
+    """Return internal runtime counters as JSON."""
+    try:
+        models = {
+            "bots": bot_repo.model_cache.stats(),
+            "clients": client_repo.model_cache.stats(),
+            "users": user_repo.model_cache.stats(),
+            "clean_logs": clean_log_repo.model_cache.stats(),
+        }
+        return json_response(
+            {
+                "db": db.get_db_stats(),
+                "loop": loop_monitor.stats(),
+                "presence": presence.stats(),
+                "models": models,
+                "ops": op_timings.stats(),
+                "commands": bumper_isc.mqtt_helperbot.command_stats() if bumper_isc.mqtt_helperbot else None,
+            },
+        )
+    except Exception:
+        _LOGGER.exception(utils.default_exception_str_builder())
+    raise HTTPInternalServerError
+
+
+# ******************************************************************************
+
+
 async def handle_base(request: Request) -> Response:
     """Handle the base route."""
     try:
@@ -192,7 +365,7 @@ async def _get_context(request: Request, template_name: str | None = None) -> di
                     "mqtt_connection": bot.mqtt_connection,
                     "xmpp_connection": bot.xmpp_connection,
                 }
-                for bot in bot_repo.list_all()
+                for bot in await async_bot_repo.list_all()
             ],
         }
     if template_name and template_name == "clients":
@@ -206,7 +379,7 @@ async def _get_context(request: Request, template_name: str | None = None) -> di
                     "mqtt_connection": client.mqtt_connection,
                     "xmpp_connection": client.xmpp_connection,
                 }
-                for client in client_repo.list_all()
+                for client in await async_client_repo.list_all()
             ],
         }
     if template_name and template_name == "users":
@@ -215,17 +388,16 @@ async def _get_context(request: Request, template_name: str | None = None) -> di
                 {
                     "username": user.username,
                     "userid": user.userid,
-                    "devices": user.devices,
+                    "devices": list(user.devices),
                 }
-                for user in user_repo.list_all()
+                for user in await async_user_repo.list_all()
             ],
         }
     if template_name and template_name == "clean_logs":
         offset = int(request.query.get("offset", 0))
         limit = int(request.query.get("limit", 5))
-        clean_log_repo_list = sorted(clean_log_repo.list_all(), key=lambda x: (x.ts, x.did), reverse=True)
-        clean_log_repo_list_count = len(clean_log_repo_list)
-        clean_log_repo_list_limit = clean_log_repo_list[offset : offset + limit]
+        clean_log_repo_list_count = await async_clean_log_repo.count()
+        clean_log_repo_list_limit = await async_clean_log_repo.page(offset, limit)
         return {
             "count": clean_log_repo_list_count,
             "clean_logs": [
@@ -267,40 +439,42 @@ def _handle_remove_entity(entity_type: str) -> Callable[[Request], Awaitable[Res
 
     async def _handler(request: Request) -> Response:
         try:
-            remove_func: Callable[..., None] | None = None
-            get_func: Callable[..., VacBotClient | VacBotDevice | BumperUser | CleanLog | list[CleanLog] | None] | None = None
+            remove_func: Callable[..., Awaitable[None]] | None = None
+            get_func: (
+                Callable[..., Awaitable[VacBotClient | VacBotDevice | BumperUser | CleanLog | list[CleanLog] | None]] | None
+            ) = None
             entity_id: str | None = None
             if entity_type == "bot":
                 entity_id = request.match_info.get("did")
-                remove_func = bot_repo.remove
-                get_func = bot_repo.get
+                remove_func = async_bot_repo.remove
+                get_func = async_bot_repo.get
             elif entity_type == "client":
                 entity_id = request.match_info.get("userid")
-                remove_func = client_repo.remove
-                get_func = client_repo.get
+                remove_func = async_client_repo.remove
+                get_func = async_client_repo.get
             elif entity_type == "user":
                 entity_id = request.match_info.get("userid")
-                remove_func = user_repo.remove
-                get_func = user_repo.get_by_id
+                remove_func = async_user_repo.remove
+                get_func = async_user_repo.get_by_id
             elif entity_type == "clean_log":
                 entity_id = request.match_info.get("clean_log_id")
-                remove_func = clean_log_repo.remove_by_id
-                get_func = clean_log_repo.list_by_id
+                remove_func = async_clean_log_repo.remove_by_id
+                get_func = async_clean_log_repo.list_by_id
             elif entity_type == "clean_logs":
-                remove_func = clean_log_repo.clear
-                get_func = clean_log_repo.list_all
+                remove_func = async_clean_log_repo.clear
+                get_func = async_clean_log_repo.list_all
 
             if not entity_id and remove_func and get_func:
-                remove_func()
-                if (list_res := get_func()) and isinstance(list_res, list) and len(list_res) > 0:
-                    return web.json_response({"status": f"failed to remove {entity_type}"})
-                return web.json_response({"status": f"successfully removed {entity_type}"})
+                await remove_func()
+                if (list_res := await get_func()) and isinstance(list_res, list) and len(list_res) > 0:
+                    return json_response({"status": f"failed to remove {entity_type}"})
+                return json_response({"status": f"successfully removed {entity_type}"})
             if entity_id and remove_func and get_func:
-                remove_func(entity_id)
-                if get_func(entity_id):
-                    return web.json_response({"status": f"failed to remove {entity_type}"})
-                return web.json_response({"status": f"successfully removed {entity_type}"})
-            return web.json_response({"status": f"not implemented for {entity_type}"})
+                await remove_func(entity_id)
+                if await get_func(entity_id):
+                    return json_response({"status": f"failed to remove {entity_type}"})
+                return json_response({"status": f"successfully removed {entity_type}"})
+            return json_response({"status": f"not implemented for {entity_type}"})
         except Exception:
             _LOGGER.exception(utils.default_exception_str_builder())
         raise HTTPInternalServerError
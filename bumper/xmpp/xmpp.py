@@ -12,7 +12,8 @@ from xml.etree.ElementTree import Element
 
 import defusedxml.ElementTree as ET  # noqa: N817
 
-from bumper.db import bot_repo, client_repo, token_repo
+from bumper.db import async_token_repo, bot_repo, client_repo
+from bumper.db.worker import db_worker
 from bumper.utils import utils
 from bumper.utils.settings import config as bumper_isc
 
@@ -109,6 +110,7 @@ class XMPPAsyncClient:
     CONTROLLER: int = 2
     tls_upgraded: bool = False
     schedule_ping_task: asyncio.Task[Any] | None = None  # Track the schedule_ping task
+    auth_task: asyncio.Task[None] | None = None  # Track a pending client authentication
 
     def __init__(self, transport: transports.BaseTransport) -> None:
         """XMPP client init."""
@@ -126,7 +128,9 @@ class XMPPAsyncClient:
         _LOGGER_CLIENT.debug(f"new client with ip {self.address}")
 
     def cleanup(self) -> None:
-        """Ensure proper cleanup of the schedule_ping_task."""
+        """Ensure proper cleanup of the schedule_ping_task and of a pending client authentication."""
+        if self.auth_task and not self.auth_task.done():
+            self.auth_task.cancel()
         if self.schedule_ping_task and not self.schedule_ping_task.done():
             self.schedule_ping_task.cancel()
             try:
@@ -161,14 +165,7 @@ class XMPPAsyncClient:
         _LOGGER.info("Disconnect XMPP Client...")
         try:
             self.cleanup()  # Ensure the ping task is cleaned up
-            if self.devclass:
-                bot = bot_repo.get(self.uid)
-                if bot:
-                    bot_repo.set_xmpp(bot.did, False)
-            else:
-                client = client_repo.get(self.uid)
-                if client:
-                    client_repo.set_xmpp(client.userid, False)
+            db_worker.post(_set_xmpp_connection, self.uid, bool(self.devclass), False)
             self.transport.close()
         except Exception:
             _LOGGER_CLIENT.error(utils.default_exception_str_builder(), exc_info=True)
@@ -492,7 +489,8 @@ class XMPPAsyncClient:
                 authcode = saslauth[2]
 
             if self.devclass:  # if there is a devclass it is a bot
-                bot_repo.add(self.uid, self.uid, self.devclass, "atom", "eco-legacy")
+                # Queued on the database worker, the connection state set on bind is queued behind it
+                db_worker.post(bot_repo.add, self.uid, self.uid, self.devclass, "atom", "eco-legacy")
                 self.type = self.BOT
                 _LOGGER_CLIENT.info(f"XMPP Authentication Success :: Bot :: ClientID: {self.uid}")
                 # Send response
@@ -500,36 +498,37 @@ class XMPPAsyncClient:
                 # Client authenticated, move to next state
                 self.set_state("INIT")
 
+            elif bumper_isc.USE_AUTH is False:
+                self._complete_client_auth(True)
             else:
-                auth = False
-                if token_repo.verify_auth_code(self.uid, authcode) or bumper_isc.USE_AUTH is False:
-                    auth = True
-
-                if auth and self.clientresource is not None:
-                    self.type = self.CONTROLLER
-                    client_repo.add(self.uid, self.uid, "USER", self.clientresource)
-                    _LOGGER_CLIENT.info(f"XMPP Authentication Success :: Client :: ClientID: {self.uid}")
-                    # Client authenticated, move to next state
-                    self.set_state("INIT")
-                    # Send response
-                    self.send('<success xmlns="urn:ietf:params:xml:ns:xmpp-sasl"/>')  # Success
-                else:
-                    # Failed to authenticate
-                    self.send('<response xmlns="urn:ietf:params:xml:ns:xmpp-sasl"/>')  # Fail
+                # The client waits for the SASL result, so verify the auth code without blocking the loop
+                self.auth_task = asyncio.create_task(self._verify_client_auth(authcode))
+
+        except Exception:
+            _LOGGER_CLIENT.exception(utils.default_exception_str_builder(), exc_info=True)
 
+    async def _verify_client_auth(self, authcode: str) -> None:
+        try:
+            self._complete_client_auth(await async_token_repo.verify_auth_code(self.uid, authcode))
         except Exception:
             _LOGGER_CLIENT.exception(utils.default_exception_str_builder(), exc_info=True)
 
+    def _complete_client_auth(self, auth: bool) -> None:
+        if auth and self.clientresource is not None:
+            self.type = self.CONTROLLER
+            db_worker.post(client_repo.add, self.uid, self.uid, "USER", self.clientresource)
+            _LOGGER_CLIENT.info(f"XMPP Authentication Success :: Client :: ClientID: {self.uid}")
+            # Client authenticated, move to next state
+            self.set_state("INIT")
+            # Send response
+            self.send('<success xmlns="urn:ietf:params:xml:ns:xmpp-sasl"/>')  # Success
+        else:
+            # Failed to authenticate
+            self.send('<response xmlns="urn:ietf:params:xml:ns:xmpp-sasl"/>')  # Fail
+
     def _handle_bind(self, xml: Element) -> None:
         try:
-            if self.devclass:
-                bot = bot_repo.get(self.uid)
-                if bot:
-                    bot_repo.set_xmpp(bot.did, True)
-            else:
-                client = client_repo.get(self.uid)
-                if client is not None:
-                    client_repo.set_xmpp(client.userid, True)
+            db_worker.post(_set_xmpp_connection, self.uid, bool(self.devclass), True)
 
             type_added = "client"
             clientresourcexml = list(next(iter(xml)))
@@ -724,3 +723,11 @@ class XMPPAsyncClient:
             "address": self.address,
             "type": "BOT" if self.type == self.BOT else "CONTROLLER" if self.type == self.CONTROLLER else "UNKNOWN",
         }
+
+
+def _set_xmpp_connection(uid: str, is_bot: bool, connected: bool) -> None:
+    """Update the in-memory XMPP connection state of a known bot or client, run on the database worker."""
+    if is_bot:
+        bot_repo.set_xmpp(uid, connected)
+    else:
+        client_repo.set_xmpp(uid, connected)
@@ -0,0 +1,186 @@
+"""Time the database repositories against synthetic fleets, for tracking regressions between releases.
+
+Every fleet gets a fresh database in a temporary directory with, per bot, 10 tokens and
+100 clean logs, so 10k bots seed 100k tokens and 1M clean logs.
+
+Usage: python scripts/benchmark-db.py [--bots 1000 10000] [--engine json] [--rounds N] [--output results.json]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import json
+import logging
+from pathlib import Path
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bumper.db import bot_repo, clean_log_repo, db, token_repo  # noqa: E402
+from bumper.db.migration import migrate_db  # noqa: E402
+from bumper.utils import json_codec  # noqa: E402
+from bumper.utils.settings import config as bumper_isc  # noqa: E402
+
+TOKENS_PER_BOT = 10
+CLEAN_LOGS_PER_BOT = 100
+
+
+def _fleet(bots: int, ts: int) -> dict[str, dict[str, dict]]:
+    now = datetime.now(tz=bumper_isc.LOCAL_TIMEZONE)
+    valid = (now + timedelta(days=1)).isoformat()
+    expired = (now - timedelta(days=1)).isoformat()
+    tokens = (
+        {"userid": f"user_{i % bots}", "token": f"token_{i}", "expiration": expired if i % 10 == 0 else valid}
+        for i in range(bots * TOKENS_PER_BOT)
+    )
+    logs = (
+        {
+            "clean_log_id": f"did_{i % bots}@{ts + i}@sdu9",
+            "did": f"did_{i % bots}",
+            "cid": "cid",
+            "area": 28,
+            "image_url": f"https://localhost/api/lg/image/{i}",
+            "last": 1800,
+            "stop_reason": 1,
+            "ts": ts + i,
+            "type": "auto",
+        }
+        for i in range(bots * CLEAN_LOGS_PER_BOT)
+    )
+    return {
+        db.TABLE_BOTS: {
+            str(i + 1): {
+                "did": f"did_{i}",
+                "class": "ls1ok3",
+                "resource": "abcd",
+                "name": f"E0000{i}",
+                "nick": None,
+                "company": "eco-ng",
+                "mqtt_connection": i % 2 == 0,
+                "xmpp_connection": False,
+            }
+            for i in range(bots)
+        },
+        db.TABLE_TOKENS: {str(i + 1): doc for i, doc in enumerate(tokens)},
+        db.TABLE_CLEAN_LOGS: {str(i + 1): doc for i, doc in enumerate(logs)},
+        db.TABLE_META: {"1": {"key": "db_version", "value": bumper_isc.APP_VERSION}},
+    }
+
+
+def _seed(data: dict[str, dict[str, dict]]) -> float:
+    start = time.perf_counter()
+    db.get_db().storage.write(data)
+    db.flush_db()
+    return time.perf_counter() - start
+
+
+def _time(name: str, fn, rounds: int, rng: random.Random, bots: int) -> dict:
+    # The first call pays for building indexes and decoding models
+    start = time.perf_counter_ns()
+    fn(0)
+    cold_us = (time.perf_counter_ns() - start) / 1000
+    samples = []
+    for _ in range(rounds):
+        i = rng.randrange(bots)
+        start = time.perf_counter_ns()
+        fn(i)
+        samples.append((time.perf_counter_ns() - start) / 1000)
+    samples.sort()
+    return {
+        "name": name,
+        "samples": len(samples),
+        "cold_us": cold_us,
+        "mean_us": statistics.fmean(samples),
+        "p50_us": samples[len(samples) // 2],
+        "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "max_us": samples[-1],
+    }
+
+
+def _migration(bots: int, ts: int) -> dict[str, dict[str, dict]]:
+    """Database in the 0.2.2 schema, clean logs nested per bot."""
+    return {
+        db.TABLE_CLEAN_LOGS: {
+            str(b + 1): {
+                "did": f"did_{b}",
+                "logs": [
+                    {"clean_log_id": f"did_{b}@{ts + i}@sdu9", "ts": ts + i, "type": "auto"} for i in range(CLEAN_LOGS_PER_BOT)
+                ],
+            }
+            for b in range(bots)
+        },
+        db.TABLE_META: {"1": {"key": "db_version", "value": "0.2.2"}},
+    }
+
+
+def run_fleet(bots: int, rounds: int, workdir: Path) -> dict:
+    rng = random.Random(bots)
+    ts = 1_699_297_517
+    bumper_isc.db_file = str(workdir / f"bumper-{bots}.db")
+    seed_s = _seed(_fleet(bots, ts))
+
+    results = [
+        _time("BotRepo.get", lambda i: bot_repo.get(f"did_{i}"), rounds, rng, bots),
+        _time("TokenRepo.verify", lambda i: token_repo.verify(f"user_{i}", f"token_{i + bots}"), rounds, rng, bots),
+        _time("CleanLogRepo.list_by_did", lambda i: clean_log_repo.list_by_did(f"did_{i}"), max(rounds // 10, 1), rng, bots),
+        _time("CleanLogRepo.page", lambda i: clean_log_repo.page(i % 100, 5), rounds, rng, bots),
+        _time("BotRepo.reset_all_connections", lambda _: bot_repo.reset_all_connections(), 10, rng, bots),
+        _time("TokenRepo.revoke_expired", lambda _: token_repo.revoke_expired(), 10, rng, bots),
+    ]
+    db.close_db()
+
+    bumper_isc.db_file = str(workdir / f"bumper-{bots}-migration.db")
+    _seed(_migration(bots, ts))
+    start = time.perf_counter_ns()
+    migrate_db()
+    duration_us = (time.perf_counter_ns() - start) / 1000
+    results.append({"name": "migrate_db 0.2.2", "samples": 1, "cold_us": duration_us, "mean_us": duration_us})
+    db.close_db()
+
+    return {
+        "bots": bots,
+        "tokens": bots * TOKENS_PER_BOT,
+        "clean_logs": bots * CLEAN_LOGS_PER_BOT,
+        "seed_s": seed_s,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bots", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--engine", choices=["json", "sqlite", "journal"], default="json")
+    parser.add_argument("--rounds", type=int, default=1000)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    bumper_isc.DB_ENGINE = args.engine
+    logging.getLogger("bumper").setLevel(logging.WARNING)
+    report = {
+        "version": bumper_isc.APP_VERSION,
+        "python": platform.python_version(),
+        "engine": args.engine,
+        "json_codec": json_codec.codec.name,
+        "fleets": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="bumper_benchmark_") as workdir:
+        for bots in args.bots:
+            fleet = run_fleet(bots, args.rounds, Path(workdir))
+            report["fleets"].append(fleet)
+            print(f"\n{bots} bots, {fleet['tokens']} tokens, {fleet['clean_logs']} clean logs, seeded in {fleet['seed_s']:.1f}s")
+            print(f"{'operation':<32}{'samples':>8}{'cold µs':>12}{'mean µs':>12}{'p50 µs':>12}{'p99 µs':>12}")
+            for r in fleet["results"]:
+                p50, p99 = r.get("p50_us", r["mean_us"]), r.get("p99_us", r["mean_us"])
+                print(f"{r['name']:<32}{r['samples']:>8}{r['cold_us']:>12.1f}{r['mean_us']:>12.1f}{p50:>12.1f}{p99:>12.1f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare the available JSON codecs on payloads bumper serializes often.
+
+Usage: python scripts/benchmark-json.py [--rounds N]
+"""
+
+import argparse
+from pathlib import Path
+import sys
+import timeit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bumper.utils import json_codec  # noqa: E402
+from bumper.web.static_api import get_product_iot_map  # noqa: E402
+
+
+def _database(bots: int = 200, logs_per_bot: int = 50) -> dict:
+    return {
+        "bots": {
+            str(i): {"did": f"did_{i}", "class": "ls1ok3", "name": f"E0000{i}", "nick": "Robot", "resource": "abcd", "company": "eco-ng"}
+            for i in range(bots)
+        },
+        "clean_logs": {
+            str(i): {
+                "clean_log_id": f"did_{i % bots}@{1699297517 + i}@sdu9",
+                "did": f"did_{i % bots}",
+                "area": 28,
+                "last": 1699297517,
+                "ts": 1699297517 + i,
+                "type": "auto",
+                "image_url": f"https://localhost/api/lg/image/{i}",
+                "aitypes": [],
+            }
+            for i in range(bots * logs_per_bot)
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = {"database": _database(), "product_iot_map": get_product_iot_map()}
+    print(f"{'payload':<18}{'codec':<10}{'size kB':>10}{'dumps ms':>12}{'loads ms':>12}")
+    for name, payload in payloads.items():
+        for codec in json_codec.available_codecs():
+            encoded = codec.dumpb(payload)
+            dumps = timeit.timeit(lambda: codec.dumpb(payload), number=args.rounds) / args.rounds * 1000
+            loads = timeit.timeit(lambda: codec.loads(encoded), number=args.rounds) / args.rounds * 1000
+            print(f"{name:<18}{codec.name:<10}{len(encoded) / 1024:>10.1f}{dumps:>12.2f}{loads:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure the memory used by decoded clean logs, slotted models against dict-backed objects.
+
+Usage: python scripts/benchmark-models.py [--count N]
+"""
+
+import argparse
+from pathlib import Path
+import sys
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bumper.web.utils.models import CleanLog  # noqa: E402
+
+
+class DictCleanLog:
+    """Clean log storing its fields in the instance __dict__, as the models did before."""
+
+    def __init__(self, data: dict) -> None:
+        for key, value in data.items():
+            setattr(self, key, value)
+
+
+def _documents(count: int) -> list[dict]:
+    return [
+        CleanLog(
+            clean_log_id=f"did_{i % 50}@{1699297517 + i}@sdu9",
+            did=f"did_{i % 50}",
+            cid="cid",
+            area=28,
+            image_url=f"https://localhost/api/lg/image/{i}",
+            stop_reason=1,
+            last=1699297517,
+            ts=1699297517 + i,
+            type="auto",
+        ).to_db()
+        for i in range(count)
+    ]
+
+
+def _measure(build) -> int:
+    tracemalloc.start()
+    objects = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    docs = _documents(args.count)
+    results = {
+        "dict-backed": _measure(lambda: [DictCleanLog(doc) for doc in docs]),
+        "slotted": _measure(lambda: [CleanLog.from_db(doc) for doc in docs]),
+    }
+    print(f"{'model':<14}{'total MB':>10}{'bytes/object':>14}")
+    for name, size in results.items():
+        print(f"{name:<14}{size / 1024 / 1024:>10.1f}{size / args.count:>14.0f}")
+    saved = results["dict-backed"] - results["slotted"]
+    print(f"saved {saved / args.count:.0f} bytes per clean log ({saved / results['dict-backed']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,7 @@ from aiohttp.web import Application
 from aiomqtt import Client
 import pytest
 
-from bumper.db import db
+from bumper.db import db, presence
 from bumper.mqtt.helper_bot import MQTTHelperBot
 from bumper.mqtt.server import MQTTBinding, MQTTServer
 from bumper.utils.certs import generate_certificates
@@ -104,6 +104,8 @@ def test_certs(tmp_path: Path) -> None:
 def clean_database(test_files: dict[str, Path]) -> None:
     """Clean and reset test database between tests."""
     db.get_db().drop_tables()
+    db.close_db()
+    presence.reset()
     db_file = test_files["db"]
     if db_file.exists():
         db_file.unlink()
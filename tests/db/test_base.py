@@ -1,10 +1,158 @@
 """Tests for bumper/db/base.py"""
 
-# import pytest
+import pytest
 
-# TODO: Implement real test cases for base.py
+from bumper.db import db
+from bumper.db.base import BaseRepo
 
 
-def test_placeholder() -> None:
-    """Test placeholder."""
-    assert True  # Placeholder test for base
+class _Repo(BaseRepo):
+    indexes = ("key",)
+    multi_indexes = ("tags",)
+
+    def __init__(self) -> None:
+        super().__init__(db.TABLE_BOTS)
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_indexed_lookup() -> None:
+    repo = _Repo()
+    repo._insert({"key": "a", "tags": ["x", "y"], "other": 1})
+    repo._insert({"key": "b", "tags": ["y"], "other": 2})
+
+    assert repo._get({"key": "a"})["other"] == 1
+    assert [d["key"] for d in repo._get_multi({"tags": "y"})] == ["a", "b"]
+    assert [d["key"] for d in repo._get_multi({"tags": "y", "other": 2})] == ["b"]
+    assert repo._get({"key": "c"}) is None
+    # Not indexed field falls back to a scan
+    assert repo._get({"other": 2})["key"] == "b"
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_index_maintained_on_writes() -> None:
+    repo = _Repo()
+    repo._upsert({"key": "a", "tags": ["x"]}, {"key": "a"})
+    repo._upsert({"tags": ["z"]}, {"key": "a"})
+    assert repo._get({"tags": "x"}) is None
+    assert repo._get({"tags": "z"})["key"] == "a"
+    rebuilds = repo._index.rebuilds
+
+    repo._remove({"key": "a"})
+    assert repo._get({"key": "a"}) is None
+    # Writes through the repo never force a rebuild
+    assert repo._index.rebuilds == rebuilds
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_index_rebuilt_on_foreign_write() -> None:
+    repo = _Repo()
+    repo._insert({"key": "a"})
+    assert repo._get({"key": "b"}) is None
+
+    # Write bypassing the repo is noticed by the index
+    repo.table.insert({"key": "b"})
+    assert repo._get({"key": "b"}) is not None
+
+    repo._truncate()
+    assert repo._get({"key": "a"}) is None
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_update_list_field() -> None:
+    repo = _Repo()
+    repo._insert({"key": "a", "tags": []})
+    assert repo.update_list_field({"key": "a"}, "tags", "x", True)
+    assert repo._get({"tags": "x"})["key"] == "a"
+    assert repo.update_list_field({"key": "a"}, "tags", "x", False)
+    assert repo._get({"tags": "x"}) is None
+    assert repo.update_list_field({"key": "missing"}, "tags", "x", True) is False
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_remove_multi_and_ids() -> None:
+    repo = _Repo()
+    ids = [repo._insert({"key": "a", "n": n}) for n in range(3)]
+    repo._remove_ids(ids[:1])
+    assert len(repo._get_multi({"key": "a"})) == 2
+    repo._remove_multi({"key": "a"})
+    assert repo._get_multi({"key": "a"}) == []
+    repo._remove_ids([])
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_update_many() -> None:
+    repo = _Repo()
+    for key in ("a", "b", "c"):
+        repo._insert({"key": key, "flag": True})
+    writes = db.get_db_stats()["writes"]
+
+    assert repo.update_many({"flag": False}, {"key": "b"}) == [2]
+    assert sorted(repo.update_many({"flag": False})) == [1, 2, 3]
+    assert repo.update_many({"flag": False}, {"key": "missing"}) == []
+    assert db.get_db_stats()["writes"] == writes + 2
+    assert [d["flag"] for d in repo._all()] == [False, False, False]
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_upsert_many() -> None:
+    repo = _Repo()
+    repo._insert({"key": "a", "tags": ["x"]})
+    repo._insert({"key": "b", "tags": ["x"]})
+    writes = db.get_db_stats()["writes"]
+
+    doc_ids = repo.upsert_many(
+        [
+            ({"n": 1}, {"key": "a"}),
+            ({"n": 2}, {"tags": "x"}),
+            ({"key": "c", "n": 3}, {"key": "c"}),
+            ({"m": 4}, {"key": "c"}),
+        ],
+    )
+    # One write for the updates, one for the inserts
+    assert db.get_db_stats()["writes"] == writes + 2
+    assert sorted(doc_ids) == [1, 2, 3]
+    assert repo._get({"key": "a"}) == {"key": "a", "tags": ["x"], "n": 2}
+    assert repo._get({"key": "b"}) == {"key": "b", "tags": ["x"], "n": 2}
+    assert repo._get({"key": "c"}) == {"key": "c", "n": 3, "m": 4}
+    assert repo.upsert_many([]) == []
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_batch_single_flush() -> None:
+    repo = _Repo()
+    db.flush_db()
+    flushes = db.get_db_stats()["flushes"]
+    with repo.batch(), repo.batch():
+        repo._insert({"key": "a"})
+        repo.update_many({"flag": True})
+    db.flush_db()
+    assert db.get_db_stats()["flushes"] == flushes + 1
+    assert repo._get({"key": "a"}) == {"key": "a", "flag": True}
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_extend_list_field() -> None:
+    repo = _Repo()
+    repo._insert({"key": "a", "tags": ["x"]})
+    assert repo.extend_list_field({"key": "a"}, "tags", ["x", "y", "z", "y"])
+    assert repo._get({"key": "a"})["tags"] == ["x", "y", "z"]
+    assert repo._get({"tags": "z"})["key"] == "a"
+    assert repo.extend_list_field({"key": "a"}, "tags", ["x"])
+    assert repo.extend_list_field({"key": "missing"}, "tags", ["x"]) is False
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_update_sets() -> None:
+    repo = _Repo()
+    repo._insert({"key": "a", "tags": ["x", "y"]})
+    writes = db.get_db_stats()["writes"]
+
+    assert repo.update_sets({"key": "a"}, add={"tags": ["z", "x"], "other": ["o"]}, remove={"tags": ["y"]})
+    assert db.get_db_stats()["writes"] == writes + 1
+    assert repo._get({"key": "a"}) == {"key": "a", "tags": ["x", "z"], "other": ["o"]}
+    assert repo._get({"tags": "y"}) is None
+
+    # Nothing changes, nothing is written
+    assert repo.update_sets({"key": "a"}, add={"tags": ["x", "z"]}, remove={"other": ["missing"]})
+    assert db.get_db_stats()["writes"] == writes + 1
+    assert repo.update_sets({"key": "missing"}, add={"tags": ["x"]}) is False
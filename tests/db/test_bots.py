@@ -1,3 +1,5 @@
+from dataclasses import FrozenInstanceError
+
 import pytest
 
 from bumper.db import bot_repo
@@ -34,6 +36,22 @@ def test_bot_list_all() -> None:
     assert len(bots) == 2
     assert sorted(bot.did for bot in bots) == ["did_1", "did_2"]
 
+    with pytest.raises(FrozenInstanceError):
+        bots[0].nick = "changed"  # type: ignore[misc]
+    assert [bot.nick for bot in bot_repo.list_all()] == ["", ""]
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_bot_list_chunks() -> None:
+    for i in range(3):
+        bot_repo.add(f"sn_{i}", f"did_{i}", "class", "res", "co")
+
+    chunks = bot_repo.list_chunks(2)
+    assert [bot.did for bot in next(chunks)] == ["did_0", "did_1"]
+    bot_repo.remove("did_2")  # Removed while listing, between two chunks
+    assert next(chunks, None) is None
+    assert [[bot.did for bot in chunk] for chunk in bot_repo.list_chunks(1)] == [["did_0"], ["did_1"]]
+
 
 @pytest.mark.usefixtures("clean_database")
 def test_bot_set_fields_with_none_did(caplog: pytest.LogCaptureFixture) -> None:
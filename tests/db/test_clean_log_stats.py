@@ -0,0 +1,55 @@
+from bumper.db.clean_log_stats import CleanLogStats, Totals, summary
+
+# 2023-11-06 19:05 UTC
+TS = 1699297517
+
+
+def test_totals_incremental() -> None:
+    stats = CleanLogStats()
+    before = {"1": {"did": "a", "ts": TS, "type": "auto", "area": 10, "last": 600}}
+    buckets = stats.buckets(before, "a")
+    assert list(buckets.values()) == [Totals(1, 10, 600)]
+
+    after = {**before, "2": {"did": "a", "ts": TS * 1000, "type": "auto", "area": 5, "last": 60}}
+    stats.changed(before, after, [2])
+    assert sum(t.count for t in stats.buckets(after, "a").values()) == 2
+    assert sum(t.area for t in stats.buckets(after, "a").values()) == 15
+
+    final = {"2": after["2"]}
+    stats.changed(after, final, [1])
+    assert sum(t.area for t in stats.buckets(final, "a").values()) == 5
+    assert stats.dids(final) == ["a"]
+    assert stats.rebuilds == 1
+
+    empty: dict = {}
+    stats.changed(final, empty, [2])
+    assert stats.buckets(empty, "a") == {}
+    assert stats.dids(empty) == []
+    assert stats.rebuilds == 1
+
+
+def test_unreported_write_triggers_rebuild() -> None:
+    stats = CleanLogStats()
+    stats.buckets({"1": {"did": "a", "area": 1}}, "a")
+    assert stats.buckets({"1": {"did": "a", "area": 2}}, "a") == {(None, None): Totals(1, 2, 0)}
+    assert stats.rebuilds == 2
+
+
+def test_summary() -> None:
+    buckets = {
+        ("2023-11-06", "auto"): Totals(2, 30, 1200),
+        ("2023-11-06", "spotArea"): Totals(1, 5, 300),
+        ("2023-11-07", "auto"): Totals(1, 20, 900),
+        (None, None): Totals(1, 1, 1),
+    }
+    assert summary("a", buckets) == {
+        "did": "a",
+        "count": 5,
+        "area": 56,
+        "time": 2401,
+        "days": {
+            "2023-11-06": {"count": 3, "area": 35, "time": 1500},
+            "2023-11-07": {"count": 1, "area": 20, "time": 900},
+        },
+        "types": {"auto": {"count": 3, "area": 50, "time": 2100}, "spotArea": {"count": 1, "area": 5, "time": 300}},
+    }
@@ -1,6 +1,12 @@
+from dataclasses import FrozenInstanceError, replace
+from datetime import UTC, datetime
+from unittest.mock import patch
+
 import pytest
 
-from bumper.db import clean_log_repo
+from bumper.db import clean_log_repo, db
+from bumper.db.clean_logs import SHARD_PREFIX
+from bumper.utils.settings import config as bumper_isc
 from bumper.web.utils.models import CleanLog
 
 
@@ -10,14 +16,7 @@ def test_clean_logs_db() -> None:
     cid = "1699297517"
     start = 1699297517
     rid = "sdu9"
-    clean_log = CleanLog(f"{did}@{start}@{rid}")
-    clean_log.did = did
-    clean_log.cid = cid
-    clean_log.area = 28
-    clean_log.last = 1699297517
-    clean_log.stop_reason = 1
-    clean_log.ts = start
-    clean_log.type = "auto"
+    clean_log = CleanLog(f"{did}@{start}@{rid}", did=did, cid=cid, area=28, last=1699297517, stop_reason=1, ts=start, type="auto")
 
     clean_log_repo.clear()
     assert len(clean_log_repo.list_by_did(did)) == 0
@@ -28,50 +27,50 @@ def test_clean_logs_db() -> None:
     assert clean_log_repo.list_by_id(clean_log.clean_log_id) is not None
 
     rid = "sdu8"
-    clean_log.clean_log_id = f"{did}@{start}@{rid}"
+    clean_log = replace(clean_log, clean_log_id=f"{did}@{start}@{rid}")
     clean_log_repo.add_or_update(clean_log)
     assert len(clean_log_repo.list_by_did(did)) == 2
 
-    clean_log.ts = 1699297517 + 1
-    clean_log.clean_log_id = f"{did}@{clean_log.ts}@{rid}"
+    clean_log = replace(clean_log, ts=1699297517 + 1)
+    clean_log = replace(clean_log, clean_log_id=f"{did}@{clean_log.ts}@{rid}")
     clean_log_repo.add_or_update(clean_log)
     assert len(clean_log_repo.list_by_did(did)) == 3
 
     rid = "sdu7"
-    clean_log.clean_log_id = f"{did}@{start}@{rid}"
+    clean_log = replace(clean_log, clean_log_id=f"{did}@{start}@{rid}")
     clean_log_repo.add_or_update(clean_log)
     assert len(clean_log_repo.list_by_did(did)) == 4
 
     did = "cßa9sbas"
-    clean_log.clean_log_id = f"{did}@{clean_log.ts}@{rid}"
-    clean_log.did = did
+    clean_log = replace(clean_log, clean_log_id=f"{did}@{clean_log.ts}@{rid}")
+    clean_log = replace(clean_log, did=did)
     clean_log_repo.add_or_update(clean_log)
     assert len(clean_log_repo.list_by_did(did)) == 1
 
-    clean_log.type = "area"
+    clean_log = replace(clean_log, type="area")
     clean_log_repo.add_or_update(clean_log)
     assert len(clean_log_repo.list_by_did(did)) == 2
 
     clean_log_repo.clear()
     assert clean_log_repo.list_by_id(clean_log.clean_log_id) is None
 
-    clean_log.type = "a"
+    clean_log = replace(clean_log, type="a")
     clean_log_repo.add_or_update(clean_log)
     assert len(clean_log_repo.list_by_did(did)) == 1
 
-    clean_log.type = "b"
+    clean_log = replace(clean_log, type="b")
     clean_log_repo.add_or_update(clean_log)
     assert len(clean_log_repo.list_by_did(did)) == 2
 
-    clean_log.type = "b"
+    clean_log = replace(clean_log, type="b")
     clean_log_repo.add_or_update(clean_log)
     assert len(clean_log_repo.list_by_did(did)) == 2
 
-    clean_log.last = 1699297520
+    clean_log = replace(clean_log, last=1699297520)
     clean_log_repo.add_or_update(clean_log)
     assert len(clean_log_repo.list_by_did(did)) == 2
 
-    clean_log.area = 28
+    clean_log = replace(clean_log, area=28)
     clean_log_repo.add_or_update(clean_log)
     assert len(clean_log_repo.list_by_did(did)) == 2
 
@@ -83,17 +82,9 @@ def test_clean_logs_remove_by_id() -> None:
     ts = 1699297517
 
     # Add multiple entries
-    log1 = CleanLog(f"{did}@{ts}@r1")
-    log1.did = did
-    log1.cid = cid
-    log1.ts = ts
-    log1.type = "auto"
-
-    log2 = CleanLog(f"{did}@{ts}@r2")
-    log2.did = did
-    log2.cid = cid
-    log2.ts = ts
-    log2.type = "auto"
+    log1 = CleanLog(f"{did}@{ts}@r1", did=did, cid=cid, ts=ts, type="auto")
+
+    log2 = CleanLog(f"{did}@{ts}@r2", did=did, cid=cid, ts=ts, type="auto")
 
     clean_log_repo.clear()
     clean_log_repo.add_or_update(log1)
@@ -110,3 +101,172 @@ def test_clean_logs_remove_by_id() -> None:
     logs = clean_log_repo.list_by_did(did)
     assert len(logs) == 1
     assert logs[0].clean_log_id == log2.clean_log_id
+
+
+def _clean_log(did: str, ts: int | str, rid: str = "sdu9") -> CleanLog:
+    return CleanLog(f"{did}@{ts}@{rid}", did=did, ts=ts, type="auto")  # type: ignore[arg-type]
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_clean_logs_compact_by_age() -> None:
+    now = int(datetime.now(tz=UTC).timestamp())
+    old = now - 10 * 86400
+    clean_log_repo.add_or_update(_clean_log("bot_a", old, "old_s"))
+    clean_log_repo.add_or_update(_clean_log("bot_a", old * 1000, "old_ms"))
+    clean_log_repo.add_or_update(_clean_log("bot_a", str(old), "old_str"))
+    clean_log_repo.add_or_update(_clean_log("bot_a", now, "new_s"))
+    clean_log_repo.add_or_update(_clean_log("bot_b", now * 1000, "new_ms"))
+
+    assert clean_log_repo.compact() == 0
+    assert clean_log_repo.compact(max_age_days=5) == 3
+    assert sorted(log.clean_log_id for log in clean_log_repo.list_all()) == [f"bot_a@{now}@new_s", f"bot_b@{now * 1000}@new_ms"]
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_clean_logs_compact_by_count() -> None:
+    for i in range(5):
+        clean_log_repo.add_or_update(_clean_log("bot_a", 1699297500 + i, f"r{i}"))
+    clean_log_repo.add_or_update(_clean_log("bot_a", 1699297600 * 1000, "ms"))
+    clean_log_repo.add_or_update(_clean_log("bot_b", 1699297500, "r0"))
+
+    assert clean_log_repo.compact(max_per_bot=2) == 4
+    assert sorted(log.clean_log_id for log in clean_log_repo.list_by_did("bot_a")) == [
+        "bot_a@1699297504@r4",
+        "bot_a@1699297600000@ms",
+    ]
+    assert len(clean_log_repo.list_by_did("bot_b")) == 1
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_clean_logs_sharding() -> None:
+    clean_log_repo.add_or_update(_clean_log("bot_a", 1699297500))
+    clean_log_repo.add_or_update(_clean_log("bot_b", 1699297500))
+
+    with patch.object(bumper_isc, "CLEAN_LOG_SHARDING", True):
+        assert clean_log_repo.reshard() == 2
+        assert clean_log_repo.table.all() == []
+        assert {name for name in db.get_db().tables() if name.startswith(SHARD_PREFIX)} == {
+            f"{SHARD_PREFIX}bot_a",
+            f"{SHARD_PREFIX}bot_b",
+        }
+
+        clean_log_repo.add_or_update(_clean_log("bot_a", 1699297501, "r1"))
+        assert len(clean_log_repo.list_by_did("bot_a")) == 2
+        assert len(clean_log_repo.list_all()) == 3
+        assert clean_log_repo.list_by_id("bot_b@1699297500@sdu9") is not None
+        assert clean_log_repo.compact(max_per_bot=1) == 1
+
+        clean_log_repo.remove_by_id("bot_b@1699297500@sdu9")
+        assert clean_log_repo.list_by_did("bot_b") == []
+
+    assert clean_log_repo.reshard() == 1
+    assert [log.clean_log_id for log in clean_log_repo.list_by_did("bot_a")] == ["bot_a@1699297501@r1"]
+    assert not [name for name in db.get_db().tables() if name.startswith(SHARD_PREFIX)]
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_clean_logs_page() -> None:
+    for i, did in enumerate(["bot_a", "bot_b", "bot_a", "bot_c"]):
+        clean_log_repo.add_or_update(_clean_log(did, 1699297500 + i // 2))
+
+    expected = ["bot_c@1699297501", "bot_a@1699297501", "bot_b@1699297500", "bot_a@1699297500"]
+    assert clean_log_repo.count() == 4
+    assert [log.clean_log_id[:-5] for log in clean_log_repo.page()] == expected
+    assert [log.clean_log_id[:-5] for log in clean_log_repo.page(1, 2)] == expected[1:3]
+
+    first = clean_log_repo.page(limit=2)
+    assert [log.clean_log_id[:-5] for log in clean_log_repo.page(limit=2, after=first[-1])] == expected[2:]
+
+    clean_log_repo.remove_by_id("bot_c@1699297501@sdu9")
+    assert [log.clean_log_id[:-5] for log in clean_log_repo.page(limit=1)] == expected[1:2]
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_clean_logs_page_same_id_other_type() -> None:
+    clean_log_repo.add_or_update(_clean_log("bot_a", 1699297500))
+    clean_log_repo.add_or_update(replace(_clean_log("bot_a", 1699297500), type="spotArea"))
+    clean_log_repo.add_or_update(_clean_log("bot_a", 1699297499))
+
+    first = clean_log_repo.page(limit=1)
+    second = clean_log_repo.page(limit=1, after=first[0])
+    third = clean_log_repo.page(limit=1, after=second[0])
+    assert {first[0].type, second[0].type} == {"auto", "spotArea"}
+    assert [log.ts for log in third] == [1699297499]
+    assert [[row["type"] for row in chunk] for chunk in clean_log_repo.export(chunk_size=1)] == [["auto"], ["auto"], ["spotArea"]]
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_clean_logs_page_sharded() -> None:
+    clean_log_repo.add_or_update(_clean_log("bot_a", 1699297500))
+    with patch.object(bumper_isc, "CLEAN_LOG_SHARDING", True):
+        clean_log_repo.add_or_update(_clean_log("bot_b", 1699297502))
+        clean_log_repo.add_or_update(_clean_log("bot_a", 1699297501))
+
+        assert clean_log_repo.count() == 3
+        assert [log.ts for log in clean_log_repo.page()] == [1699297502, 1699297501, 1699297500]
+        assert [log.ts for log in clean_log_repo.page(limit=1, after=clean_log_repo.page(limit=1)[0])] == [1699297501]
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_clean_logs_export() -> None:
+    for ts in (1699297502, 1699297500000, 1699297501):
+        clean_log_repo.add_or_update(_clean_log("bot_a", ts))
+    clean_log_repo.add_or_update(_clean_log("bot_b", 1699297503))
+    no_ts = replace(_clean_log("bot_a", 0, "no_ts"), ts=None)
+    clean_log_repo.add_or_update(no_ts)  # Not exported, with or without bot
+
+    chunks = list(clean_log_repo.export(chunk_size=2))
+    assert [[row["ts"] for row in chunk] for chunk in chunks] == [[1699297500000, 1699297501], [1699297502, 1699297503]]
+    assert [row["ts"] for chunk in clean_log_repo.export(since=1699297502) for row in chunk] == [1699297502, 1699297503]
+    assert [row["ts"] for chunk in clean_log_repo.export(until=1699297502) for row in chunk] == [1699297500000, 1699297501]
+    assert [row["ts"] for chunk in clean_log_repo.export("bot_a", chunk_size=1) for row in chunk] == [
+        1699297500000,
+        1699297501,
+        1699297502,
+    ]
+
+    with patch.object(bumper_isc, "CLEAN_LOG_SHARDING", True):
+        clean_log_repo.add_or_update(_clean_log("bot_b", 1699297504))
+        assert [row["ts"] for chunk in clean_log_repo.export("bot_b") for row in chunk] == [1699297503, 1699297504]
+    assert sum(len(chunk) for chunk in clean_log_repo.export()) == 5
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_clean_logs_stats() -> None:
+    log = replace(_clean_log("bot_a", 1699297500), area=20, last=600)
+    clean_log_repo.add_or_update(log)
+    log = replace(log, area=30)
+    clean_log_repo.add_or_update(log)
+    clean_log_repo.add_or_update(_clean_log("bot_b", 1699297500))
+
+    (stats_a,) = clean_log_repo.stats("bot_a")
+    assert (stats_a["count"], stats_a["area"], stats_a["time"]) == (1, 30, 600)
+    assert stats_a["types"] == {"auto": {"count": 1, "area": 30, "time": 600}}
+    assert [s["did"] for s in clean_log_repo.stats()] == ["bot_a", "bot_b"]
+
+    # Totals cover retained clean logs only
+    clean_log_repo.add_or_update(replace(_clean_log("bot_b", 1699297400, "r2"), area=10))
+    assert (clean_log_repo.stats("bot_b")[0]["count"], clean_log_repo.stats("bot_b")[0]["area"]) == (2, 10)
+    assert clean_log_repo.compact(max_per_bot=1) == 1
+    assert (clean_log_repo.stats("bot_b")[0]["count"], clean_log_repo.stats("bot_b")[0]["area"]) == (1, 0)
+
+    with patch.object(bumper_isc, "CLEAN_LOG_SHARDING", True):
+        clean_log_repo.add_or_update(_clean_log("bot_a", 1699297600, "r1"))
+        assert clean_log_repo.stats("bot_a")[0]["count"] == 2
+        assert [s["did"] for s in clean_log_repo.stats()] == ["bot_a", "bot_b"]
+
+    clean_log_repo.remove_by_id(log.clean_log_id)
+    assert clean_log_repo.stats("bot_a")[0]["count"] == 1
+    clean_log_repo.clear()
+    assert clean_log_repo.stats() == []
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_clean_logs_cached_models_frozen() -> None:
+    clean_log_repo.add_or_update(replace(_clean_log("bot_a", 1699297500), aitypes=("shoe",)))
+
+    stored = clean_log_repo.list_by_did("bot_a")[0]
+    with pytest.raises(FrozenInstanceError):
+        stored.area = 99  # type: ignore[misc]
+    assert clean_log_repo.list_by_did("bot_a")[0].area is None
+    assert [log["aitypes"] for chunk in clean_log_repo.export("bot_a") for log in chunk] == [["shoe"]]
@@ -1,7 +1,22 @@
+import asyncio
+from collections.abc import Callable, Generator
+import json
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any
+from unittest.mock import patch
+
 import pytest
+from tinydb import TinyDB
 from tinydb.table import Document
 
 from bumper.db import db, helpers
+from bumper.db.bots import BotRepo
+from bumper.db.process_lock import ProcessLock
+from bumper.db.storages import SQLiteStorage, is_sqlite_file
+from bumper.db.worker import db_lock
+from bumper.utils.settings import config as bumper_isc
 
 
 async def test_db_get() -> None:
@@ -56,3 +71,286 @@ def test_logging_message_not_document(caplog: pytest.LogCaptureFixture) -> None:
         value = "some_string"
         helpers.warn_if_not_doc(value, value_name)
         assert f"'{value_name}' is not a TinyDB Document: '<class 'str'>'" in caplog.text
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_db_shared_instance() -> None:
+    assert db.get_db() is db.get_db()
+
+    db.close_db()
+    stats = db.get_db_stats()
+    assert {k: stats[k] for k in ("reads", "writes", "flushes", "dirty_tables")} == {
+        "reads": 0,
+        "writes": 0,
+        "flushes": 0,
+        "dirty_tables": 0,
+    }
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_db_write_behind(test_files: dict[str, Path]) -> None:
+    db.get_db().table(db.TABLE_BOTS).insert({"did": "did_1"})
+
+    # Nothing is written to disk before a flush
+    assert "did_1" not in test_files["db"].read_text()
+    stats = db.get_db_stats()
+    assert stats["writes"] == 1
+    assert stats["flushes"] == 0
+    assert stats["dirty_tables"] == 1
+
+    db.flush_db()
+    assert "did_1" in test_files["db"].read_text()
+    stats = db.get_db_stats()
+    assert stats["flushes"] == 1
+    assert stats["dirty_tables"] == 0
+
+    # Flush without changes does not touch the storage
+    db.flush_db()
+    assert db.get_db_stats()["flushes"] == 1
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_db_close_flushes(test_files: dict[str, Path]) -> None:
+    db.get_db().table(db.TABLE_USERS).insert({"userid": "user_1"})
+    db.close_db()
+    assert "user_1" in test_files["db"].read_text()
+
+    # Reopened instance reads the persisted data
+    assert db.get_db().table(db.TABLE_USERS).get(db.query_instance.userid == "user_1") is not None
+
+
+@pytest.mark.usefixtures("clean_database")
+async def test_db_flush_loop(test_files: dict[str, Path]) -> None:
+    with patch.object(bumper_isc, "DB_FLUSH_INTERVAL", 0.01):
+        task = asyncio.create_task(db.flush_loop())
+        db.get_db().table(db.TABLE_CLIENTS).insert({"userid": "client_1"})
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await task
+    assert "client_1" in test_files["db"].read_text()
+
+
+def _spy_prepare_changes() -> Any:
+    return patch.object(SQLiteStorage, "prepare_changes", autospec=True, side_effect=SQLiteStorage.prepare_changes)
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path: Path) -> Generator[Path]:
+    db_file = tmp_path / "bumper.db"
+    with patch.object(bumper_isc, "DB_ENGINE", "sqlite"), patch.object(bumper_isc, "db_file", str(db_file)):
+        yield db_file
+        db.close_db()
+
+
+def test_db_sqlite_incremental_flush(sqlite_engine: Path) -> None:
+    repo = BotRepo()
+    repo.add("name_1", "did_1", "class_1", "res_1", "co_1")
+    repo.add("name_2", "did_2", "class_2", "res_2", "co_2")
+    db.flush_db()
+
+    with _spy_prepare_changes() as prepare_changes:
+        repo.set_nick("did_2", "nick_2")
+        db.flush_db()
+        prepare_changes.assert_called_once()
+        assert prepare_changes.call_args.args[2] == {db.TABLE_BOTS: {2}}
+
+    db.close_db()
+    assert is_sqlite_file(sqlite_engine)
+    assert BotRepo().get("did_2").nick == "nick_2"
+
+
+@pytest.fixture
+def journal_engine(tmp_path: Path) -> Generator[Path]:
+    db_file = tmp_path / "bumper.json"
+    with patch.object(bumper_isc, "DB_ENGINE", "journal"), patch.object(bumper_isc, "db_file", str(db_file)):
+        yield db_file
+        db.close_db()
+
+
+def test_db_journal_incremental_flush(journal_engine: Path) -> None:
+    repo = BotRepo()
+    repo.add("name_1", "did_1", "class_1", "res_1", "co_1")
+    db.flush_db()
+    repo.set_nick("did_1", "nick_1")
+    db.flush_db()
+
+    journal = Path(f"{journal_engine}.journal")
+    assert journal.read_text().count("\n") == 2
+    db.close_db()
+    assert not journal.exists()
+    assert BotRepo().get("did_1").nick == "nick_1"
+
+
+@pytest.mark.usefixtures("sqlite_engine")
+def test_db_sqlite_foreign_write_marks_table() -> None:
+    db.get_db().table(db.TABLE_USERS).insert({"userid": "user_1"})
+    assert db.get_db_stats()["dirty_tables"] == 1
+
+    with _spy_prepare_changes() as prepare_changes:
+        db.flush_db()
+        assert prepare_changes.call_args.args[2] == {db.TABLE_USERS: None}
+
+    db.close_db()
+    assert db.get_db().table(db.TABLE_USERS).all() == [{"userid": "user_1"}]
+
+
+@pytest.mark.usefixtures("sqlite_engine")
+def test_db_flush_failure_keeps_changes() -> None:
+    db.get_db().table(db.TABLE_USERS).insert({"userid": "user_1"})
+    with (
+        patch.object(SQLiteStorage, "prepare_changes", side_effect=sqlite3.OperationalError("locked")),
+        pytest.raises(sqlite3.OperationalError),
+    ):
+        db.flush_db()
+    assert db.get_db_stats()["dirty_tables"] == 1
+    db.flush_db()
+    assert db.get_db_stats()["dirty_tables"] == 0
+
+
+@pytest.mark.usefixtures("sqlite_engine")
+def test_db_flush_writes_outside_lock() -> None:
+    db.get_db().table(db.TABLE_USERS).insert({"userid": "user_1"})
+    prepare = SQLiteStorage.prepare_changes
+    lock_free: list[bool] = []
+
+    def prepare_changes(storage: SQLiteStorage, data: dict, changes: dict) -> Callable[[], None]:
+        persist = prepare(storage, data, changes)
+
+        def checked_persist() -> None:
+            # Another thread can use the database while the changes are written
+            thread = threading.Thread(target=lambda: lock_free.append(db_lock.acquire(timeout=1) and not db_lock.release()))
+            thread.start()
+            thread.join()
+            persist()
+
+        return checked_persist
+
+    with patch.object(SQLiteStorage, "prepare_changes", autospec=True, side_effect=prepare_changes):
+        db.flush_db()
+    assert lock_free == [True]
+    assert db.get_db_stats()["dirty_tables"] == 0
+
+
+@pytest.mark.usefixtures("sqlite_engine")
+def test_db_write_failure_is_retried() -> None:
+    db.get_db().table(db.TABLE_USERS).insert({"userid": "user_1"})
+    prepare = SQLiteStorage.prepare_changes
+
+    def prepare_changes(storage: SQLiteStorage, data: dict, changes: dict) -> Callable[[], None]:
+        persist = prepare(storage, data, changes)
+        failures = [sqlite3.OperationalError("locked")]
+
+        def flaky_persist() -> None:
+            if failures:
+                raise failures.pop()
+            persist()
+
+        return flaky_persist
+
+    with (
+        patch.object(SQLiteStorage, "prepare_changes", autospec=True, side_effect=prepare_changes),
+        pytest.raises(sqlite3.OperationalError),
+    ):
+        db.flush_db()
+    # Serialized, but not written yet
+    assert db.get_db_stats()["dirty_tables"] == 1
+    assert db.get_db_stats()["flushes"] == 0
+
+    db.flush_db()
+    assert db.get_db_stats()["dirty_tables"] == 0
+    db.close_db()
+    assert db.get_db().table(db.TABLE_USERS).all() == [{"userid": "user_1"}]
+
+
+def test_db_backup(sqlite_engine: Path) -> None:
+    db.get_db().table(db.TABLE_USERS).insert({"userid": "user_1"})
+    backup_file = sqlite_engine.with_suffix(".bak")
+    db.backup_db(str(backup_file))
+    assert is_sqlite_file(backup_file)
+    assert SQLiteStorage(str(backup_file)).read() == {db.TABLE_USERS: {"1": {"userid": "user_1"}}}
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_db_backup_json(tmp_path: Path) -> None:
+    db.get_db().table(db.TABLE_USERS).insert({"userid": "user_1"})
+    backup_file = tmp_path / "backup.json"
+    db.backup_db(str(backup_file))
+    assert "user_1" in backup_file.read_text()
+
+
+def test_db_backup_default_target(tmp_path: Path) -> None:
+    db_file = tmp_path / "bumper.json"
+    with patch.object(bumper_isc, "db_file", str(db_file)):
+        try:
+            db.get_db().table(db.TABLE_USERS).insert({"userid": "user_1"})
+            backup_file = db.backup_db()
+        finally:
+            db.close_db()
+    assert backup_file.startswith(f"{db_file}.bak.")
+    assert json.loads(Path(backup_file).read_text()) == {db.TABLE_USERS: {"1": {"userid": "user_1"}}}
+
+
+def _process_db(path: Path) -> TinyDB:
+    """Open the database like a separate bumper process would."""
+    cache = db.WriteBehindCache(process_lock=ProcessLock(f"{path}.lock"), sync_interval=0)
+    return TinyDB(str(path), storage=cache)
+
+
+def _insert(process: TinyDB, table: str, doc: dict) -> None:
+    """Insert like a repo does, reporting the written document."""
+    process.storage.mark_dirty(table, [process.table(table).insert(doc)])
+
+
+def test_db_multi_process_reload(tmp_path: Path) -> None:
+    path = tmp_path / "bumper.db"
+    first, second = _process_db(path), _process_db(path)
+    _insert(first, "users", {"userid": "user_1"})
+    _insert(first, "bots", {"did": "did_1"})
+    first.storage.flush()
+    assert second.table("users").all() == [{"userid": "user_1"}]
+    users = second.storage.read()["users"]
+
+    first.storage.mark_dirty("bots", first.table("bots").update({"nick": "nick_1"}))
+    first.storage.flush()
+    assert second.table("bots").all() == [{"did": "did_1", "nick": "nick_1"}]
+    # Only the table changed by the other process was replaced
+    assert second.storage.read()["users"] is users
+    assert second.storage.reloads == 1
+    first.close()
+    second.close()
+
+
+def test_db_multi_process_merge_on_flush(tmp_path: Path) -> None:
+    path = tmp_path / "bumper.db"
+    first, second = _process_db(path), _process_db(path)
+    _insert(first, "bots", {"did": "did_1"})
+    first.storage.flush()
+    second.table("bots").all()
+
+    # Both insert a document with id 2, only the first one changes document 1
+    second.storage.sync_interval = 60
+    _insert(first, "bots", {"did": "did_2"})
+    first.storage.mark_dirty("bots", first.table("bots").update({"nick": "nick_1"}, doc_ids=[1]))
+    _insert(second, "bots", {"did": "did_3"})
+    first.storage.flush()
+    second.storage.flush()
+    first.close()
+    second.close()
+
+    third = _process_db(path)
+    assert sorted(third.table("bots").all(), key=lambda doc: doc.doc_id) == [
+        {"did": "did_1", "nick": "nick_1"},
+        {"did": "did_2"},
+        {"did": "did_3"},
+    ]
+    third.close()
+
+
+def test_process_lock_generation(tmp_path: Path) -> None:
+    lock = ProcessLock(str(tmp_path / "bumper.db.lock"))
+    assert lock.generation() == 0
+    with lock.locked():
+        assert lock.bump() == 1
+        assert lock.bump() == 2
+    assert ProcessLock(str(tmp_path / "bumper.db.lock")).generation() == 2
+    lock.close()
@@ -0,0 +1,100 @@
+from bumper.db.index import TableIndex
+
+
+def test_lookup_builds_index() -> None:
+    index = TableIndex(["did"], ["devices"])
+    raw = {"1": {"did": "a", "devices": ["d1", "d2"]}, "2": {"did": "b", "devices": ["d2"]}, "3": {"other": 1}}
+
+    assert "did" in index
+    assert "devices" in index
+    assert "other" not in index
+    assert index.lookup(raw, "did", "a") == {1}
+    assert index.lookup(raw, "devices", "d2") == {1, 2}
+    assert index.lookup(raw, "did", "missing") == set()
+    assert index.lookup(raw, "did", ["unhashable"]) == set()
+    assert index.rebuilds == 1
+
+
+def test_changed_and_removed_incremental() -> None:
+    index = TableIndex(["did"])
+    before = {"1": {"did": "a"}}
+    index.lookup(before, "did", "a")
+
+    after = {"1": {"did": "c"}, "2": {"did": "b"}}
+    index.changed(before, after, [1, 2])
+    assert index.lookup(after, "did", "a") == set()
+    assert index.lookup(after, "did", "c") == {1}
+    assert index.lookup(after, "did", "b") == {2}
+
+    final = {"1": {"did": "c"}}
+    index.removed(after, final, [2])
+    assert index.lookup(final, "did", "b") == set()
+    assert index.rebuilds == 1
+
+
+def test_unreported_write_triggers_rebuild() -> None:
+    index = TableIndex(["did"])
+    raw = {"1": {"did": "a"}}
+    index.lookup(raw, "did", "a")
+
+    # before does not match the indexed table, so the index is marked stale
+    index.changed({}, {"1": {"did": "a"}, "2": {"did": "b"}}, [2])
+    index.removed({}, {}, [2])
+    new_raw = {"1": {"did": "a"}, "2": {"did": "b"}}
+    assert index.lookup(new_raw, "did", "b") == {2}
+    assert index.rebuilds == 2
+
+
+def test_ordered_range_lookup() -> None:
+    index = TableIndex(ordered_fields=["ts"])
+    raw = {
+        "1": {"ts": 30},
+        "2": {"ts": 10},
+        "3": {"ts": "b"},
+        "4": {"ts": 20},
+        "5": {"ts": "a"},
+        "6": {"ts": True},
+        "7": {"other": 1},
+    }
+
+    assert index.lookup_range(raw, "ts", lower=10, upper=30) == [2, 4]
+    assert index.lookup_range(raw, "ts", upper=25) == [2, 4]
+    assert index.lookup_range(raw, "ts", lower=15) == [4, 1]
+    assert index.lookup_range(raw, "ts", lower="") == [5, 3]
+    assert index.lookup_range(raw, "ts", upper="b") == [5]
+    assert index.lookup_range(raw, "ts") == [2, 4, 1, 5, 3]
+    assert index.lookup_range(raw, "ts", lower=0, limit=2) == [2, 4]
+    assert index.lookup_range(raw, "missing") == []
+
+
+def test_ordered_maintained_on_writes() -> None:
+    index = TableIndex(ordered_fields=["ts"])
+    before = {"1": {"ts": 1}, "2": {"ts": 2}}
+    assert index.lookup_range(before, "ts", lower=0) == [1, 2]
+
+    after = {"1": {"ts": 3}, "2": {"ts": 2}, "3": {"ts": 0}}
+    index.changed(before, after, [1, 3])
+    assert index.lookup_range(after, "ts", lower=0) == [3, 2, 1]
+
+    final = {"1": {"ts": 3}, "3": {"ts": 0}}
+    index.removed(after, final, [2])
+    assert index.lookup_range(final, "ts", lower=0) == [3, 1]
+    assert index.rebuilds == 1
+
+
+def test_compound_ordered_iteration() -> None:
+    index = TableIndex(ordered_fields=[("ts", "did")])
+    raw = {
+        "1": {"ts": 20, "did": "a"},
+        "2": {"ts": 10, "did": "b"},
+        "3": {"ts": 20, "did": "b"},
+        "4": {"ts": 30},
+    }
+
+    assert [doc_id for _, doc_id in index.iter_ordered(raw, ("ts", "did"))] == [2, 1, 3]
+    assert [doc_id for _, doc_id in index.iter_ordered(raw, ("ts", "did"), reverse=True)] == [3, 1, 2]
+    cursor = index.key(("ts", "did"), raw["1"])
+    assert [doc_id for _, doc_id in index.iter_ordered(raw, ("ts", "did"), reverse=True, after=cursor)] == [2]
+    assert [doc_id for _, doc_id in index.iter_ordered(raw, ("ts", "did"), after=cursor)] == [3]
+    assert index.count_ordered(raw, ("ts", "did")) == 3
+    assert index.key(("ts", "did"), raw["4"]) is None
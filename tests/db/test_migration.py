@@ -1,8 +1,14 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+
 import pytest
 
-from bumper.db import clean_log_repo as clr, db
-from bumper.db.migration import _migrate_clean_logs_0_2_2_to_0_2_3
+from bumper.db import bot_repo, clean_log_repo as clr, db
+from bumper.db.migration import _migrate_clean_logs_0_2_2_to_0_2_3, migrate_db
+from bumper.db.storages import is_sqlite_file
 from bumper.utils.errors import MigrationError
+from bumper.utils.settings import config as bumper_isc
 
 
 @pytest.mark.usefixtures("clean_database")
@@ -17,7 +23,7 @@ def test_migrate_clean_logs_flattens_nested_list() -> None:
             ],
         },
     )
-    _migrate_clean_logs_0_2_2_to_0_2_3(db.get_db())
+    assert list(_migrate_clean_logs_0_2_2_to_0_2_3(db.get_db())) == [(1, 1)]
 
     # Verify table is flattened
     all_docs = clr.list_by_did("device1")
@@ -32,11 +38,87 @@ def test_migrate_clean_logs_flattens_nested_list() -> None:
 def test_migrate_clean_logs_raises_if_logs_not_list() -> None:
     clr.table.insert({"did": "device1", "logs": "not_a_list"})
     with pytest.raises(MigrationError, match="Invalid clean_logs schema"):
-        _migrate_clean_logs_0_2_2_to_0_2_3(db.get_db())
+        list(_migrate_clean_logs_0_2_2_to_0_2_3(db.get_db()))
 
 
 @pytest.mark.usefixtures("clean_database")
 def test_migrate_clean_logs_raises_if_log_entry_not_dict() -> None:
     clr.table.insert({"did": "device1", "logs": ["not_a_dict"]})
     with pytest.raises(MigrationError, match="Invalid clean_logs entry"):
-        _migrate_clean_logs_0_2_2_to_0_2_3(db.get_db())
+        list(_migrate_clean_logs_0_2_2_to_0_2_3(db.get_db()))
+
+
+def test_migrate_db_converts_json_to_sqlite(tmp_path: Path) -> None:
+    db_file = tmp_path / "bumper.db"
+    db_file.write_text(json.dumps({db.TABLE_BOTS: {"1": {"did": "did_1", "name": "name_1"}}}))
+
+    with patch.object(bumper_isc, "DB_ENGINE", "sqlite"), patch.object(bumper_isc, "db_file", str(db_file)):
+        try:
+            migrate_db()
+            assert is_sqlite_file(db_file)
+            assert [p.name for p in tmp_path.glob("bumper.db.json.bak.*")]
+            db.close_db()
+
+            bot = bot_repo.get("did_1")
+            assert bot is not None
+            assert bot.name == "name_1"
+            assert db.get_db_version() == bumper_isc.APP_VERSION
+        finally:
+            db.close_db()
+
+
+def test_migrate_db_folds_journal(tmp_path: Path) -> None:
+    db_file = tmp_path / "bumper.db"
+    db_file.write_text(json.dumps({db.TABLE_BOTS: {"1": {"did": "did_1", "name": "name_1"}}}))
+    Path(f"{db_file}.journal").write_text(
+        json.dumps({"t": db.TABLE_BOTS, "i": 1, "d": {"did": "did_1", "name": "name_2"}}) + "\n",
+    )
+
+    with patch.object(bumper_isc, "DB_ENGINE", "json"), patch.object(bumper_isc, "db_file", str(db_file)):
+        try:
+            migrate_db()
+            assert not Path(f"{db_file}.journal").exists()
+
+            bot = bot_repo.get("did_1")
+            assert bot is not None
+            assert bot.name == "name_2"
+        finally:
+            db.close_db()
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_migrate_db_resumes_in_batches() -> None:
+    for i in range(5):
+        clr.table.insert({"did": f"device{i}", "logs": [{"clean_log_id": f"device{i}@1", "type": "auto", "ts": 123}]})
+    db.set_db_version("0.2.2")
+
+    with patch("bumper.db.migration.MIGRATION_BATCH_SIZE", 2), patch("bumper.db.migration.backup_db") as backup:
+        steps = _migrate_clean_logs_0_2_2_to_0_2_3(db.get_db())
+        next(steps)
+        # Interrupted after the first batch, the next run only converts the remaining documents
+        assert len([doc for doc in clr.table.all() if "logs" in doc]) == 3
+        flushes = db.get_db_stats()["flushes"]
+        migrate_db()
+        backup.assert_called_once_with()
+        # The JSON file is written once for the whole step and once for the version alignment
+        assert db.get_db_stats()["flushes"] == flushes + 2
+
+    assert db.get_db_version() == bumper_isc.APP_VERSION
+    assert sorted(log.did for log in clr.list_all()) == [f"device{i}" for i in range(5)]
+
+
+def test_migrate_db_sqlite_persists_every_batch(tmp_path: Path) -> None:
+    with patch.object(bumper_isc, "DB_ENGINE", "sqlite"), patch.object(bumper_isc, "db_file", str(tmp_path / "bumper.db")):
+        try:
+            for i in range(5):
+                clr.table.insert({"did": f"device{i}", "logs": [{"clean_log_id": f"device{i}@1", "ts": 123}]})
+            db.set_db_version("0.2.2")
+            db.flush_db()
+
+            with patch("bumper.db.migration.MIGRATION_BATCH_SIZE", 2), patch("bumper.db.migration.backup_db"):
+                flushes = db.get_db_stats()["flushes"]
+                migrate_db()
+            # Three batches, the version bump of the step and the version alignment
+            assert db.get_db_stats()["flushes"] == flushes + 5
+        finally:
+            db.close_db()
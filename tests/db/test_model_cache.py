@@ -0,0 +1,62 @@
+from typing import Any
+
+import pytest
+
+from bumper.db import bot_repo, user_repo
+from bumper.db.model_cache import ModelCache
+
+
+def _decode(doc: dict[str, Any]) -> tuple[str, ...]:
+    return tuple(doc.values())
+
+
+def test_model_cache_hits_and_invalidation() -> None:
+    cache = ModelCache()
+    raw = {"1": {"did": "a"}, "2": {"did": "b"}}
+
+    assert cache.all(raw, _decode) == [("a",), ("b",)]
+    assert cache.get(raw, 1, _decode) is cache.all(raw, _decode)[0]
+    assert cache.get(raw, 3, _decode) is None
+    assert cache.stats() == {"hits": 3, "misses": 2, "size": 2}
+
+    # Reported write only drops the written document
+    after = {"1": {"did": "a"}, "2": {"did": "c"}}
+    cache.changed(raw, after, [2])
+    assert cache.all(after, _decode) == [("a",), ("c",)]
+    assert cache.stats() == {"hits": 4, "misses": 3, "size": 2}
+
+    # Unreported write empties the cache
+    other = {"1": {"did": "x"}}
+    assert cache.all(other, _decode) == [("x",)]
+    assert cache.stats()["misses"] == 4
+    assert cache.all(None, _decode) == []
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_repo_models_cached_until_written() -> None:
+    bot_repo.add("sn_1", "did_1", "class_1", "res_1", "co_1")
+    bot_repo.add("sn_2", "did_2", "class_2", "res_2", "co_2")
+
+    first = bot_repo.list_all()
+    assert bot_repo.list_all()[0] is first[0]
+    assert bot_repo.get("did_1") is first[0]
+
+    bot_repo.set_nick("did_1", "nick_1")
+    bots = {bot.did: bot for bot in bot_repo.list_all()}
+    assert bots["did_1"].nick == "nick_1"
+    assert bots["did_2"] is first[1]
+
+    # Live connection state is applied to a copy, the cached model stays untouched
+    bot_repo.set_mqtt("did_2", True)
+    assert bot_repo.get("did_2").mqtt_connection is True
+    assert first[1].mqtt_connection is False
+
+    bot_repo.remove("did_1")
+    assert [bot.did for bot in bot_repo.list_all()] == ["did_2"]
+    assert bot_repo.get("did_1") is None
+
+    # Writes bypassing the repo are detected as well
+    user_repo.add("user_1")
+    assert user_repo.get_by_id("user_1").bots == ()
+    user_repo.table.update({"bots": ["did_2"]})
+    assert user_repo.get_by_id("user_1").bots == ("did_2",)
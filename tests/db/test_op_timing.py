@@ -0,0 +1,57 @@
+import logging
+from unittest.mock import patch
+
+import pytest
+
+from bumper.db import bot_repo
+from bumper.db.db import get_db_stats
+from bumper.db.op_timing import OpTimings, op_timings
+from bumper.utils.settings import config as bumper_isc
+
+
+def test_op_timings_histogram(caplog: pytest.LogCaptureFixture) -> None:
+    timings = OpTimings()
+    caplog.set_level(logging.DEBUG, logger="bumper.db.op_timing")
+    with patch.object(bumper_isc, "DB_SLOW_OP_MS", 20):
+        for duration_ms in (0.01, 0.3, 0.3, 30, 5000):
+            timings.record("clean_logs/did_1", "_get", int(duration_ms * 1_000_000))
+
+    stats = timings.stats()["clean_logs"]["_get"]
+    assert (stats["count"], stats["slow"], stats["max_ms"]) == (5, 2, 5000.0)
+    assert stats["histogram"] == {"0.05": 1, "0.5": 2, "50": 1, "inf": 1}
+    assert "Slow database operation :: clean_logs._get took 30.0 ms" in caplog.text
+
+    timings.reset()
+    assert timings.stats() == {}
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_repo_operations_timed() -> None:
+    op_timings.reset()
+    bot_repo.add("sn_1", "did_1", "dev_class", "resource", "eco-ng")
+    bot_repo.get("did_1")
+
+    stats = op_timings.stats()["bots"]
+    assert stats["_get"]["count"] >= 1
+    assert stats["_upsert"]["count"] == 1
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_repo_reads_counted_once() -> None:
+    bot_repo.add("sn_1", "did_1", "dev_class", "resource", "eco-ng")
+    bot_repo.add("sn_2", "did_2", "dev_class", "resource", "eco-ng")
+    op_timings.reset()
+
+    # A model lookup runs a document lookup, both are timed but counted as a single read
+    bot_repo.get("did_1")
+    assert op_timings.reads == 1
+    assert get_db_stats()["reads"] == 1
+    bot_repo.list_all()
+    assert op_timings.reads == 2
+
+    bot_repo.update_many({"nick": "robot"})
+    bot_repo.remove("did_2")
+    stats = op_timings.stats()["bots"]
+    assert stats["update_many"]["count"] == 1
+    assert stats["_remove_ids"]["count"] == 1
+    assert op_timings.reads == 2
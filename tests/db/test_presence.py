@@ -0,0 +1,76 @@
+import pytest
+
+from bumper.db import bot_repo, client_repo, presence
+from bumper.db.presence import PresenceRegistry
+from bumper.web.utils.models import VacBotClient, VacBotDevice
+
+
+def test_presence_counters() -> None:
+    registry = PresenceRegistry()
+    assert registry.get("bot", "did_1") is None
+
+    registry.set("bot", "did_1", "mqtt", True)
+    registry.set("bot", "did_1", "mqtt", True)  # no change, not counted
+    registry.set("bot", "did_1", "xmpp", True)
+    registry.set("bot", "did_1", "mqtt", False)
+    registry.set("client", "user_1", "mqtt", True)
+
+    state = registry.get("bot", "did_1")
+    assert state is not None
+    assert (state.mqtt, state.xmpp, state.connects, state.disconnects) == (False, True, 2, 1)
+    assert state.since is not None
+    assert registry.online("bot") == ["did_1"]
+    assert registry.stats() == {"bots_online": 1, "clients_online": 1, "connects": 3, "disconnects": 1, "pending": 2}
+
+    registry.reset("bot")
+    assert registry.get("bot", "did_1") is None
+    assert registry.online("client") == ["user_1"]
+
+
+def test_presence_apply() -> None:
+    registry = PresenceRegistry()
+    bot = VacBotDevice(did="did_1")
+    assert registry.apply("bot", "did_1", bot) is bot  # unknown, model returned as is
+
+    registry.set("bot", "did_1", "xmpp", True)
+    applied = registry.apply("bot", "did_1", bot)
+    assert (applied.mqtt_connection, applied.xmpp_connection) == (False, True)
+    assert bot.xmpp_connection is False  # changed copy
+
+    registry.set("client", "user_1", "mqtt", True)
+    assert registry.apply("client", "user_1", VacBotClient(userid="user_1")).mqtt_connection is True
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_presence_kept_in_memory_until_snapshot() -> None:
+    bot_repo.add("sn_1", "did_1", "class_1", "res_1", "co_1")
+    bot_repo.add("sn_2", "did_2", "class_2", "res_2", "co_2")
+    client_repo.add("bumper", "user_1", "realm_1", "res_1")
+
+    bot_repo.set_mqtt("did_1", True)
+    bot_repo.set_xmpp("did_2", True)
+    bot_repo.set_mqtt("did_unknown", True)
+    client_repo.set_mqtt("user_1", True)
+    client_repo.set_mqtt("user_unknown", True)
+
+    # Connection states of bots and clients missing in the database are not tracked
+    assert presence.get("bot", "did_unknown") is None
+    assert presence.get("client", "user_unknown") is None
+
+    # Readers see the live state, the database is untouched
+    assert {bot.did: (bot.mqtt_connection, bot.xmpp_connection) for bot in bot_repo.list_all()} == {
+        "did_1": (True, False),
+        "did_2": (False, True),
+    }
+    assert client_repo.get("user_1").mqtt_connection is True
+    assert not any(doc["mqtt_connection"] or doc["xmpp_connection"] for doc in bot_repo.table.all())
+
+    assert bot_repo.save_presence() == 2
+    assert client_repo.save_presence() == 1
+    assert bot_repo.save_presence() == 0
+    assert {doc["did"]: (doc["mqtt_connection"], doc["xmpp_connection"]) for doc in bot_repo.table.all()} == {
+        "did_1": (True, False),
+        "did_2": (False, True),
+    }
+    assert client_repo.table.get(doc_id=1)["mqtt_connection"] is True
+    assert presence.stats()["pending"] == 0
@@ -0,0 +1,137 @@
+import json
+from pathlib import Path
+import sqlite3
+
+from bumper.db.storages import JournalStorage, SQLiteStorage, fold_journal, is_sqlite_file
+
+
+def _rows(path: Path) -> list[tuple[str, int, str]]:
+    with sqlite3.connect(path) as conn:
+        return list(conn.execute("SELECT tbl, doc_id, data FROM documents ORDER BY tbl, doc_id"))
+
+
+def test_sqlite_storage_read_write(tmp_path: Path) -> None:
+    path = tmp_path / "test.db"
+    storage = SQLiteStorage(str(path))
+    assert storage.read() is None
+    assert is_sqlite_file(path)
+
+    storage.write({"bots": {"1": {"did": "a"}, "2": {"did": "b"}}, "users": {"1": {"userid": "u"}}})
+    assert storage.read() == {"bots": {"1": {"did": "a"}, "2": {"did": "b"}}, "users": {"1": {"userid": "u"}}}
+
+    storage.write({"bots": {"3": {"did": "c"}}})
+    assert storage.read() == {"bots": {"3": {"did": "c"}}}
+    storage.close()
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sqlite_storage_write_changes(tmp_path: Path) -> None:
+    path = tmp_path / "test.db"
+    storage = SQLiteStorage(str(path))
+    storage.write({"bots": {"1": {"did": "a"}, "2": {"did": "b"}}, "users": {"1": {"userid": "u"}}})
+
+    # Only doc 1 changed and doc 2 was removed, users table was dropped
+    data = {"bots": {"1": {"did": "x"}, "3": {"did": "c"}}}
+    storage.write_changes(data, {"bots": {1, 2}, "users": None})
+    # doc 3 was not reported, so it is not persisted
+    assert _rows(path) == [("bots", 1, '{"did":"x"}')]
+
+    storage.write_changes(data, {"bots": None})
+    assert storage.read() == data
+    storage.close()
+
+
+def test_sqlite_storage_backup(tmp_path: Path) -> None:
+    storage = SQLiteStorage(str(tmp_path / "test.db"))
+    storage.write({"bots": {"1": {"did": "a"}}})
+    storage.backup(str(tmp_path / "backup.db"))
+    storage.close()
+
+    assert _rows(tmp_path / "backup.db") == [("bots", 1, '{"did":"a"}')]
+
+
+def test_is_sqlite_file(tmp_path: Path) -> None:
+    json_file = tmp_path / "test.json"
+    json_file.write_text("{}")
+    assert is_sqlite_file(json_file) is False
+    assert is_sqlite_file(tmp_path / "missing.db") is False
+
+
+def _journal(path: Path) -> list[dict]:
+    return [json.loads(line) for line in Path(f"{path}.journal").read_text().splitlines()]
+
+
+def test_journal_storage_write_changes(tmp_path: Path) -> None:
+    path = tmp_path / "bumper.json"
+    storage = JournalStorage(str(path))
+    assert storage.read() is None
+    storage.write({"bots": {"1": {"did": "a"}, "2": {"did": "b"}}, "users": {"1": {"userid": "u"}}})
+    assert json.loads(path.read_text()) == {"bots": {"1": {"did": "a"}, "2": {"did": "b"}}, "users": {"1": {"userid": "u"}}}
+
+    data = {"bots": {"1": {"did": "x"}, "3": {"did": "c"}}}
+    storage.write_changes(data, {"bots": {1, 2}, "users": None})
+    assert _journal(path) == [{"t": "bots", "i": 1, "d": {"did": "x"}}, {"t": "bots", "i": 2}, {"t": "users", "d": None}]
+    # The snapshot is left untouched until compaction
+    assert json.loads(path.read_text())["users"] == {"1": {"userid": "u"}}
+    assert JournalStorage(str(path)).read() == {"bots": {"1": {"did": "x"}}}
+
+    storage.close()
+    assert not Path(f"{path}.journal").exists()
+    assert json.loads(path.read_text()) == data
+
+
+def test_journal_storage_torn_record(tmp_path: Path) -> None:
+    path = tmp_path / "bumper.json"
+    storage = JournalStorage(str(path))
+    storage.write({"bots": {"1": {"did": "a"}}})
+    storage.write_changes({"bots": {"1": {"did": "b"}}}, {"bots": {1}})
+    journal = Path(f"{path}.journal")
+    valid = journal.read_bytes()
+    with journal.open("ab") as file:
+        file.write(b'{"t":"bots","i":1,"d":{"did"')
+
+    storage = JournalStorage(str(path))
+    assert storage.read() == {"bots": {"1": {"did": "b"}}}
+    assert storage.records == 1
+    assert journal.read_bytes() == valid
+
+
+def test_journal_storage_compaction(tmp_path: Path) -> None:
+    path = tmp_path / "bumper.json"
+    storage = JournalStorage(str(path), compact_records=2)
+    storage.write({})
+    storage.write_changes({"bots": {"1": {"did": "a"}}}, {"bots": {1}})
+    storage.write_changes({"bots": {"1": {"did": "a"}, "2": {"did": "b"}}}, {"bots": {2}})
+    assert storage.records == 2
+    assert storage.compactions == 1
+
+    storage.write_changes({"bots": {"1": {"did": "a"}, "2": {"did": "b"}, "3": {"did": "c"}}}, {"bots": {3}})
+    assert storage.records == 0
+    assert storage.compactions == 2
+    assert not Path(f"{path}.journal").exists()
+    assert json.loads(path.read_text()) == {"bots": {"1": {"did": "a"}, "2": {"did": "b"}, "3": {"did": "c"}}}
+
+
+def test_journal_storage_backup(tmp_path: Path) -> None:
+    path = tmp_path / "bumper.json"
+    storage = JournalStorage(str(path))
+    storage.write({"bots": {"1": {"did": "a"}}})
+    storage.write_changes({"bots": {"1": {"did": "a"}, "2": {"did": "b"}}}, {"bots": {2}})
+    storage.backup(str(tmp_path / "backup.json"))
+
+    assert json.loads((tmp_path / "backup.json").read_text()) == {"bots": {"1": {"did": "a"}, "2": {"did": "b"}}}
+    assert Path(f"{path}.journal").exists()
+
+
+def test_fold_journal(tmp_path: Path) -> None:
+    path = tmp_path / "bumper.json"
+    assert fold_journal(str(path)) is False
+
+    storage = JournalStorage(str(path))
+    storage.write({"bots": {"1": {"did": "a"}}})
+    storage.write_changes({"bots": {}}, {"bots": {1}})
+    assert fold_journal(str(path)) is True
+    assert not Path(f"{path}.journal").exists()
+    assert json.loads(path.read_text()) == {"bots": {}}
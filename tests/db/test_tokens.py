@@ -1,8 +1,10 @@
+from datetime import datetime, timedelta
 from typing import TYPE_CHECKING, Any
 
 import pytest
 
 from bumper.db import token_repo
+from bumper.utils.settings import config as bumper_isc
 
 if TYPE_CHECKING:
     from collections.abc import Callable
@@ -22,3 +24,20 @@ def test_token_negative_cases(method_name: str, args: list[Any], expected: Any)
     method: Callable[..., Any] = getattr(token_repo, method_name)
     result = method(*args)
     assert result == expected
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_token_revoke_expired_only_touches_expired() -> None:
+    now = datetime.now(tz=bumper_isc.LOCAL_TIMEZONE)
+    assert token_repo.next_expiration() is None
+    for i, offset in enumerate((-20, 30, -10, 60)):
+        token_repo.table.insert(
+            {"userid": f"user_{i}", "token": f"token_{i}", "expiration": (now + timedelta(seconds=offset)).isoformat()},
+        )
+    token_repo.table.insert({"userid": "user_x", "token": "token_x"})
+
+    assert token_repo.next_expiration() == now + timedelta(seconds=-20)
+    token_repo.revoke_expired()
+
+    assert sorted(r["token"] for r in token_repo._all()) == ["token_1", "token_3", "token_x"]
+    assert token_repo.next_expiration() == now + timedelta(seconds=30)
@@ -1,17 +1,16 @@
+from dataclasses import FrozenInstanceError
 from datetime import datetime, timedelta
-from pathlib import Path
 
 import pytest
-from tinydb import TinyDB
 
 from bumper.db import token_repo, user_repo
-from bumper.db.db import query_instance
+from bumper.db.db import get_db, get_db_stats, query_instance
 from bumper.utils.settings import config as bumper_isc
 from bumper.web.utils.models import BumperUser
 
 
 @pytest.mark.usefixtures("clean_database")
-def test_user_db(test_files: dict[str, Path()]) -> None:
+def test_user_db() -> None:
     user_repo.add("new_testuser")
     assert user_repo.get_by_id("new_testuser").userid == "new_testuser"
 
@@ -73,7 +72,7 @@ def test_user_db(test_files: dict[str, Path()]) -> None:
     user_repo._upsert(new_user.as_dict(), query_instance.userid == new_user.userid)
     assert user_repo.get_by_id("new_testuser").userid == "new_testuser"
 
-    db_test = TinyDB(str(test_files["db"]))
+    db_test = get_db()
     tokens = db_test.table("tokens")
     tokens.insert(
         {
@@ -82,14 +81,13 @@ def test_user_db(test_files: dict[str, Path()]) -> None:
             "expiration": f"{datetime.now(tz=bumper_isc.LOCAL_TIMEZONE) + timedelta(seconds=-10)}",
         },
     )  # Add expired token
-    db_test.close()
     assert len(token_repo.list_for_user("testuser")) == 1  # Test 1 tokens are available
     assert token_repo.get_first("testuser")
     token_repo.revoke_user_expired("testuser")  # Revoke expired tokens
     assert len(token_repo.list_for_user("testuser")) == 0  # Test 0 tokens are available
     assert token_repo.get_first("testuser") is None
 
-    db_test = TinyDB(str(test_files["db"]))
+    db_test = get_db()
     tokens = db_test.table("tokens")
     tokens.insert(
         {
@@ -98,7 +96,6 @@ def test_user_db(test_files: dict[str, Path()]) -> None:
             "expiration": f"{datetime.now(tz=bumper_isc.LOCAL_TIMEZONE) + timedelta(seconds=-10)}",
         },
     )  # Add expired token
-    db_test.close()
     assert len(token_repo.list_for_user("testuser")) == 1  # Test 1 tokens are available
     assert token_repo.get_first("testuser")
     token_repo.revoke_expired()  # Revoke expired tokens
@@ -145,3 +142,40 @@ def test_user_repo_extras() -> None:
     # Test remove
     user_repo.remove(user_id)
     assert user_repo.get_by_id(user_id) is None
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_user_add_bots() -> None:
+    user_repo.add("testuser")
+    user_repo.add_bot("testuser", "bot_1")
+    user_repo.add_bots("testuser", ["bot_1", "bot_2", "bot_3"])
+    assert user_repo.get_by_id("testuser").bots == ("bot_1", "bot_2", "bot_3")
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_user_add_to_user_single_write() -> None:
+    user_repo.add("testuser")
+    writes = get_db_stats()["writes"]
+    user_repo.add_to_user("testuser", devices=["dev_1"], bots=["bot_1", "bot_2"], home_ids=["home_1"])
+    user_repo.add_to_user("testuser", devices=["dev_1"], bots=["bot_2"])
+    assert get_db_stats()["writes"] == writes + 1
+
+    user = user_repo.get_by_id("testuser")
+    assert user.devices == ("dev_1",)
+    assert user.bots == ("bot_1", "bot_2")
+    assert "home_1" in user.homeids
+
+
+@pytest.mark.usefixtures("clean_database")
+def test_user_lists_not_shared_with_db() -> None:
+    user_repo.add("testuser")
+    user_repo.add_bots("testuser", ["bot_1"])
+    user = user_repo.get_by_id("testuser")
+    with pytest.raises(AttributeError):
+        user.bots.append("bot_2")  # type: ignore[attr-defined]
+    with pytest.raises(FrozenInstanceError):
+        user.devices = ("dev_1",)  # type: ignore[misc]
+    assert user_repo.get_by_id("testuser") == BumperUser(userid="testuser", homeids=user.homeids, bots=("bot_1",))
+    doc = user_repo.table.get(query_instance.userid == "testuser")
+    assert doc["bots"] == ["bot_1"]
+    assert doc["devices"] == []
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+
+from bumper.db import async_bot_repo, bot_repo
+from bumper.db.worker import AsyncRepo, DBWorker, async_method, db_lock, run_in_db
+
+
+async def test_worker_runs_jobs_on_own_thread() -> None:
+    worker = DBWorker()
+    try:
+        name = await worker.run(lambda: threading.current_thread().name)
+        assert name.startswith("bumper-db")
+        assert await worker.run(db_lock._is_owned) is True  # type: ignore[attr-defined]
+        assert worker.stats()["jobs"] == 2
+    finally:
+        worker.shutdown()
+
+
+async def test_worker_keeps_submission_order() -> None:
+    worker = DBWorker()
+    order: list[int] = []
+    for i in range(20):
+        worker.post(order.append, i)
+    await worker.run(lambda: None)
+    worker.shutdown()
+    assert order == list(range(20))
+    assert worker.stats()["queued"] == 0
+
+
+async def test_worker_failures(caplog: pytest.LogCaptureFixture) -> None:
+    worker = DBWorker()
+
+    def fail() -> None:
+        msg = "boom"
+        raise ValueError(msg)
+
+    with pytest.raises(ValueError, match="boom"):
+        await worker.run(fail)
+    worker.post(fail)
+    worker.shutdown()
+
+    assert worker.stats()["failed"] == 2
+    assert "Database job failed" in caplog.text
+
+
+@pytest.mark.usefixtures("clean_database")
+async def test_async_repo() -> None:
+    await async_bot_repo.add("sn_1", "did_1", "class_1", "res_1", "co_1")
+    bot = await async_bot_repo.get("did_1")
+    assert bot is not None
+    assert bot.name == "sn_1"
+    assert bot_repo.get("did_1").as_dict() == bot.as_dict()
+
+    with pytest.raises(AttributeError):
+        _ = async_bot_repo.unknown  # type: ignore[attr-defined]
+
+
+async def test_async_repo_resolves_method_per_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    class Repo:
+        def get(self) -> str:
+            return "original"
+
+    class AsyncTestRepo(AsyncRepo[Repo]):
+        get = async_method(Repo.get)
+
+    repo = Repo()
+    async_repo = AsyncTestRepo(repo)
+    get = async_repo.get
+    monkeypatch.setattr(repo, "get", lambda: "patched")
+    assert await get() == "patched"
+
+
+async def test_run_in_db_concurrent_callers() -> None:
+    results = await asyncio.gather(*(run_in_db(pow, i, 2) for i in range(10)))
+    assert results == [i * i for i in range(10)]
@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from bumper.mqtt.bot_state import BotStateCache
+
+BATTERY = '{"header":{"pri":1,"ts":1699297517},"body":{"data":{"value":80,"isLow":0}}}'
+
+
+def test_bot_state_cache() -> None:
+    cache = BotStateCache()
+    assert cache.update("did_1", "onBattery", BATTERY)
+    assert not cache.update("did_1", "Battery", BATTERY)
+    assert not cache.update("did_1", "onBattery", "<ctl td='Battery'/>")
+    assert not cache.update("did_1", "onError", '{"body":{}}')
+
+    assert cache.response("did_1", "getBattery", 10) == {
+        "header": {"pri": 1, "ts": 1699297517},
+        "body": {"code": 0, "msg": "ok", "data": {"value": 80, "isLow": 0}},
+    }
+    assert cache.response("did_2", "getBattery", 10) is None
+    assert cache.response("did_1", "setBattery", 10) is None
+
+    with patch("bumper.mqtt.bot_state.time.monotonic", return_value=1e12):
+        assert cache.response("did_1", "getBattery", 10) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "bots": 1}
+
+
+def test_bot_state_cache_known_states_only() -> None:
+    cache = BotStateCache()
+    stats = '{"body":{"data":{"area":12,"time":600}}}'
+    # Stats broadcasts differ from the getStats response, so they never answer it
+    assert not cache.update("did_1", "onStats", stats)
+    assert not cache.update("did_1", "reportStats", stats)
+    assert not cache.update("did_1", "onPos", '{"body":{"data":{"deebotPos":{"x":1}}}}')
+    assert cache.response("did_1", "getStats", 10) is None
+    assert cache.response("did_1", "getPos", 10) is None
+
+    assert cache.update("did_1", "onChargeState", '{"body":{"data":{"isCharging":1}}}')
+    assert cache.update("did_1", "onCleanInfo_V2", '{"body":{"data":{"state":"idle"}}}')
+    assert cache.response("did_1", "getChargeState", 10) == {
+        "header": {},
+        "body": {"code": 0, "msg": "ok", "data": {"isCharging": 1}},
+    }
+    assert cache.response("did_1", "getCleanInfo", 10) is None
+    assert cache.response("did_1", "getCleanInfo_V2", 10) is not None
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from bumper.mqtt.command_queue import PRIORITY_CONTROL, PRIORITY_POLL, BotCommandQueue, CommandScheduler, command_priority
+from bumper.utils.errors import CommandQueueFullError
+
+
+def test_command_priority() -> None:
+    assert command_priority("getBattery") == PRIORITY_POLL
+    assert command_priority("GetWKVer") == PRIORITY_POLL
+    assert command_priority("clean") == PRIORITY_CONTROL
+    assert command_priority(None) == PRIORITY_CONTROL
+
+
+async def test_bot_command_queue_priority() -> None:
+    queue = BotCommandQueue(max_in_flight=1, max_queued=3)
+    await queue.acquire(PRIORITY_POLL)
+    order: list[str] = []
+
+    async def send(name: str, priority: int) -> None:
+        await queue.acquire(priority)
+        order.append(name)
+        queue.release()
+
+    tasks = [asyncio.create_task(send(name, priority)) for name, priority in [("poll_1", 1), ("poll_2", 1), ("clean", 0)]]
+    await asyncio.sleep(0)
+    assert queue.queued == 3
+    with pytest.raises(CommandQueueFullError):
+        await queue.acquire(PRIORITY_CONTROL)
+
+    queue.release()
+    await asyncio.gather(*tasks)
+    assert order == ["clean", "poll_1", "poll_2"]
+    assert queue.idle
+
+
+async def test_command_scheduler_cancel() -> None:
+    scheduler = CommandScheduler()
+    await scheduler.acquire("did_1", PRIORITY_CONTROL, 1, 1)
+    waiting = asyncio.create_task(scheduler.acquire("did_1", PRIORITY_POLL, 1, 1))
+    await asyncio.sleep(0)
+    with pytest.raises(CommandQueueFullError):
+        await scheduler.acquire("did_1", PRIORITY_POLL, 1, 1)
+    assert scheduler.stats() == {"bots": 1, "in_flight": 1, "queued": 1, "rejected": 1}
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    scheduler.release("did_1")
+    assert scheduler.stats() == {"bots": 0, "in_flight": 0, "queued": 0, "rejected": 1}
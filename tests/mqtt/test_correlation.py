@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from bumper.mqtt.correlation import CommandRegistry, next_request_id
+
+
+def test_next_request_id_unique() -> None:
+    ids = {next_request_id() for _ in range(100_000)}
+    assert len(ids) == 100_000
+
+
+async def test_command_registry() -> None:
+    registry = CommandRegistry()
+    responses = [registry.register(f"id_{i}", 10) for i in range(10_000)]
+    assert len(registry) == 10_000
+    with pytest.raises(ValueError, match="already in flight"):
+        registry.register("id_0", 10)
+
+    assert registry.resolve("id_1", "ok")
+    assert await responses[1] == "ok"
+    assert not registry.resolve("id_1", "again")
+
+    registry.discard("id_2")
+    assert responses[2].cancelled()
+
+    expiring = registry.register("short", 0.01)
+    with pytest.raises(TimeoutError):
+        await expiring
+    await asyncio.sleep(0)
+
+    assert registry.stats() == {"in_flight": 9_998, "registered": 10_001, "completed": 1, "timed_out": 1, "orphaned": 1}
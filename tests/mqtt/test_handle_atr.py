@@ -40,12 +40,12 @@ from bumper.utils.utils import to_int
         ),
     ],
 )
-def test_clean_log(payload: dict[str, Any], expected: int) -> None:
+async def test_clean_log(payload: dict[str, Any], expected: int) -> None:
     did = "test_device"
     rid = "test_rid"
 
     assert len(clean_log_repo.list_by_did(did)) == 0
-    clean_log(did, rid, json.dumps(payload))
+    await clean_log(did, rid, json.dumps(payload))
     saved_logs = clean_log_repo.list_by_did(did)
     assert len(saved_logs) == expected
 
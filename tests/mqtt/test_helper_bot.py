@@ -1,12 +1,13 @@
 import asyncio
 import json
-import time
+from unittest.mock import patch
 
 from aiomqtt import Client
 import pytest
 from testfixtures import LogCapture
 
 from bumper.mqtt.helper_bot import MQTTCommandModel, MQTTHelperBot
+from bumper.utils.settings import config as bumper_isc
 from tests import HOST, MQTT_PORT
 
 
@@ -263,28 +264,21 @@ async def test_helperbot_message(mqtt_client: Client) -> None:
 
 
 async def test_helperbot_expire_message(mqtt_client: Client, helper_bot: MQTTHelperBot) -> None:
-    expire_msg_payload = '{"ret":"ok","ver":"0.13.5"}'
-    expire_msg_topic_name = "iot/p2p/GetWKVer/bot_serial/ls1ok3/wC3g/helperbot/bumper/helperbot/p/testgood/j"
-    currenttime = time.time()
-    request_id = "ABC"
-    data = {
-        "time": currenttime,
-        "topic": expire_msg_topic_name,
-        "payload": expire_msg_payload,
-    }
+    response = helper_bot._commands.register("ABC", 0.1)
+    assert "ABC" in helper_bot._commands
 
-    helper_bot._commands[request_id] = data
+    await asyncio.sleep(0.1 * 2)
 
-    assert helper_bot._commands[request_id] == data
+    assert "ABC" not in helper_bot._commands
+    with pytest.raises(TimeoutError):
+        response.result()
 
+    # A late response is counted as orphaned
+    msg_topic_name = "iot/p2p/GetWKVer/bot_serial/ls1ok3/wC3g/helperbot/bumper/helperbot/p/ABC/j"
+    await mqtt_client.publish(msg_topic_name, b'{"ret":"ok"}')
     await asyncio.sleep(0.1)
-    msg_payload = "<ctl ts='1547822804960' td='DustCaseST' st='0'/>"
-    msg_topic_name = "iot/atr/DustCaseST/bot_serial/ls1ok3/wC3g/x"
-    await mqtt_client.publish(msg_topic_name, msg_payload.encode())  # Send another message to force get_msg
-
-    await asyncio.sleep(0.1 * 2)
-
-    assert helper_bot._commands.get(request_id, None) is None
+    stats = helper_bot.command_stats()
+    assert (stats["in_flight"], stats["timed_out"], stats["orphaned"]) == (0, 1, 1)
 
 
 async def test_helperbot_send_command(mqtt_client: Client, helper_bot: MQTTHelperBot) -> None:
@@ -586,3 +580,94 @@ async def test_helperbot_send_command_p2p_charge(mqtt_client: Client, helper_bot
     assert json_resp["ret"] == "ok"
     assert json_resp["data"]["charge"]["ret"] == "ok"
     assert json_resp["data"]["charge"]["did"] == "did_charge_cmd"
+
+
+async def test_helperbot_send_commands(mqtt_client: Client, helper_bot: MQTTHelperBot) -> None:
+    cmds = [
+        MQTTCommandModel({"cmd": cmd, "did": "did_batch", "mid": "ls1ok3", "res": "res_batch", "data": {}}, version="p2p")
+        for cmd in ("getBattery", "getChargeState", "getStats")
+    ]
+
+    async def answer() -> None:
+        # Answer once the first two commands are in flight, however slow the test machine is
+        for _ in range(100):
+            if len(helper_bot._commands) >= 2:
+                break
+            await asyncio.sleep(0.005)
+        for cmd in cmds[:2]:
+            topic = f"iot/p2p/{cmd.cmd_name}/did_batch/ls1ok3/res_batch/helperbot/bumper/helperbot/p/{cmd.request_id}/j"
+            await mqtt_client.publish(topic, json.dumps({"body": {"data": {"cmd": cmd.cmd_name}}}).encode())
+
+    answering = asyncio.create_task(answer())
+    start = asyncio.get_running_loop().time()
+    with patch.object(bumper_isc, "HELPER_BOT_MAX_COMMANDS_PER_BOT", 2):
+        results = await helper_bot.send_commands(cmds, max_wait=0.5)
+    await answering
+
+    # The unanswered command does not delay the batch beyond the shared deadline
+    assert asyncio.get_running_loop().time() - start < 1
+    assert results == [{"body": {"data": {"cmd": "getBattery"}}}, {"body": {"data": {"cmd": "getChargeState"}}}, None]
+    assert helper_bot._scheduler.stats()["bots"] == 0
+    assert await helper_bot.send_commands([]) == []
+
+
+async def test_helperbot_coalesce_commands(mqtt_client: Client, helper_bot: MQTTHelperBot) -> None:
+    def battery() -> MQTTCommandModel:
+        cmdjson = {"cmd": "getBattery", "did": "did_poll", "mid": "ls1ok3", "res": "res_poll", "data": {}}
+        return MQTTCommandModel(cmdjson, version=MQTTCommandModel.VERSION_P2P)
+
+    first, second = battery(), battery()
+    tasks = [asyncio.create_task(helper_bot.send_command_plain(cmd, 0.5)) for cmd in (first, second)]
+    await asyncio.sleep(0.02)
+    topic = f"iot/p2p/getBattery/did_poll/ls1ok3/res_poll/helperbot/bumper/helperbot/p/{first.request_id}/j"
+    await mqtt_client.publish(topic, b'{"body": {"data": {"value": 80}}}')
+
+    assert await asyncio.gather(*tasks) == [{"body": {"data": {"value": 80}}}] * 2
+    # Within the window the response is shared without publishing the command again
+    assert await helper_bot.send_command_plain(battery()) == {"body": {"data": {"value": 80}}}
+    stats = helper_bot.command_stats()
+    assert (stats["registered"], stats["coalesced"], stats["coalesce_hit_rate"]) == (1, 2, 0.667)
+
+    with patch.object(bumper_isc, "HELPER_BOT_COALESCE_WINDOW", 0):
+        assert await helper_bot.send_command_plain(battery()) is None
+    assert helper_bot.command_stats()["registered"] == 2
+
+
+async def test_helperbot_answers_from_broadcast(mqtt_client: Client, helper_bot: MQTTHelperBot) -> None:
+    await mqtt_client.publish("iot/atr/onBattery/did_atr/ls1ok3/res_atr/j", b'{"body": {"data": {"value": 55}}}')
+    await asyncio.sleep(0.1)
+
+    def command(data: dict) -> MQTTCommandModel:
+        cmdjson = {"cmd": "getBattery", "did": "did_atr", "mid": "ls1ok3", "res": "res_atr", "data": data}
+        return MQTTCommandModel(cmdjson, version=MQTTCommandModel.VERSION_P2P)
+
+    result = await helper_bot.send_command_plain(command({"td": "getBattery"}))
+    assert result == {"header": {}, "body": {"code": 0, "msg": "ok", "data": {"value": 55}}}
+    assert helper_bot.command_stats()["registered"] == 0
+
+    # Commands with arguments and a disabled cache ask the bot
+    assert await helper_bot.send_command_plain(command({"type": "full"})) is None
+    with patch.object(bumper_isc, "HELPER_BOT_STATE_MAX_AGE", 0):
+        assert await helper_bot.send_command_plain(command({})) is None
+    assert helper_bot.command_stats()["registered"] == 2
+
+
+@pytest.mark.usefixtures("mqtt_client")
+async def test_helperbot_rejects_when_bot_queue_full(helper_bot: MQTTHelperBot) -> None:
+    def clean() -> MQTTCommandModel:
+        cmdjson = {"cmd": "clean", "did": "did_busy", "mid": "ls1ok3", "res": "res_busy", "data": {"act": "s"}}
+        return MQTTCommandModel(cmdjson, version=MQTTCommandModel.VERSION_P2P)
+
+    with (
+        patch.object(bumper_isc, "HELPER_BOT_MAX_COMMANDS_PER_BOT", 1),
+        patch.object(bumper_isc, "HELPER_BOT_MAX_QUEUED_PER_BOT", 1),
+    ):
+        busy = [asyncio.create_task(helper_bot.send_command_plain(clean())) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        cmd = clean()
+        resp = await helper_bot.send_command(cmd)
+        assert json.loads(resp.body.decode("utf-8"))["debug"] == "Command queue of bot is full (1 waiting)"
+        assert await asyncio.gather(*busy) == [None, None]
+
+    stats = helper_bot.command_stats()
+    assert (stats["queued"], stats["rejected"]) == (0, 1)
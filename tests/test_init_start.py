@@ -4,6 +4,7 @@ Also verifies the __main__ entrypoint runs without side effects.
 """
 
 import asyncio
+from datetime import datetime, timedelta
 import runpy
 import sys
 from unittest import mock
@@ -105,3 +106,11 @@ def test_main_entrypoint(mock_shutdown: mock.MagicMock, mock_start: mock.MagicMo
 
         mock_start.assert_not_called()
         mock_shutdown.assert_called_once()
+
+
+def test_maintenance_delay() -> None:
+    now = datetime.now(tz=bumper_isc.LOCAL_TIMEZONE)
+    assert bumper._maintenance_delay(None) == bumper.MAINTENANCE_INTERVAL_MAX
+    assert bumper._maintenance_delay(now - timedelta(seconds=5)) == bumper.MAINTENANCE_INTERVAL_MIN
+    assert bumper._maintenance_delay(now + timedelta(hours=1)) == bumper.MAINTENANCE_INTERVAL_MAX
+    assert 10 < bumper._maintenance_delay(now + timedelta(seconds=15)) <= 15
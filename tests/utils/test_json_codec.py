@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta, timezone
+from enum import Enum
+from pathlib import Path
+from uuid import UUID
+
+import pytest
+
+from bumper.db.storages import CodecJSONStorage
+from bumper.utils import json_codec
+from bumper.utils.json_codec import JSONCodec
+
+
+@pytest.mark.parametrize("codec", json_codec.available_codecs(), ids=lambda c: c.name)
+def test_codec_roundtrip(codec: JSONCodec) -> None:
+    data = {"did": "ä-1", "n": 1, "f": 1.5, "l": [True, None], "big": 2**70}
+    encoded = codec.dumpb(data)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == data
+    assert codec.loads(codec.dumps(data)) == data
+    assert codec.dumps({"a": 1}) == '{"a":1}'
+
+
+def test_codec_prefers_installed_backend() -> None:
+    codecs = json_codec.available_codecs()
+    assert codecs[-1] is json_codec.STDLIB
+    assert json_codec.codec.name == codecs[0].name
+
+
+def test_codec_json_storage(tmp_path: Path) -> None:
+    path = tmp_path / "db.json"
+    path.write_text('{"bots": {"1": {"did": "a"}}}')  # written by the stdlib storage
+    storage = CodecJSONStorage(str(path))
+    assert storage.read() == {"bots": {"1": {"did": "a"}}}
+
+    storage.write({"bots": {"1": {"did": "ä"}}})
+    storage.close()
+    assert path.read_text(encoding="utf-8") == '{"bots":{"1":{"did":"ä"}}}'
+
+    storage = CodecJSONStorage(str(tmp_path / "empty.json"))
+    assert storage.read() is None
+    storage.close()
+
+
+@pytest.mark.parametrize("codec", json_codec.available_codecs(), ids=lambda c: c.name)
+def test_codec_output_matches_stdlib(codec: JSONCodec) -> None:
+    # Documents as stored by bumper, the fallback has to write the same bytes as the fast backends
+    data = {
+        "bots": {"1": {"did": 'ä-1 / "q" \\\n\t\x00', "nick": None, "company": "eco-ng", "mqtt_connection": True}},
+        "clean_logs": [{"ts": 1699297517, "area": 28, "aitypes": [], "f": [0.1, 1.5, -2.25, 123456.789]}],
+        1: {"empty": {}},
+    }
+    assert codec.dumpb(data) == json_codec.STDLIB.dumpb(data)
+    # Floats in exponent notation are spelled differently (1e16 / 1e+16), but decode to the same value
+    floats = [1e16, 1e-7, -3.5e300]
+    assert codec.loads(codec.dumpb(floats)) == json_codec.STDLIB.loads(json_codec.STDLIB.dumpb(floats)) == floats
+
+
+class _Color(Enum):
+    RED = "red"
+
+
+@dataclass(frozen=True)
+class _Row:
+    name: str
+    at: datetime
+
+
+@pytest.mark.parametrize("codec", json_codec.available_codecs(), ids=lambda c: c.name)
+def test_codec_default_same_on_all_backends(codec: JSONCodec) -> None:
+    at = datetime(2024, 1, 2, 3, 4, 5, 600, tzinfo=UTC)
+    data = {
+        "at": at,
+        "local": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=2))),
+        "naive": datetime(2024, 1, 2, 3, 4, 5),  # noqa: DTZ001
+        "day": date(2024, 1, 2),
+        "row": _Row("a", at),
+        "id": UUID(int=1),
+        "color": _Color.RED,
+        "tags": {"x"},
+    }
+    expected = (
+        '{"at":"2024-01-02T03:04:05.000600Z","local":"2024-01-02T03:04:05+02:00","naive":"2024-01-02T03:04:05",'
+        '"day":"2024-01-02","row":{"name":"a","at":"2024-01-02T03:04:05.000600Z"},'
+        '"id":"00000000-0000-0000-0000-000000000001","color":"red","tags":["x"]}'
+    )
+    assert codec.dumps(data) == expected
+
+    with pytest.raises(TypeError):
+        codec.dumpb({"obj": object()})
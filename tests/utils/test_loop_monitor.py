@@ -0,0 +1,37 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from bumper.utils.loop_monitor import LoopLagMonitor
+from bumper.utils.settings import config as bumper_isc
+
+
+def test_loop_monitor_stats() -> None:
+    monitor = LoopLagMonitor(window_size=100)
+    assert monitor.stats() == {"samples": 0, "slow": 0, "last_ms": 0.0, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+    for lag in [0.001] * 98 + [0.2, -0.001]:
+        monitor.record(lag)
+
+    stats = monitor.stats()
+    assert stats["samples"] == 100
+    assert stats["slow"] == 1
+    assert stats["last_ms"] == 0.0
+    assert stats["max_ms"] == 200.0
+    assert stats["p99_ms"] == 1.0
+    assert stats["avg_ms"] == 2.98
+
+
+async def test_loop_monitor_detects_blocking() -> None:
+    monitor = LoopLagMonitor(interval=0.01)
+    with patch.object(bumper_isc, "shutting_down", False):
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.005)
+        time.sleep(0.15)  # noqa: ASYNC251 # Block the loop
+        await asyncio.sleep(0.05)
+        bumper_isc.shutting_down = True
+        await asyncio.wait_for(task, 1)
+
+    assert monitor.samples >= 1
+    assert monitor.max >= 0.1
+    assert monitor.slow >= 1
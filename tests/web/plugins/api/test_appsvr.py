@@ -494,15 +494,14 @@ async def test_device_prop_list_api(webserver_client: TestClient) -> None:
     # Test with props and mocked helperbot
     params = "?did=did_1234&res=res_1234&mid=mid_1234&props=onBattery,onChargeState"
     with patch.object(bumper_isc, "mqtt_helperbot", new_callable=MagicMock) as mock_helperbot:
-        mock_helperbot.send_command_plain = AsyncMock(return_value={"body": {"data": {"battery": 100}}})
+        mock_helperbot.send_commands = AsyncMock(return_value=[{"body": {"data": {"battery": 100}}}, None])
         async with webserver_client.get(f"/api/appsvr/device/prop/list{params}") as resp:
             assert resp.status == 200
             json_resp = await resp.json()
             assert json_resp["ret"] == "ok"
             assert json_resp["data"]["did"] == "did_1234"
-            assert len(json_resp["data"]["props"]) == 2
-            assert json_resp["data"]["props"][0]["key"] == "onBattery"
-            assert json_resp["data"]["props"][1]["key"] == "onChargeState"
+            assert [prop["key"] for prop in json_resp["data"]["props"]] == ["onBattery"]
+            assert [cmd.cmd_name for cmd in mock_helperbot.send_commands.call_args.args[0]] == ["getBattery", "getChargeState"]
             for prop in json_resp["data"]["props"]:
                 assert "value" in prop
                 assert "ts" in prop
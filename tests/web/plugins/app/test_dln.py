@@ -1,3 +1,5 @@
+from dataclasses import replace
+
 from aiohttp.test_utils import TestClient
 import pytest
 
@@ -50,17 +52,10 @@ async def test_clean_result_list_with_logs(webserver_client: TestClient) -> None
     cid = "1699297517"
     start = 1699297517
     rid = "sdu9"
-    clean_log = CleanLog(f"{did}@{start}@{rid}")
-    clean_log.did = did
-    clean_log.cid = cid
-    clean_log.area = 28
-    clean_log.last = 1699297517
-    clean_log.stop_reason = 1
-    clean_log.ts = start
-    clean_log.type = "auto"
+    clean_log = CleanLog(f"{did}@{start}@{rid}", did=did, cid=cid, area=28, last=1699297517, stop_reason=1, ts=start, type="auto")
     clean_log_repo.add_or_update(clean_log)
     rid = "sdu8"
-    clean_log.clean_log_id = f"{did}@{start}@{rid}"
+    clean_log = replace(clean_log, clean_log_id=f"{did}@{start}@{rid}")
     clean_log_repo.add_or_update(clean_log)
 
     async with webserver_client.get(f"/app/dln/api/log/clean_result/list?did={did}&logType=clean") as resp:
@@ -85,14 +80,7 @@ async def test_clean_result_list_non_clean_type(webserver_client: TestClient) ->
     cid = "1699297517"
     start = 1699297517
     rid = "sdu9"
-    clean_log = CleanLog(f"{did}@{start}@{rid}")
-    clean_log.did = did
-    clean_log.cid = cid
-    clean_log.area = 28
-    clean_log.last = 1699297517
-    clean_log.stop_reason = 1
-    clean_log.ts = start
-    clean_log.type = "auto"
+    clean_log = CleanLog(f"{did}@{start}@{rid}", did=did, cid=cid, area=28, last=1699297517, stop_reason=1, ts=start, type="auto")
     clean_log_repo.add_or_update(clean_log)
 
     async with webserver_client.get(f"/app/dln/api/log/clean_result/list?did={did}&logType=other") as resp:
@@ -109,17 +97,10 @@ async def test_clean_result_del(webserver_client: TestClient) -> None:
     cid = "1699297517"
     start = 1699297517
     rid = "sdu9"
-    clean_log = CleanLog(f"{did}@{start}@{rid}")
-    clean_log.did = did
-    clean_log.cid = cid
-    clean_log.area = 28
-    clean_log.last = 1699297517
-    clean_log.stop_reason = 1
-    clean_log.ts = start
-    clean_log.type = "auto"
+    clean_log = CleanLog(f"{did}@{start}@{rid}", did=did, cid=cid, area=28, last=1699297517, stop_reason=1, ts=start, type="auto")
     clean_log_repo.add_or_update(clean_log)
     rid = "sdu8"
-    clean_log.clean_log_id = f"{did}@{start}@{rid}"
+    clean_log = replace(clean_log, clean_log_id=f"{did}@{start}@{rid}")
     clean_log_repo.add_or_update(clean_log)
 
     # Verify logs exist
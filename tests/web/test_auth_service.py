@@ -226,7 +226,7 @@ async def test_oauth_callback_success(webserver_client: TestClient, monkeypatch:
         return f"{t}_token", 99999999
 
     monkeypatch.setattr("bumper.web.auth_service.token_repo.get_by_auth_code", lambda _: DummyToken())
-    monkeypatch.setattr("bumper.web.auth_service.client_repo.get", lambda _: DummyClient())
+    monkeypatch.setattr("bumper.db.client_repo.get", lambda _: DummyClient())
     monkeypatch.setattr("bumper.web.auth_service.generate_jwt_helper", dummy_generate_jwt)
 
     async with webserver_client.get("/api/appsvr/oauth_callback?code=auth123") as resp:
@@ -1,9 +1,18 @@
+import asyncio
+import csv
+import io
+import json
 from pathlib import Path
+import time
 from unittest.mock import patch
 
-from aiohttp.test_utils import TestClient
+from aiohttp.test_utils import TestClient, make_mocked_request
 import pytest
 
+from bumper.db import clean_log_repo
+from bumper.web import web_paths
+from bumper.web.utils.models import CleanLog
+
 # @pytest.mark.usefixtures("clean_database", "helper_bot")
 # async def test_restart_helperbot(webserver_client: TestClient) -> None:
 #     async with webserver_client.get("/restart_Helperbot") as resp:
@@ -81,3 +90,100 @@ async def test_favicon_missing(
             body = await resp.text()
             assert "Internal Server Error" in body
             assert "Favicon not found at" in caplog.text
+
+
+@pytest.mark.usefixtures("clean_database")
+async def test_backup(webserver_client: TestClient, tmp_path: Path) -> None:
+    backup_file = str(tmp_path / "bumper.db.bak")
+    with (
+        patch("bumper.web.web_paths._backups", web_paths._BackupJob()),
+        patch("bumper.web.web_paths.db.backup_db", return_value=backup_file) as backup_db,
+    ):
+        async with webserver_client.get("/backup") as resp:
+            assert resp.status == 405
+        async with webserver_client.post("/backup") as resp:
+            assert resp.status == 200
+            assert await resp.json() == {"status": "complete", "file": backup_file, "reused": False}
+        # A backup written moments ago is returned again
+        async with webserver_client.post("/backup") as resp:
+            assert await resp.json() == {"status": "complete", "file": backup_file, "reused": True}
+    backup_db.assert_called_once_with()
+
+
+async def test_backup_shared_while_running(tmp_path: Path) -> None:
+    backup_file = str(tmp_path / "bumper.db.bak")
+    job = web_paths._BackupJob()
+    with patch("bumper.web.web_paths.db.backup_db", side_effect=lambda: time.sleep(0.05) or backup_file) as backup_db:
+        results = await asyncio.gather(job.run(), job.run())
+    assert sorted(results) == [(backup_file, False), (backup_file, True)]
+    backup_db.assert_called_once_with()
+
+
+async def test_backup_local_network_only() -> None:
+    for remote, allowed in (("127.0.0.1", True), ("192.168.1.20", True), ("::1", True), ("8.8.8.8", False), (None, False)):
+        request = make_mocked_request("POST", "/backup")
+        with patch.object(type(request), "remote", remote):
+            assert web_paths._from_local_network(request) is allowed
+
+
+async def test_backup_failure(webserver_client: TestClient) -> None:
+    with (
+        patch("bumper.web.web_paths._backups", web_paths._BackupJob()),
+        patch("bumper.web.web_paths.db.backup_db", side_effect=OSError("disk full")),
+    ):
+        async with webserver_client.post("/backup") as resp:
+            assert resp.status == 500
+
+
+@pytest.mark.usefixtures("clean_database")
+async def test_clean_log_stats(webserver_client: TestClient) -> None:
+    clean_log = CleanLog("did_1@1699297517@sdu9", did="did_1", area=28, last=1800, ts=1699297517, type="auto")
+    clean_log_repo.add_or_update(clean_log)
+    async with webserver_client.get("/clean_logs/stats", params={"did": "did_1"}) as resp:
+        assert resp.status == 200
+        (stats,) = (await resp.json())["bots"]
+        assert (stats["did"], stats["count"], stats["area"], stats["time"]) == ("did_1", 1, 28, 1800)
+
+
+@pytest.mark.usefixtures("clean_database")
+async def test_export(webserver_client: TestClient) -> None:
+    for ts in (1699297517, 1699297518):
+        clean_log_repo.add_or_update(CleanLog(f"did_1@{ts}@sdu9", did="did_1", area=28, ts=ts, type="auto"))
+
+    async with webserver_client.get("/export/clean_logs", params={"since": "1699297518"}) as resp:
+        assert resp.status == 200
+        assert resp.headers["Content-Type"] == "application/x-ndjson"
+        lines = (await resp.text()).splitlines()
+        assert [json.loads(line)["clean_log_id"] for line in lines] == ["did_1@1699297518@sdu9"]
+
+    async with webserver_client.get("/export/clean_logs", params={"format": "csv"}) as resp:
+        assert resp.status == 200
+        rows = list(csv.DictReader(io.StringIO(await resp.text())))
+        assert [(row["ts"], row["area"]) for row in rows] == [("1699297517", "28"), ("1699297518", "28")]
+
+    async with webserver_client.get("/export/users", params={"format": "csv"}) as resp:
+        assert resp.status == 200
+    async with webserver_client.get("/export/unknown") as resp:
+        assert resp.status == 400
+    async with webserver_client.get("/export/bots", params={"format": "xml"}) as resp:
+        assert resp.status == 400
+
+
+async def test_export_local_network_only(webserver_client: TestClient) -> None:
+    with patch("bumper.web.web_paths._from_local_network", return_value=False) as local:
+        async with webserver_client.get("/export/users") as resp:
+            assert resp.status == 403
+    local.assert_called_once()
+
+
+async def test_metrics(webserver_client: TestClient) -> None:
+    async with webserver_client.get("/metrics") as resp:
+        assert resp.status == 200
+        body = await resp.json()
+        assert set(body["db"]) == {"reads", "writes", "flushes", "reloads", "dirty_tables", "worker"}
+        assert set(body["db"]["worker"]) == {"jobs", "failed", "queued", "busy_ms", "max_wait_ms"}
+        assert set(body["loop"]) == {"samples", "slow", "last_ms", "avg_ms", "p99_ms", "max_ms"}
+        assert set(body["presence"]) == {"bots_online", "clients_online", "connects", "disconnects", "pending"}
+        assert set(body["models"]) == {"bots", "clients", "users", "clean_logs"}
+        assert set(body["models"]["bots"]) == {"hits", "misses", "size"}
+        assert isinstance(body["ops"], dict)
@@ -0,0 +1,38 @@
+from dataclasses import FrozenInstanceError
+from datetime import UTC, datetime
+
+import pytest
+
+from bumper.web.utils.models import BumperUser, CleanLog, CleanLogs, Token, VacBotClient, VacBotDevice
+
+
+@pytest.mark.parametrize(
+    "model",
+    [VacBotDevice(), VacBotClient(), BumperUser(), Token("u", "t", datetime.now(tz=UTC)), CleanLog("id"), CleanLogs("d", "c")],
+    ids=lambda m: type(m).__name__,
+)
+def test_models_are_slotted(model: object) -> None:
+    assert not hasattr(model, "__dict__")
+
+
+def test_models_roundtrip() -> None:
+    bot = VacBotDevice(did="did_1", class_id="ls1ok3", name="E01", company="eco-ng", mqtt_connection=True)
+    assert VacBotDevice.from_dict(bot.as_dict()) == bot
+    client = VacBotClient(name="bumper", userid="user_1", realm="realm", resource="res")
+    assert VacBotClient.from_dict(client.as_dict()) == client
+    user = BumperUser(userid="user_1", bots=("did_1",))
+    assert BumperUser.from_dict(user.as_dict()) == user
+    token = Token("user_1", "token_1", datetime.now(tz=UTC), auth_code="code")
+    assert Token.from_dict(token.to_db()) == token
+
+
+def test_clean_log_to_db() -> None:
+    clean_log = CleanLog.from_dict("did_1", "sdu9", {"start": "1699297517", "area": 28, "aitypes": [1], "type": "auto"})
+    doc = clean_log.to_db()
+    assert doc["clean_log_id"] == "did_1@1699297517@sdu9"
+    assert doc["ts"] == 1699297517
+    assert CleanLog.from_db(doc) == clean_log
+
+    with pytest.raises(FrozenInstanceError):
+        clean_log.ts = 0  # type: ignore[misc]
+    assert CleanLogs("d", "c", [clean_log]).to_db() == {"did": "d", "cid": "c", "logs": [doc]}
@@ -1,9 +1,12 @@
 import asyncio
+from typing import Any
 from unittest import mock
 
 import pytest
 from testfixtures import LogCapture
 
+from bumper.db import async_token_repo, token_repo
+from bumper.utils.settings import config as bumper_isc
 from bumper.xmpp.xmpp import XMPPAsyncClient, XMPPServer
 
 
@@ -87,6 +90,68 @@ async def test_client_connect_no_starttls() -> None:
     assert xmppclient.state == xmppclient.INIT  # Client moved to INIT state
 
 
+@pytest.mark.usefixtures("xmpp_cleanup_clients")
+@pytest.mark.parametrize(("verified", "expected"), [(True, "<success"), (False, "<response")])
+async def test_client_auth_verified_off_loop(verified: bool, expected: str) -> None:
+    test_transport = mock.Mock()
+    test_transport.get_extra_info = mock.Mock(return_value=mock_transport_extra_info())
+    xmppclient = XMPPAsyncClient(test_transport)
+    xmppclient.state = xmppclient.CONNECT
+    mock_send = xmppclient.send = mock.Mock(side_effect=return_send_data)
+
+    test_data = (
+        b'<auth xmlns="urn:ietf:params:xml:ns:xmpp-sasl" mechanism="PLAIN">'
+        b"AGZ1aWRfdG1wdXNlcgAwL0lPU0Y1M0QwN0JBL3VzXzg5ODgwMmZkYmM0NDQxYjBiYzgxNWIxZDFjNjgzMDJl</auth>"
+    )
+    with (
+        mock.patch.object(bumper_isc, "USE_AUTH", True),
+        mock.patch.object(token_repo, "verify_auth_code", return_value=verified) as verify,
+    ):
+        xmppclient.parse_data(test_data)
+        assert mock_send.call_count == 0  # Response is sent once the auth code was checked
+        assert xmppclient.auth_task is not None
+        await xmppclient.auth_task
+
+    verify.assert_called_once_with("fuid_tmpuser", "us_898802fdbc4441b0bc815b1d1c68302e")
+    assert mock_send.mock_calls[0][1][0].startswith(expected)
+    assert (xmppclient.state == xmppclient.INIT) is verified
+
+
+@pytest.mark.usefixtures("xmpp_cleanup_clients")
+async def test_client_disconnect_during_auth() -> None:
+    test_transport = mock.Mock()
+    test_transport.get_extra_info = mock.Mock(return_value=mock_transport_extra_info())
+    xmppclient = XMPPAsyncClient(test_transport)
+    xmppclient.state = xmppclient.CONNECT
+    mock_send = xmppclient.send = mock.Mock(side_effect=return_send_data)
+    verified = asyncio.Event()
+
+    async def verify_auth_code(*_: Any) -> bool:
+        await verified.wait()
+        return True
+
+    test_data = (
+        b'<auth xmlns="urn:ietf:params:xml:ns:xmpp-sasl" mechanism="PLAIN">'
+        b"AGZ1aWRfdG1wdXNlcgAwL0lPU0Y1M0QwN0JBL3VzXzg5ODgwMmZkYmM0NDQxYjBiYzgxNWIxZDFjNjgzMDJl</auth>"
+    )
+    with (
+        mock.patch.object(bumper_isc, "USE_AUTH", True),
+        mock.patch.object(async_token_repo, "verify_auth_code", verify_auth_code),
+    ):
+        xmppclient.parse_data(test_data)
+        auth_task = xmppclient.auth_task
+        assert auth_task is not None
+        await asyncio.sleep(0)
+        xmppclient.set_state("DISCONNECT")  # Connection lost while the auth code is checked
+        verified.set()
+        with pytest.raises(asyncio.CancelledError):
+            await auth_task
+
+    assert auth_task.cancelled()
+    test_transport.close.assert_called_once()
+    mock_send.assert_not_called()
+
+
 @pytest.mark.usefixtures("xmpp_cleanup_clients")
 async def test_client_end_stream() -> None:
     test_transport = mock.Mock()